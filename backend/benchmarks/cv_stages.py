@@ -0,0 +1,196 @@
+"""
+CV stage micro-benchmarks with regression gates.
+
+Times every stage of the Vision pipeline (decode, pose, face, calculate_body_ratios,
+warp_image_to_ratio, drawing, crop, encode_img) on the samples/ images and on synthetic
+large uploads (4K and 12 MP), and records p50 / p95 wall time and peak allocation
+(tracemalloc, which includes NumPy / OpenCV output buffers) per stage.
+
+Results are written to logs/benchmarks/cv_stages.json. A stage fails when its p50 exceeds
+the stored baseline (backend/benchmarks/baseline.json) by more than the time tolerance, or
+its peak allocation by more than the memory tolerance. Runs offline (no Gemini key needed).
+
+Usage:
+    python -m backend.benchmarks.cv_stages [--repeat 20] [--update-baseline]
+Environment:
+    BENCHMARK_TIME_TOLERANCE:   allowed p50 slowdown, as a fraction (default 0.5)
+    BENCHMARK_MEMORY_TOLERANCE: allowed peak allocation growth, as a fraction (default 0.2)
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+from datetime import datetime, timezone
+import cv2
+import numpy as np
+from backend.services.cv_utils import (
+    decode_image, get_landmarks_with_results, detect_face_bounds, calculate_body_ratios,
+    warp_image_to_ratio, draw_skeleton, draw_measurements, get_crop_bounds, apply_crop
+)
+from backend.services.mode_vision import encode_img, extract_body_profile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..', '..'))
+SAMPLES_DIR = os.path.join(ROOT_DIR, 'samples')
+RESULTS_PATH = os.path.join(ROOT_DIR, 'logs', 'benchmarks', 'cv_stages.json')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+# Synthetic uploads: the sample photo letterboxed into a portrait frame of this (width, height)
+SYNTHETIC_SIZES = {
+    "4k": (2160, 3840),
+    "12mp": (3000, 4000),
+}
+
+def letterbox(img, size):
+    w, h = size
+    scale = min(w / img.shape[1], h / img.shape[0])
+    resized = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    top = (h - resized.shape[0]) // 2
+    left = (w - resized.shape[1]) // 2
+    return cv2.copyMakeBorder(
+        resized, top, h - resized.shape[0] - top, left, w - resized.shape[1] - left, cv2.BORDER_REPLICATE
+    )
+
+def load_inputs():
+    # {input name: (model image, upload bytes)}; the user sample provides the target ratios
+    img_model = cv2.imread(os.path.join(SAMPLES_DIR, 'sample_model.png'))
+    images = {"sample": img_model}
+    for name, size in SYNTHETIC_SIZES.items():
+        images[name] = letterbox(img_model, size)
+    inputs = {}
+    for name, img in images.items():
+        ok, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        inputs[name] = (img, buffer.tobytes())
+    return inputs
+
+def build_stages(img, data, user_ratios):
+    """
+    {stage: zero-argument callable}. Inputs of later stages are computed once up front,
+    so every stage is timed in isolation.
+    """
+    profile = extract_body_profile(img)
+    if profile is None:
+        raise RuntimeError("No body detected in benchmark input")
+    landmarks, head_height = profile['landmarks'], profile['head_height']
+    pose_results = get_landmarks_with_results(img)[1]
+    warped = warp_image_to_ratio(img, landmarks, user_ratios)
+    crop_bounds = get_crop_bounds(img, pose_results, landmarks)
+
+    def draw():
+        canvas = img.copy()
+        draw_skeleton(canvas, pose_results)
+        draw_measurements(canvas, landmarks, profile['ratios']['head_stat_ratio'], face_box=profile['face'])
+        return canvas
+
+    return {
+        "decode": lambda: decode_image(data),
+        "pose": lambda: get_landmarks_with_results(img),
+        "face": lambda: detect_face_bounds(img),
+        "calculate_body_ratios": lambda: calculate_body_ratios(landmarks, precise_head_height=head_height),
+        "warp_image_to_ratio": lambda: warp_image_to_ratio(img, landmarks, user_ratios),
+        "drawing": draw,
+        "crop": lambda: apply_crop(img, get_crop_bounds(img, pose_results, landmarks)),
+        "encode_img": lambda: encode_img(apply_crop(warped, crop_bounds)),
+    }
+
+def measure(fn, repeat):
+    fn()  # warm up (MediaPipe graph creation, lazy allocations)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "p50_ms": round(float(np.percentile(times, 50)), 3),
+        "p95_ms": round(float(np.percentile(times, 95)), 3),
+        "peak_mb": round(peak / 1e6, 3),
+        "runs": repeat,
+    }
+
+def run_benchmarks(repeat=20, inputs=None):
+    user_profile = extract_body_profile(cv2.imread(os.path.join(SAMPLES_DIR, 'sample_user.png')))
+    results = {}
+    for input_name, (img, data) in load_inputs().items():
+        if inputs and input_name not in inputs:
+            continue
+        stages = build_stages(img, data, user_profile['ratios'])
+        results[input_name] = {stage: measure(fn, repeat) for stage, fn in stages.items()}
+        print(f"[Benchmark] {input_name} ({img.shape[1]}x{img.shape[0]}) done")
+    return results
+
+def find_regressions(results, baseline, time_tolerance=None, memory_tolerance=None):
+    """
+    Stages whose p50 or peak allocation exceed the baseline by more than the tolerances.
+    Stages or inputs missing from the baseline are not gated.
+    """
+    if time_tolerance is None:
+        time_tolerance = float(os.environ.get("BENCHMARK_TIME_TOLERANCE", "0.5"))
+    if memory_tolerance is None:
+        memory_tolerance = float(os.environ.get("BENCHMARK_MEMORY_TOLERANCE", "0.2"))
+    regressions = []
+    for input_name, stages in results.items():
+        for stage, current in stages.items():
+            reference = baseline.get(input_name, {}).get(stage)
+            if not reference:
+                continue
+            # Sub-millisecond / sub-megabyte stages are dominated by noise, give them an absolute floor
+            time_limit = max(reference['p50_ms'] * (1 + time_tolerance), reference['p50_ms'] + 0.5)
+            memory_limit = max(reference['peak_mb'] * (1 + memory_tolerance), reference['peak_mb'] + 0.5)
+            if current['p50_ms'] > time_limit:
+                regressions.append(f"{input_name}/{stage}: p50 {current['p50_ms']:.2f}ms > {time_limit:.2f}ms")
+            if current['peak_mb'] > memory_limit:
+                regressions.append(f"{input_name}/{stage}: peak {current['peak_mb']:.2f}MB > {memory_limit:.2f}MB")
+    return regressions
+
+def environment():
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+    }
+
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding='utf-8') as f:
+        return json.load(f).get("results", {})
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--inputs', help='Comma separated subset of: sample, ' + ', '.join(SYNTHETIC_SIZES))
+    parser.add_argument('--update-baseline', action='store_true', help='Store this run as the new baseline')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat, inputs=args.inputs.split(',') if args.inputs else None)
+    regressions = [] if args.update_baseline else find_regressions(results, load_baseline())
+    report = {"environment": environment(), "results": results, "regressions": regressions}
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {RESULTS_PATH}")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump({"environment": report["environment"], "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"Updated baseline {BASELINE_PATH}")
+        return 0
+
+    for line in regressions:
+        print(f"[Benchmark] REGRESSION {line}")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
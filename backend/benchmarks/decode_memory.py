@@ -0,0 +1,99 @@
+"""
+Peak memory of decoding large uploads: full-resolution decode + downscale (the previous
+path) against decode_work_image(), which reads the JPEG header and decodes at 1/2, 1/4
+or 1/8 scale (IMREAD_REDUCED_COLOR_*) before the final downscale.
+
+Inputs are the sample model photo letterboxed into synthetic 12 MP and 48 MP JPEGs;
+every input is decoded for each working resolution. Peak allocation is measured with
+tracemalloc (which includes NumPy / OpenCV output buffers). Results are written to
+logs/benchmarks/decode_memory.json. Runs offline.
+
+Usage:
+    python -m backend.benchmarks.decode_memory [--repeat 5] [--sides 1024,2048,4096]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import cv2
+import numpy as np
+from backend.services.cv_utils import decode_image, decode_work_image, limit_resolution
+from backend.benchmarks.cv_stages import letterbox, environment
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..', '..'))
+SAMPLES_DIR = os.path.join(ROOT_DIR, 'samples')
+RESULTS_PATH = os.path.join(ROOT_DIR, 'logs', 'benchmarks', 'decode_memory.json')
+
+# Synthetic uploads (width, height)
+INPUT_SIZES = {
+    "12mp": (3000, 4000),
+    "48mp": (6000, 8000),
+}
+
+def load_inputs():
+    img_model = cv2.imread(os.path.join(SAMPLES_DIR, 'sample_model.png'))
+    inputs = {}
+    for name, size in INPUT_SIZES.items():
+        ok, buffer = cv2.imencode('.jpg', letterbox(img_model, size), [cv2.IMWRITE_JPEG_QUALITY, 95])
+        inputs[name] = buffer.tobytes()
+    return inputs
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    shape = fn().shape
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "p50_ms": round(float(np.percentile(times, 50)), 3),
+        "peak_mb": round(peak / 1e6, 3),
+        "shape": list(shape),
+    }
+
+def run_benchmarks(sides, repeat=5):
+    results = {}
+    for input_name, data in load_inputs().items():
+        for side in sides:
+            os.environ["WORK_MAX_SIDE"] = str(side)
+            results[f"{input_name}@{side}"] = {
+                "full": measure(lambda: limit_resolution(decode_image(data), side), repeat),
+                "reduced": measure(lambda: decode_work_image(data), repeat),
+            }
+        print(f"[Benchmark] {input_name} done")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--sides', default='1024,2048,4096', help='Comma separated working resolutions (longest side)')
+    args = parser.parse_args()
+
+    work_max_side = os.environ.get("WORK_MAX_SIDE")
+    try:
+        results = run_benchmarks([int(side) for side in args.sides.split(',')], args.repeat)
+    finally:
+        if work_max_side is None:
+            os.environ.pop("WORK_MAX_SIDE", None)
+        else:
+            os.environ["WORK_MAX_SIDE"] = work_max_side
+
+    for name, result in results.items():
+        full, reduced = result['full'], result['reduced']
+        print(f"[Benchmark] {name}: peak {full['peak_mb']:.1f}MB -> {reduced['peak_mb']:.1f}MB, "
+              f"p50 {full['p50_ms']:.1f}ms -> {reduced['p50_ms']:.1f}ms")
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, 'w', encoding='utf-8') as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    print(f"Saved results to {RESULTS_PATH}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import sys
+import time
 if sys.version_info < (3, 10):
     try:
         import importlib.metadata
@@ -8,34 +9,96 @@ if sys.version_info < (3, 10):
     except ImportError:
         pass
 
+from typing import List
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-import cv2
-import numpy as np
-import io
+import os
+import json
+import math
+import base64
+import secrets
+import asyncio
 import traceback
+from contextlib import asynccontextmanager
 
 # Import Services
 try:
-    from backend.services.mode_vision import process_visuals_core, get_base64_results, analyze_body_proportions
+    from backend.services.mode_vision import (
+        process_image_pair, encode_visual_outputs, analyze_body_proportions, encode_img, apply_crop,
+        decode_pair_profiles, warp_to_user_ratios, render_debug_images, assemble_visual_data, parse_artifacts,
+        decode_user_profile, process_model_for_user, proportion_similarity, ARTIFACT_KEYS,
+        pack_visual_data, is_packed_visual_data, unpack_visual_data
+    )
+    from backend.services.cv_pool import run_cv, shutdown_pool
+    from backend.services.analysis_store import save_analysis, load_analysis
+    from backend.services.artifact_store import save_artifacts, load_artifact, get_artifact_ttl
+    from backend.services.encoding import parse_encode_specs
+    from backend.services.catalog import get_catalog, NEAREST_SCALES
+    from backend.services.metrics import MetricsMiddleware, render_prometheus, set_mode
+    from backend.services.profiling import ProfilingMiddleware
+    from backend.services.warmup import warm_up, is_warmup_enabled, mark_ready, get_readiness
     from backend.services.mode_ai import analyze_full_ai_mode
     from backend.services.mode_pro import run_pro_mode_analysis
+    from backend.services.ai_cache import ai_result_key, load_ai_result, save_ai_result
+    from backend.services.singleflight import SingleFlight, flight_key
+    from backend.services.admission import Overloaded, admit, run_admitted, acquire_ticket
+    from backend.services.jobs import submit_job, get_job, job_status
+    from backend.services.uploads import UploadLimitMiddleware, read_upload
 except ImportError:
     import sys
     import os
     # Add the current directory to sys.path to ensure 'services' can be resolved
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     
-    from services.mode_vision import process_visuals_core, get_base64_results, analyze_body_proportions
+    from services.mode_vision import (
+        process_image_pair, encode_visual_outputs, analyze_body_proportions, encode_img, apply_crop,
+        decode_pair_profiles, warp_to_user_ratios, render_debug_images, assemble_visual_data, parse_artifacts,
+        decode_user_profile, process_model_for_user, proportion_similarity, ARTIFACT_KEYS,
+        pack_visual_data, is_packed_visual_data, unpack_visual_data
+    )
+    from services.cv_pool import run_cv, shutdown_pool
+    from services.analysis_store import save_analysis, load_analysis
+    from services.artifact_store import save_artifacts, load_artifact, get_artifact_ttl
+    from services.encoding import parse_encode_specs
+    from services.catalog import get_catalog, NEAREST_SCALES
+    from services.metrics import MetricsMiddleware, render_prometheus, set_mode
+    from services.profiling import ProfilingMiddleware
+    from services.warmup import warm_up, is_warmup_enabled, mark_ready, get_readiness
     from services.mode_ai import analyze_full_ai_mode
     from services.mode_pro import run_pro_mode_analysis
+    from services.ai_cache import ai_result_key, load_ai_result, save_ai_result
+    from services.singleflight import SingleFlight, flight_key
+    from services.admission import Overloaded, admit, run_admitted, acquire_ticket
+    from services.jobs import submit_job, get_job, job_status
+    from services.uploads import UploadLimitMiddleware, read_upload
 
 
+# CPU time since the process started, which on a fresh worker is essentially the import time
+print(f"[Startup] Imported app ({time.process_time():.2f}s CPU since process start)")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # Memory-maps the catalog index (CATALOG_INDEX_PATH) once, before the first request
+    get_catalog()
+    # Detector warm-up runs in the background; GET /ready turns 200 when it is done
+    warmup_task = asyncio.create_task(warm_up()) if is_warmup_enabled() else None
+    if warmup_task is None:
+        mark_ready()
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+    shutdown_pool()
+
+app = FastAPI(lifespan=lifespan)
 __version__ = "1.0.0"
 
+def upload_slots(path):
+    # Images one request to path may upload (sizes the request body limit)
+    return get_batch_max_models() + 1 if path == "/process-batch" else 2
+
+# Request bodies larger than MAX_UPLOAD_BYTES per image are rejected with 413 before they are read
+app.add_middleware(UploadLimitMiddleware, max_files=upload_slots)
 # Allow CORS for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -44,6 +107,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Opt-in cProfile of single requests (PROFILE_TOKEN, see services/profiling.py)
+app.add_middleware(ProfilingMiddleware)
+# Per-request stage timings (Server-Timing header) and GET /metrics
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc):
+    # Admission control: the request's lane is saturated, fail fast instead of queueing
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "lane": exc.lane, "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 @app.get("/version")
 async def get_version():
@@ -53,165 +129,715 @@ async def get_version():
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/ready")
+async def readiness_check():
+    # 503 until the startup warm-up has finished (use as the readiness probe, /health as liveness)
+    readiness = get_readiness()
+    if readiness["status"] != "ready":
+        return JSONResponse(status_code=503, content=readiness)
+    return readiness
+
+@app.get("/metrics")
+async def get_metrics():
+    # Prometheus text format: stage / request latency histograms and counters
+    return Response(content=render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def build_baseline_analysis(user_ratios, model_ratios, language):
+    real_user_heads = round(1 / user_ratios.get('head_stat_ratio', 0.15), 1)
+    real_model_heads = round(1 / model_ratios.get('head_stat_ratio', 0.15), 1)
+
+    legacy_analysis = analyze_body_proportions(user_ratios, model_ratios, language=language)
+    legacy_analysis['fact_bomb'] = legacy_analysis.get('comment')
+    legacy_analysis['user_heads'] = legacy_analysis.get('user_heads', real_user_heads)
+    legacy_analysis['model_heads'] = legacy_analysis.get('model_heads', real_model_heads)
+    return legacy_analysis
+
+# Artifact name -> /process-baseline JSON field name
+BASELINE_FIELDS = {"result": "image", "user_debug": "debug_user", "model_debug": "debug_model", "result_debug": "debug_result"}
+# Rendered when the client does not pass 'artifacts'
+BASELINE_DEFAULT_ARTIFACTS = ("result", "user_debug", "model_debug")
+# Images Pro Mode sends to Gemini
+PRO_ARTIFACTS = ("result", "user_debug", "model_debug")
+
+# Batch comparisons render the warped result only, unless asked otherwise
+BATCH_DEFAULT_ARTIFACTS = ("result",)
+
+def get_batch_max_models():
+    # BATCH_MAX_MODELS: model images accepted by one /process-batch request (default 20)
+    return int(os.environ.get("BATCH_MAX_MODELS", "20"))
+
+def parse_artifacts_or_400(value, default):
+    try:
+        return parse_artifacts(value, default=default)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+# Keys of the baseline / batch entry objects that custom encoding names must not overwrite
+RESERVED_OUTPUT_FIELDS = set(BASELINE_FIELDS.values()) | {
+    "analysis", "media_types", "meta", "user_ratios", "model_ratios",
+    "index", "id", "filename", "similarity", "rank"
+}
+
+def output_field(name):
+    # Artifacts keep their legacy JSON field names, extra encodings (e.g. previews) use their own name
+    return BASELINE_FIELDS.get(name, name)
+
+def parse_encode_specs_or_400(value, artifact_names):
+    try:
+        specs = parse_encode_specs(value, artifact_names)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    for name, spec in specs.items():
+        # An artifact name is only its own output; any other name must not clash with a response key
+        clashes = spec['source'] != name if name in BASELINE_FIELDS else name in RESERVED_OUTPUT_FIELDS
+        if clashes:
+            raise HTTPException(status_code=400, detail=f"Encoding name '{name}' clashes with a response field")
+    return specs
+
+def binary_baseline_response(response_format, analysis, meta, encoded):
+    """
+    Baseline response without base64.
+    'url':       JSON with <field>_url links to GET /artifacts/{id}/{name}
+    'multipart': multipart/mixed, first part is the JSON, then one image part per output
+    """
+    baseline = {"analysis": analysis}
+
+    if response_format == "url":
+        artifact_id = save_artifacts(encoded)
+        for name in encoded:
+            baseline[f"{output_field(name)}_url"] = f"/artifacts/{artifact_id}/{name}"
+        return {"baseline": baseline, "meta": meta}
+
+    boundary = secrets.token_hex(16)
+    for name in encoded:
+        baseline[f"{output_field(name)}_part"] = name
+
+    def parts():
+        yield (
+            f"--{boundary}\r\nContent-Type: application/json\r\n\r\n"
+            + json.dumps({"baseline": baseline, "meta": meta}, ensure_ascii=False)
+            + "\r\n"
+        ).encode("utf-8")
+        for name, (data, media_type) in encoded.items():
+            yield (
+                f"--{boundary}\r\nContent-Type: {media_type}\r\n"
+                f"Content-Disposition: inline; name=\"{name}\"\r\n"
+                f"Content-Length: {len(data)}\r\n\r\n"
+            ).encode("utf-8")
+            yield data
+            yield b"\r\n"
+        yield f"--{boundary}--\r\n".encode("utf-8")
+
+    return StreamingResponse(parts(), media_type=f"multipart/mixed; boundary={boundary}")
+
+@app.get("/artifacts/{artifact_id}/{name}")
+async def get_artifact(artifact_id: str, name: str):
+    artifact = load_artifact(artifact_id, name)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact expired or not found")
+    data, media_type = artifact
+    # Artifacts are immutable for their lifetime, so browsers may cache them until expiry
+    return Response(content=data, media_type=media_type, headers={
+        "Cache-Control": f"private, max-age={get_artifact_ttl()}, immutable",
+        "ETag": f"\"{artifact_id}-{name}\""
+    })
+
+# Concurrent identical requests wait for the first one instead of recomputing
+baseline_flights = SingleFlight("baseline")
+ai_flights = SingleFlight("ai")
+
+async def compute_baseline(user_bytes, model_bytes, language, artifact_names, encode_specs):
+    """
+    Vision Mode work of one /process-baseline request: (analysis, meta, encoded outputs).
+    The results are shared by coalesced requests, so they must not be modified afterwards.
+    """
+    # 1. Process Visuals (Common: Warping / Ratios) on the CV worker pool
+    try:
+        visual_data = await run_cv(process_image_pair, user_bytes, model_bytes, artifacts=artifact_names)
+    except ValueError as ve:
+         raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+         traceback.print_exc()
+         raise HTTPException(status_code=500, detail=f"Image Processing Failed: {str(e)}")
+
+    # 2. Base Data Preparation
+    user_ratios = visual_data['user_ratios']
+    model_ratios = visual_data['model_ratios']
+
+    # 3. Generate Baseline Result (Standard Mode)
+    legacy_analysis = build_baseline_analysis(user_ratios, model_ratios, language)
+    legacy_analysis['result_heads'] = visual_data['result_heads']
+    legacy_analysis['result_ratios'] = visual_data['result_ratios']
+
+    # Pass ratios back so frontend can send them to AI endpoint
+    # (analysis_id lets /process-ai reuse this result without re-uploading)
+    packed, encoded = await asyncio.gather(
+        run_cv(pack_visual_data, visual_data),
+        run_cv(encode_visual_outputs, visual_data, encode_specs)
+    )
+    meta = {
+        "user_ratios": user_ratios,
+        "model_ratios": model_ratios,
+        "analysis_id": save_analysis(packed, user_bytes, model_bytes)
+    }
+    return legacy_analysis, meta, encoded
+
 @app.post("/process-baseline")
 async def process_baseline(
     user_image: UploadFile = File(...), 
     model_image: UploadFile = File(...),
-    language: str = Form("ko")
+    language: str = Form("ko"),
+    # 'base64' (default, images inline in JSON), 'url' (GET /artifacts/... links) or 'multipart'
+    response_format: str = Form("base64"),
+    # Comma separated subset of: result, user_debug, model_debug, result_debug
+    artifacts: str = Form(None),
+    # JSON {output_name: {source, format, quality, max_side, max_bytes}}, default: JPEG per artifact
+    encodings: str = Form(None)
 ):
     print("Received Baseline Request")
+    set_mode("basic")
+    if response_format not in ("base64", "url", "multipart"):
+        raise HTTPException(status_code=400, detail=f"Unknown response_format: {response_format}")
+    artifact_names = parse_artifacts_or_400(artifacts, BASELINE_DEFAULT_ARTIFACTS)
+    encode_specs = parse_encode_specs_or_400(encodings, artifact_names)
     try:
-        user_bytes = await user_image.read()
-        model_bytes = await model_image.read()
+        user_bytes = await read_upload(user_image)
+        model_bytes = await read_upload(model_image)
 
-        nparr_user = np.frombuffer(user_bytes, np.uint8)
-        img_user = cv2.imdecode(nparr_user, cv2.IMREAD_COLOR)
-
-        nparr_model = np.frombuffer(model_bytes, np.uint8)
-        img_model = cv2.imdecode(nparr_model, cv2.IMREAD_COLOR)
-
-        if img_user is None or img_model is None:
-             raise HTTPException(status_code=400, detail="Invalid image data")
-
-        # 1. Process Visuals (Common: Warping / Ratios)
-        try:
-            visual_data = process_visuals_core(img_user, img_model)
-        except ValueError as ve:
-             raise HTTPException(status_code=400, detail=str(ve))
-        except Exception as e:
-             traceback.print_exc()
-             raise HTTPException(status_code=500, detail=f"Image Processing Failed: {str(e)}")
-
-        # 2. Base Data Preparation
-        user_ratios = visual_data['user_ratios']
-        model_ratios = visual_data['model_ratios']
-        real_user_heads = round(1 / user_ratios.get('head_stat_ratio', 0.15), 1)
-        real_model_heads = round(1 / model_ratios.get('head_stat_ratio', 0.15), 1)
-
-        # 3. Generate Baseline Result (Standard Mode)
-        legacy_analysis = analyze_body_proportions(user_ratios, model_ratios, language=language)
-        legacy_analysis['fact_bomb'] = legacy_analysis.get('comment')
-        
-        legacy_analysis['result_heads'] = visual_data['result_heads']
-        legacy_analysis['result_ratios'] = visual_data['result_ratios']
-        legacy_analysis['user_heads'] = legacy_analysis.get('user_heads', real_user_heads)
-        legacy_analysis['model_heads'] = legacy_analysis.get('model_heads', real_model_heads)
-        
-        base64_images = get_base64_results(visual_data)
+        # Identical requests in flight (double clicks, client retries) share one computation
+        key = await asyncio.to_thread(flight_key, user_bytes, model_bytes, language, ",".join(artifact_names), encodings)
+        # (only the computing request takes a CV lane slot)
+        legacy_analysis, meta, encoded = await baseline_flights.run(
+            key, run_admitted, "cv", compute_baseline, user_bytes, model_bytes, language, artifact_names, encode_specs
+        )
+        if response_format != "base64":
+            return binary_baseline_response(response_format, legacy_analysis, meta, encoded)
 
         response_payload = {
             "baseline": {
-                "image": base64_images['result_image'],
+                "image": None,
                 "analysis": legacy_analysis,
-                "debug_user": base64_images['user_debug_image'],
-                "debug_model": base64_images['model_debug_image']
+                "debug_user": None,
+                "debug_model": None
             },
-            # Pass ratios back so frontend can send them to AI endpoint
-            "meta": {
-                "user_ratios": user_ratios,
-                "model_ratios": model_ratios
-            }
+            "meta": meta
         }
+        for name, (data, media_type) in encoded.items():
+            response_payload['baseline'][output_field(name)] = base64.b64encode(data).decode('utf-8')
+        if encodings:
+            response_payload['baseline']['media_types'] = {
+                output_field(name): media_type for name, (_, media_type) in encoded.items()
+            }
         return response_payload
 
-    except HTTPException as he:
-        raise he
+    except (HTTPException, Overloaded):
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/process-batch")
+async def process_batch(
+    user_image: UploadFile = File(...),
+    model_images: List[UploadFile] = File(None),
+    # Comma separated catalog model ids (see POST /catalog/nearest), processed after the uploads
+    model_ids: str = Form(None),
+    language: str = Form("ko"),
+    # 'base64' (default, images inline in JSON) or 'url' (GET /artifacts/... links)
+    response_format: str = Form("base64"),
+    # Comma separated subset of: result, model_debug, result_debug (default: result)
+    artifacts: str = Form(None),
+    # JSON {output_name: {source, format, quality, max_side, max_bytes}}, applied to every model
+    encodings: str = Form(None)
+):
+    """
+    One user against N model images (uploads and/or catalog ids).
+    The user's landmarks and ratios are extracted once, the models are processed
+    concurrently on the CV worker pool, and the results are ranked by proportion similarity.
+    Models that cannot be processed are listed under 'failed' instead of failing the batch.
+    """
+    model_images = model_images or []
+    catalog_ids = [model_id.strip() for model_id in (model_ids or "").split(',') if model_id.strip()]
+    model_count = len(model_images) + len(catalog_ids)
+    print(f"Received Batch Request. Models: {model_count}")
+    set_mode("batch")
+    if response_format not in ("base64", "url"):
+        raise HTTPException(status_code=400, detail=f"Unknown response_format: {response_format}")
+    if model_count == 0:
+        raise HTTPException(status_code=400, detail="At least one model image or model id is required")
+    if model_count > get_batch_max_models():
+        raise HTTPException(status_code=400, detail=f"Too many model images (max {get_batch_max_models()})")
+    artifact_names = parse_artifacts_or_400(artifacts, BATCH_DEFAULT_ARTIFACTS)
+    if 'user_debug' in artifact_names:
+        raise HTTPException(status_code=400, detail="user_debug is not available for batch comparisons")
+    encode_specs = parse_encode_specs_or_400(encodings, artifact_names)
+
+    catalog = None
+    if catalog_ids:
+        catalog = get_catalog()
+        if catalog is None:
+            raise HTTPException(status_code=503, detail="Catalog index is not available")
+        unknown = [model_id for model_id in catalog_ids if model_id not in catalog]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Unknown model ids: {', '.join(unknown)}")
+
+    user_bytes = await read_upload(user_image)
+    # (id, name, bytes) per model: uploads first, then catalog models in the given order
+    models = [(None, model_image.filename, await read_upload(model_image)) for model_image in model_images]
+    # index -> detail of catalog models whose photo could not be read
+    read_errors = {}
+    for model_id in catalog_ids:
+        try:
+            model_bytes = await asyncio.to_thread(catalog.read_image, model_id)
+        except OSError as e:
+            # Moved or deleted since the index was built: listed under 'failed'
+            print(f"[Batch] Could not read catalog model {model_id}: {e}")
+            read_errors[len(models)] = "Catalog image is missing or unreadable"
+            model_bytes = None
+        models.append((model_id, catalog.models[catalog.positions[model_id]]['path'], model_bytes))
+
+    # The whole batch takes one CV lane slot
+    async with admit("cv"):
+        # 1. User side once
+        try:
+            user_profile = await run_cv(decode_user_profile, user_bytes)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        except Exception as e:
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Image Processing Failed: {str(e)}")
+        user_ratios = user_profile['ratios']
+
+        # 2. Every readable model concurrently against the same user profile
+        readable = [index for index in range(len(models)) if index not in read_errors]
+        outcomes = await asyncio.gather(*[
+            run_cv(process_model_for_user, models[index][2], user_profile, artifacts=artifact_names, specs=encode_specs)
+            for index in readable
+        ], return_exceptions=True)
+    outcomes = dict(zip(readable, outcomes))
+
+    # 3. Per-model analysis, ranked by similarity to the user's proportions
+    results = []
+    failed = []
+    for index, (model_id, filename, _) in enumerate(models):
+        if index in read_errors:
+            failed.append({"index": index, "id": model_id, "filename": filename, "detail": read_errors[index]})
+            continue
+        outcome = outcomes[index]
+        if isinstance(outcome, Exception):
+            if not isinstance(outcome, ValueError):
+                traceback.print_exception(type(outcome), outcome, outcome.__traceback__)
+            failed.append({"index": index, "id": model_id, "filename": filename, "detail": str(outcome)})
+            continue
+
+        model_ratios = outcome['model_ratios']
+        analysis = build_baseline_analysis(user_ratios, model_ratios, language)
+        analysis['result_heads'] = outcome['result_heads']
+        analysis['result_ratios'] = outcome['result_ratios']
+        entry = {
+            "index": index,
+            "id": model_id,
+            "filename": filename,
+            "similarity": proportion_similarity(user_ratios, model_ratios),
+            "analysis": analysis,
+            "model_ratios": model_ratios
+        }
+
+        encoded = outcome['encoded']
+        if response_format == "url":
+            artifact_id = save_artifacts(encoded)
+            for name in encoded:
+                entry[f"{output_field(name)}_url"] = f"/artifacts/{artifact_id}/{name}"
+        else:
+            for name, (data, media_type) in encoded.items():
+                entry[output_field(name)] = base64.b64encode(data).decode('utf-8')
+            if encodings:
+                entry['media_types'] = {output_field(name): media_type for name, (_, media_type) in encoded.items()}
+        results.append(entry)
+
+    results.sort(key=lambda entry: entry['similarity'], reverse=True)
+    for rank, entry in enumerate(results, start=1):
+        entry['rank'] = rank
+
+    return {
+        "user": {
+            "ratios": user_ratios,
+            "heads": round(1 / user_ratios.get('head_stat_ratio', 0.15), 1)
+        },
+        "results": results,
+        "failed": failed
+    }
+
+
+def parse_user_ratios_or_400(value):
+    # user_ratios_json of /catalog/nearest: an object with finite numbers for the compared ratios
+    try:
+        user_ratios = json.loads(value)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid user_ratios_json: {e}")
+    if not isinstance(user_ratios, dict):
+        raise HTTPException(status_code=400, detail="user_ratios_json must be a JSON object")
+    missing = [key for key in NEAREST_SCALES if key not in user_ratios]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"user_ratios_json is missing: {', '.join(missing)}")
+    invalid = [
+        key for key in NEAREST_SCALES
+        if isinstance(user_ratios[key], bool) or not isinstance(user_ratios[key], (int, float))
+        or not math.isfinite(user_ratios[key])
+    ]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"user_ratios_json values must be finite numbers: {', '.join(invalid)}")
+    if user_ratios['head_stat_ratio'] <= 0:
+        raise HTTPException(status_code=400, detail="user_ratios_json head_stat_ratio must be positive")
+    return user_ratios
+
+@app.post("/catalog/nearest")
+async def catalog_nearest(
+    user_image: UploadFile = File(None),
+    # Alternative to user_image: ratios from a previous analysis (meta.user_ratios)
+    user_ratios_json: str = Form(None),
+    k: int = Form(5)
+):
+    """
+    "Who actually looks like me": the k catalog models with the closest heads count,
+    leg ratio and shoulder width, searched over the memory-mapped catalog index.
+    """
+    catalog = get_catalog()
+    if catalog is None:
+        raise HTTPException(status_code=503, detail="Catalog index is not available")
+
+    if user_image is not None:
+        user_bytes = await read_upload(user_image)
+        try:
+            async with admit("cv"):
+                user_ratios = (await run_cv(decode_user_profile, user_bytes))['ratios']
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+    elif user_ratios_json:
+        user_ratios = parse_user_ratios_or_400(user_ratios_json)
+    else:
+        raise HTTPException(status_code=400, detail="Either user_image or user_ratios_json is required")
+
+    return {
+        "user": {
+            "ratios": user_ratios,
+            "heads": round(1 / user_ratios.get('head_stat_ratio', 0.15), 1)
+        },
+        "catalog_size": len(catalog),
+        "matches": catalog.nearest(user_ratios, k=k)
+    }
+
+
+async def generate_full_ai_result(cache_key, user_bytes, model_bytes, language):
+    result = await analyze_full_ai_mode(user_bytes, model_bytes, language=language)
+    save_ai_result(cache_key, result)
+    return result
+
+async def generate_pro_result(cache_key, user_bytes, model_bytes, language, visual_data):
+    # 1. Reuse the baseline result, or generate Base Assets on the fly (Vision Result)
+    #    (also when the baseline was rendered without the images Pro Mode needs)
+    if visual_data is None or any(visual_data.get(ARTIFACT_KEYS[name]) is None for name in PRO_ARTIFACTS):
+        try:
+            visual_data = await run_cv(process_image_pair, user_bytes, model_bytes, artifacts=PRO_ARTIFACTS)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+    elif is_packed_visual_data(visual_data):
+        # Stored analyses keep their images JPEG-encoded
+        visual_data = await run_cv(unpack_visual_data, visual_data)
+
+    # 2. Run Pro Analysis (Vision + AI Physics)
+    result = await run_pro_mode_analysis(user_bytes, model_bytes, visual_data, language=language)
+    save_ai_result(cache_key, result)
+    return result
+
+async def run_active_mode(mode, user_bytes, model_bytes, user_ratios, model_ratios, language, visual_data=None):
+    """
+    Runs the selected AI mode ('full_ai' or 'pro') and returns the 'active' payload {image, analysis}.
+    visual_data (Vision Mode result) is reused by Pro Mode when available.
+    """
+    # Default heads if ratios missing (fallback)
+    real_user_heads = round(1 / user_ratios.get('head_stat_ratio', 0.15), 1) if user_ratios else 0
+    real_model_heads = round(1 / model_ratios.get('head_stat_ratio', 0.15), 1) if model_ratios else 0
+    
+    generated_image = None
+    # Same pair + mode + language + prompt version: reuse the Gemini result (no quota spent),
+    # or join the identical request that is generating it right now
+    cache_key = await asyncio.to_thread(ai_result_key, mode, user_bytes, model_bytes, language)
+    cached = load_ai_result(cache_key)
+    
+    if mode == 'full_ai':
+        print("Running Active Mode: Full AI")
+        ai_vision_res = cached
+        if ai_vision_res is None:
+            ai_vision_res = await ai_flights.run(
+                cache_key, run_admitted, "ai", generate_full_ai_result, cache_key, user_bytes, model_bytes, language
+            )
+        
+        u_h = ai_vision_res.get('user_heads', real_user_heads)
+        m_h = ai_vision_res.get('model_heads', real_model_heads)
+        if u_h == 0: u_h = real_user_heads
+        if m_h == 0: m_h = real_model_heads
+        
+        generated_image = ai_vision_res.get('image') 
+
+        active_analysis = {
+            "fact_bomb": ai_vision_res.get('comment', 'AI Vision Failed'),
+            "user_heads": u_h,
+            "model_heads": m_h,
+            "result_heads": 0, 
+            "result_ratios": {},
+            "debug_user_info": ai_vision_res.get('debug_user_info', ""),
+            "debug_model_info": ai_vision_res.get('debug_model_info', ""),
+            "gen_prompt": ai_vision_res.get('gen_prompt', "")
+        }
+
+    elif mode == 'pro':
+        # Pro Mode (formerly Lab Mode) - Integrated Flow
+        print(f"Running Active Mode: Pro (Hybrid Analysis)")
+        
+        result = cached
+        if result is None:
+            result = await ai_flights.run(
+                cache_key, run_admitted, "ai", generate_pro_result, cache_key, user_bytes, model_bytes, language, visual_data
+            )
+        
+        lab_comment = result.get("comment", "No comment")
+        generated_image = result.get("image")
+        
+        active_analysis = {
+            "fact_bomb": f"[🧪 Pro Report]\n{lab_comment}",
+            "user_heads": real_user_heads,
+            "model_heads": real_model_heads,
+            "result_heads": 0, 
+            "result_ratios": {},
+            "debug_user_info": result.get("debug_user_info", ""),
+            "debug_model_info": result.get("debug_model_info", ""),
+            "gen_prompt": result.get("gen_prompt", "")
+        }
+
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown mode: {mode}")
+
+    return {
+        "image": generated_image, 
+        "analysis": active_analysis
+    }
+
+async def resolve_ai_inputs(user_image, model_image, analysis_id, user_ratios_json, model_ratios_json):
+    """
+    (user_bytes, model_bytes, user_ratios, model_ratios, visual_data) of a /process-ai request,
+    from a stored analysis (preferred) or from the uploads.
+    """
+    stored = None
+    if analysis_id:
+        stored = load_analysis(analysis_id)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Analysis expired or not found")
+        user_bytes = stored['user_bytes']
+        model_bytes = stored['model_bytes']
+        user_ratios = stored['visual_data']['user_ratios']
+        model_ratios = stored['visual_data']['model_ratios']
+    else:
+        if user_image is None or model_image is None:
+            raise HTTPException(status_code=400, detail="Either analysis_id or both images are required")
+        user_bytes = await read_upload(user_image)
+        model_bytes = await read_upload(model_image)
+        
+        # Parse ratios if provided
+        user_ratios = json.loads(user_ratios_json) if user_ratios_json else {}
+        model_ratios = json.loads(model_ratios_json) if model_ratios_json else {}
+    
+    visual_data = stored['visual_data'] if stored else None
+    return user_bytes, model_bytes, user_ratios, model_ratios, visual_data
+
+async def run_ai_request(mode, language, user_bytes, model_bytes, user_ratios, model_ratios, visual_data):
+    # /process-ai response body; also the result of a process-ai job
+    set_mode(mode)
+    active = await run_active_mode(
+        mode, user_bytes, model_bytes, user_ratios, model_ratios, language, visual_data=visual_data
+    )
+    return {"active": active}
+
 @app.post("/process-ai")
 async def process_ai(
-    user_image: UploadFile = File(...), 
-    model_image: UploadFile = File(...),
+    user_image: UploadFile = File(None), 
+    model_image: UploadFile = File(None),
     mode: str = Form(...), # 'lab', 'full_ai'
     lab_flow: str = Form(None),
-    # Receive ratios as JSON string to avoid complex parsing or re-calc
+    # Preferred: analysis id returned by /process-baseline (no re-upload, no re-calc)
+    analysis_id: str = Form(None),
+    # Legacy: images + ratios as JSON string to avoid complex parsing or re-calc
     user_ratios_json: str = Form(None), 
     model_ratios_json: str = Form(None),
     language: str = Form("ko")
 ):
     print(f"Received AI Request. Mode: {mode}")
-    import json
+    set_mode(mode)
     
     try:
-        user_bytes = await user_image.read()
-        model_bytes = await model_image.read()
-        
-        # Parse ratios if provided
-        user_ratios = json.loads(user_ratios_json) if user_ratios_json else {}
-        model_ratios = json.loads(model_ratios_json) if model_ratios_json else {}
-        
-        # Default heads if ratios missing (fallback)
-        real_user_heads = round(1 / user_ratios.get('head_stat_ratio', 0.15), 1) if user_ratios else 0
-        real_model_heads = round(1 / model_ratios.get('head_stat_ratio', 0.15), 1) if model_ratios else 0
-        
-        generated_image = None
-        
-        if mode == 'full_ai':
-            print("Running Active Mode: Full AI")
-            ai_vision_res = analyze_full_ai_mode(user_bytes, model_bytes, language=language)
-            
-            u_h = ai_vision_res.get('user_heads', real_user_heads)
-            m_h = ai_vision_res.get('model_heads', real_model_heads)
-            if u_h == 0: u_h = real_user_heads
-            if m_h == 0: m_h = real_model_heads
-            
-            generated_image = ai_vision_res.get('image') 
-
-            active_analysis = {
-                "fact_bomb": ai_vision_res.get('comment', 'AI Vision Failed'),
-                "user_heads": u_h,
-                "model_heads": m_h,
-                "result_heads": 0, 
-                "result_ratios": {},
-                "debug_user_info": ai_vision_res.get('debug_user_info', ""),
-                "debug_model_info": ai_vision_res.get('debug_model_info', ""),
-                "gen_prompt": ai_vision_res.get('gen_prompt', "")
-            }
+        inputs = await resolve_ai_inputs(user_image, model_image, analysis_id, user_ratios_json, model_ratios_json)
+        return await run_ai_request(mode, language, *inputs)
 
+    except (HTTPException, Overloaded):
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        print(f"CRITICAL ERROR: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 
-        elif mode == 'pro':
-            # Pro Mode (formerly Lab Mode) - Integrated Flow
-            print(f"Running Active Mode: Pro (Hybrid Analysis)")
-            
-            # 1. Generate Base Assets on the fly (Vision Result)
-            nparr_user = np.frombuffer(user_bytes, np.uint8)
-            img_user_cv = cv2.imdecode(nparr_user, cv2.IMREAD_COLOR)
-            nparr_model = np.frombuffer(model_bytes, np.uint8)
-            img_model_cv = cv2.imdecode(nparr_model, cv2.IMREAD_COLOR)
-            
-            visual_data = process_visuals_core(img_user_cv, img_model_cv)
-            
-            # 2. Run Pro Analysis (Vision + AI Physics)
-            result = run_pro_mode_analysis(user_bytes, model_bytes, visual_data, language=language)
-            
-            lab_comment = result.get("comment", "No comment")
-            generated_image = result.get("image")
-            
-            active_analysis = {
-                "fact_bomb": f"[🧪 Pro Report]\n{lab_comment}",
-                "user_heads": real_user_heads,
-                "model_heads": real_model_heads,
-                "result_heads": 0, 
-                "result_ratios": {},
-                "debug_user_info": result.get("debug_user_info", ""),
-                "debug_model_info": result.get("debug_model_info", ""),
-                "gen_prompt": result.get("gen_prompt", "")
-            }
+@app.post("/jobs/process-ai", status_code=202)
+async def submit_ai_job(
+    user_image: UploadFile = File(None),
+    model_image: UploadFile = File(None),
+    mode: str = Form(...), # 'full_ai', 'pro'
+    analysis_id: str = Form(None),
+    user_ratios_json: str = Form(None),
+    model_ratios_json: str = Form(None),
+    language: str = Form("ko")
+):
+    """
+    Asynchronous /process-ai: same inputs, returns a job id immediately.
+    Poll GET /jobs/{job_id} (optionally with ?wait=<seconds>), then fetch GET /jobs/{job_id}/result.
+    """
+    print(f"Received AI Job. Mode: {mode}")
+    if mode not in ('full_ai', 'pro'):
+        raise HTTPException(status_code=400, detail=f"Unknown mode: {mode}")
+    try:
+        inputs = await resolve_ai_inputs(user_image, model_image, analysis_id, user_ratios_json, model_ratios_json)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid ratios JSON: {e}")
+    job = await submit_job("process-ai", run_ai_request, mode, language, *inputs)
+    return {
+        "job_id": job['id'],
+        "status": job['status'],
+        "status_url": f"/jobs/{job['id']}",
+        "result_url": f"/jobs/{job['id']}/result"
+    }
 
-        return {
-            "active": {
-                "image": generated_image, 
-                "analysis": active_analysis
-            }
-        }
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str, wait: float = 0):
+    # wait > 0: long-poll until the job has finished (at most 30 seconds)
+    job = await get_job(job_id, wait=wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job expired or not found")
+    return job_status(job)
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job expired or not found")
+    if job['status'] == 'failed':
+        raise HTTPException(status_code=job['error']['status_code'], detail=job['error']['detail'])
+    if job['status'] != 'done':
+        # Not finished yet: same body as GET /jobs/{job_id}
+        return JSONResponse(status_code=202, content=job_status(job))
+    return job['result']
+
+@app.post("/process-stream")
+async def process_stream(
+    user_image: UploadFile = File(...),
+    model_image: UploadFile = File(...),
+    mode: str = Form("basic"), # 'basic', 'full_ai', 'pro'
+    language: str = Form("ko"),
+    # Comma separated subset of: result, user_debug, model_debug, result_debug
+    artifacts: str = Form(None)
+):
+    """
+    Progressive version of /process-baseline (+ /process-ai).
+    Streams NDJSON, one object per line, as soon as each stage finishes:
+      ratios -> result -> debug -> active (AI modes only) -> done   (or 'error')
+    """
+    print(f"Received Stream Request. Mode: {mode}")
+    set_mode(mode)
+    artifact_names = parse_artifacts_or_400(artifacts, BASELINE_DEFAULT_ARTIFACTS)
+    # Pro Mode always needs its reference images, whether or not they are streamed
+    render_names = tuple(set(artifact_names) | set(PRO_ARTIFACTS)) if mode == 'pro' else artifact_names
+    user_bytes = await read_upload(user_image)
+    model_bytes = await read_upload(model_image)
+
+    # The CV stages hold a CV lane slot (handed over to the stream, released before waiting on AI);
+    # the AI part is admitted to the AI lane by run_active_mode
+    cv_ticket = await acquire_ticket("cv")
 
-    except HTTPException as he:
-        raise he
+    # Stage 1 runs before the response starts so bad input still gets a proper 400
+    try:
+        img_user, img_model, user_profile, model_profile = await run_cv(decode_pair_profiles, user_bytes, model_bytes)
+    except ValueError as ve:
+        cv_ticket.release()
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
+        cv_ticket.release()
         traceback.print_exc()
-        print(f"CRITICAL ERROR: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Image Processing Failed: {str(e)}")
+
+    user_ratios = user_profile['ratios']
+    model_ratios = model_profile['ratios']
+
+    def line(payload):
+        return json.dumps(payload, ensure_ascii=False) + "\n"
+
+    async def stream():
+        ai_task = None
+        try:
+            # Full AI does not depend on the CV result, so start it right away
+            if mode == 'full_ai':
+                ai_task = asyncio.create_task(
+                    run_active_mode(mode, user_bytes, model_bytes, user_ratios, model_ratios, language)
+                )
+
+            yield line({
+                "stage": "ratios",
+                "analysis": build_baseline_analysis(user_ratios, model_ratios, language),
+                "meta": {"user_ratios": user_ratios, "model_ratios": model_ratios}
+            })
+
+            warp = await run_cv(warp_to_user_ratios, img_model, user_profile, model_profile)
+            result_b64 = None
+            if 'result' in artifact_names:
+                result_b64 = await run_cv(encode_img, apply_crop(warp['image'], warp['crop_bounds']))
+            yield line({
+                "stage": "result",
+                "image": result_b64,
+                "result_heads": warp['heads'],
+                "result_ratios": warp['ratios']
+            })
+
+            debug_images = await run_cv(
+                render_debug_images, img_user, img_model, user_profile, model_profile, warp, artifacts=render_names
+            )
+            debug_names = [name for name in ('user_debug', 'model_debug', 'result_debug') if name in artifact_names]
+            if debug_names:
+                encoded = await asyncio.gather(*[
+                    run_cv(encode_img, debug_images[ARTIFACT_KEYS[name]]) for name in debug_names
+                ])
+                debug_payload = {"stage": "debug"}
+                debug_payload.update({BASELINE_FIELDS[name]: data for name, data in zip(debug_names, encoded)})
+                yield line(debug_payload)
+
+            visual_data = assemble_visual_data(user_profile, model_profile, warp, debug_images, artifacts=render_names)
+            analysis_id = save_analysis(await run_cv(pack_visual_data, visual_data), user_bytes, model_bytes)
+            cv_ticket.release()
+
+            if mode == 'pro':
+                ai_task = asyncio.create_task(
+                    run_active_mode(mode, user_bytes, model_bytes, user_ratios, model_ratios, language, visual_data=visual_data)
+                )
+            if ai_task is not None:
+                yield line({"stage": "active", "active": await ai_task})
+
+            yield line({"stage": "done", "analysis_id": analysis_id})
+
+        except Exception as e:
+            traceback.print_exc()
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield line({"stage": "error", "detail": detail})
+        finally:
+            cv_ticket.release()
+            if ai_task is not None and not ai_task.done():
+                ai_task.cancel()
+
+    # X-Accel-Buffering: keep reverse proxies (nginx) from buffering the stream
+    return StreamingResponse(stream(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
@@ -0,0 +1,140 @@
+import os
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from .metrics import observe, increment, set_gauge
+
+# Admission Control
+# Requests are admitted through one of two lanes so slow AI work cannot starve the
+# sub-second Vision path:
+#   'cv' - /process-baseline, /process-batch, /catalog/nearest (image), CV stages of /process-stream
+#   'ai' - Full AI / Pro generation (/process-ai and the AI stage of /process-stream)
+# Only work that actually runs takes a slot: AI cache hits and coalesced duplicates do not.
+# Each lane runs at most <CONCURRENCY> requests; up to <QUEUE> more wait for a slot for
+# at most <MAX_WAIT> seconds. Anything beyond that is rejected right away with
+# Overloaded (HTTP 429 + Retry-After) instead of piling up behind the lane.
+#
+# CV_LANE_CONCURRENCY / AI_LANE_CONCURRENCY: requests running at once (default 8 / 4)
+# CV_LANE_QUEUE / AI_LANE_QUEUE:             requests waiting at most (default 32 / 8)
+# CV_LANE_MAX_WAIT / AI_LANE_MAX_WAIT:       max seconds in the queue (default 10 / 20)
+
+LANE_DEFAULTS = {
+    # name: (concurrency, queue, max_wait, typical request seconds for the first Retry-After)
+    "cv": (8, 32, 10.0, 1.0),
+    "ai": (4, 8, 20.0, 30.0),
+}
+
+# Weight of the latest request in the moving average of request durations
+DURATION_SMOOTHING = 0.2
+
+class Overloaded(Exception):
+    def __init__(self, lane, reason, retry_after):
+        super().__init__(f"{lane} lane overloaded ({reason}), retry after {retry_after}s")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+class Lane:
+    def __init__(self, name):
+        self.name = name
+        concurrency, queue, max_wait, duration = LANE_DEFAULTS[name]
+        prefix = f"{name.upper()}_LANE_"
+        self.concurrency = max(1, int(os.environ.get(prefix + "CONCURRENCY", concurrency)))
+        self.queue = max(0, int(os.environ.get(prefix + "QUEUE", queue)))
+        self.max_wait = float(os.environ.get(prefix + "MAX_WAIT", max_wait))
+        self.avg_duration = duration
+        self.active = 0
+        self.waiting = 0
+        self._semaphores = {}
+
+    def _semaphore(self):
+        # asyncio primitives are bound to one event loop (see ai_engine._get_semaphore)
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            self._semaphores.clear()
+            semaphore = asyncio.Semaphore(self.concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    def retry_after(self):
+        # Seconds until the queue ahead has roughly drained, from the average request duration
+        backlog = (self.waiting + 1) / self.concurrency
+        return max(1, min(120, math.ceil(backlog * self.avg_duration)))
+
+    def _publish(self):
+        set_gauge("factbomb_lane_active", self.active, lane=self.name)
+        set_gauge("factbomb_lane_queue_depth", self.waiting, lane=self.name)
+
+    def _reject(self, reason):
+        increment("factbomb_lane_rejected_total", lane=self.name, reason=reason)
+        print(f"[Admission] Rejected {self.name} request ({reason}, {self.active} active, {self.waiting} waiting)")
+        return Overloaded(self.name, reason, self.retry_after())
+
+    async def acquire(self):
+        semaphore = self._semaphore()
+        if semaphore.locked() and self.waiting >= self.queue:
+            raise self._reject("queue_full")
+
+        self.waiting += 1
+        self._publish()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            raise self._reject("deadline") from None
+        finally:
+            self.waiting -= 1
+            observe("factbomb_lane_wait_seconds", time.perf_counter() - start, lane=self.name)
+        self.active += 1
+        self._publish()
+        return time.perf_counter()
+
+    def release(self, started):
+        duration = time.perf_counter() - started
+        self.avg_duration += DURATION_SMOOTHING * (duration - self.avg_duration)
+        self.active -= 1
+        self._semaphore().release()
+        self._publish()
+
+_lanes = {}
+
+def get_lane(name):
+    lane = _lanes.get(name)
+    if lane is None:
+        lane = _lanes[name] = Lane(name)
+    return lane
+
+class Ticket:
+    """
+    A held lane slot. release() is idempotent, so a slot handed over to a streaming
+    response can be released early and again when the stream ends.
+    """
+    def __init__(self, lane, started):
+        self.lane = lane
+        self.started = started
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.lane.release(self.started)
+
+async def acquire_ticket(name):
+    # Raises Overloaded when the lane is saturated
+    lane = get_lane(name)
+    return Ticket(lane, await lane.acquire())
+
+@asynccontextmanager
+async def admit(name):
+    ticket = await acquire_ticket(name)
+    try:
+        yield ticket
+    finally:
+        ticket.release()
+
+async def run_admitted(name, fn, *args, **kwargs):
+    # Awaits fn(*args, **kwargs) inside a slot of the lane
+    async with admit(name):
+        return await fn(*args, **kwargs)
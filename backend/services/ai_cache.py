@@ -0,0 +1,53 @@
+import os
+from .cache import TieredCache, content_hash
+from .mode_ai import PROMPT_VERSION as FULL_AI_PROMPT_VERSION
+from .mode_pro import PROMPT_VERSION as PRO_PROMPT_VERSION
+
+# Cache of AI Mode results (Full AI / Pro): the parsed Gemini analysis, the generation
+# prompt and the generated image. Retries and page reloads of the same pair then skip
+# both paid Gemini calls (and Pro Mode's Vision pipeline).
+# Keyed by the content hashes of both images + mode + language + the mode's PROMPT_VERSION,
+# so editing a prompt (and bumping its version) never serves results of the old one.
+# Only results with a generated image are cached; errors and mock responses are not.
+#
+# AI_CACHE_SIZE:        max results kept in memory (default 128, 0 disables the cache)
+# AI_CACHE_TTL_SECONDS: how long a result is reused (default 86400)
+# AI_CACHE_DIR:         optional directory for the disk tier (shared across workers and restarts)
+
+PROMPT_VERSIONS = {
+    "full_ai": FULL_AI_PROMPT_VERSION,
+    "pro": PRO_PROMPT_VERSION,
+}
+
+_cache = None
+
+def get_ai_cache():
+    global _cache
+    if _cache is None:
+        _cache = TieredCache(
+            "ai_results",
+            max_entries=int(os.environ.get("AI_CACHE_SIZE", "128")),
+            ttl=float(os.environ.get("AI_CACHE_TTL_SECONDS", "86400")),
+            disk_dir=os.environ.get("AI_CACHE_DIR") or None
+        )
+    return _cache
+
+def is_ai_cache_enabled():
+    return int(os.environ.get("AI_CACHE_SIZE", "128")) > 0
+
+def ai_result_key(mode, user_bytes, model_bytes, language):
+    # Hashes the (possibly multi-MB) uploads; call off the event loop
+    parts = [mode, str(PROMPT_VERSIONS.get(mode)), language, content_hash(user_bytes), content_hash(model_bytes)]
+    return content_hash(":".join(parts).encode("utf-8"))
+
+def load_ai_result(key):
+    if not is_ai_cache_enabled():
+        return None
+    result = get_ai_cache().get(key)
+    if result is not None:
+        print(f"[AI Cache] Hit {key[:12]}")
+    return result
+
+def save_ai_result(key, result):
+    if is_ai_cache_enabled() and result and result.get("image"):
+        get_ai_cache().put(key, result)
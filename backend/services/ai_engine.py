@@ -1,20 +1,108 @@
-
 import os
-from google import genai
-from google.genai import types
+import io
+import random
+import asyncio
+import threading
+import PIL.Image
 import base64
-import time
 from dotenv import load_dotenv
+from .metrics import span, count
 
 # Load environment variables
 load_dotenv()
 
+# Async Gemini Engine
+# One long-lived client per process, async calls (client.aio), a per-process
+# concurrency limit and non-blocking exponential backoff with jitter on 429s.
+# The google-genai SDK is imported on first use to keep process start fast.
+#
+# GEMINI_MAX_CONCURRENCY: max in-flight Gemini calls per process (default 4)
+# GEMINI_MAX_RETRIES:     attempts per call on rate limit errors (default 3)
+# GEMINI_BACKOFF_BASE:    base backoff in seconds, doubled each retry (default 10)
+
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+_semaphores = {}
+
 def get_gemini_client():
-    if os.environ.get("GEMINI_API_KEY"):
-        return genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
-    return None
+    global _client, _client_key
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        return None
+    if _client is None or _client_key != api_key:
+        with _client_lock:
+            if _client is None or _client_key != api_key:
+                from google import genai
+                _client = genai.Client(api_key=api_key)
+                _client_key = api_key
+    return _client
+
+def _get_semaphore():
+    # asyncio primitives are bound to one event loop, so keep one semaphore per loop
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        _semaphores.clear()
+        semaphore = asyncio.Semaphore(int(os.environ.get("GEMINI_MAX_CONCURRENCY", "4")))
+        _semaphores[loop] = semaphore
+    return semaphore
+
+def is_rate_limit_error(e):
+    # Basic check for 429 or Resource Exhausted
+    return "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e)
+
+def _prepare_contents(contents):
+    # PIL -> PNG happens here (off the event loop) instead of inside the SDK call
+    from google.genai import types
+    prepared = []
+    for item in contents:
+        if isinstance(item, PIL.Image.Image):
+            buffer = io.BytesIO()
+            item.save(buffer, "PNG")
+            prepared.append(types.Part.from_bytes(data=buffer.getvalue(), mime_type="image/png"))
+        else:
+            prepared.append(item)
+    return prepared
+
+async def generate_content_async(model, contents, config=None):
+    """
+    Awaitable generate_content with bounded concurrency and asyncio backoff.
+    Raises on missing API key or when retries are exhausted.
+    """
+    client = get_gemini_client()
+    if not client:
+        raise RuntimeError("Missing GEMINI_API_KEY")
+
+    contents = await asyncio.to_thread(_prepare_contents, contents)
+    max_retries = int(os.environ.get("GEMINI_MAX_RETRIES", "3"))
+    backoff_base = float(os.environ.get("GEMINI_BACKOFF_BASE", "10"))
+
+    for attempt in range(max_retries):
+        try:
+            async with _get_semaphore():
+                with span("gemini"):
+                    return await client.aio.models.generate_content(
+                        model=model,
+                        contents=contents,
+                        config=config
+                    )
+        except Exception as e:
+            rate_limited = is_rate_limit_error(e)
+            if rate_limited:
+                count("factbomb_gemini_rate_limited_total", model=model)
+            if rate_limited and attempt < max_retries - 1:
+                # Sleep outside the semaphore so other calls can proceed meanwhile
+                wait_time = (2 ** attempt) * backoff_base * random.uniform(0.5, 1.5)
+                print(f"[Gemini Core] Rate limit hit. Retrying in {wait_time:.1f}s...")
+                count("factbomb_gemini_retries_total", model=model)
+                with span("gemini_backoff"):
+                    await asyncio.sleep(wait_time)
+                continue
+            count("factbomb_gemini_errors_total", model=model)
+            raise
 
-def generate_gemini_image(prompt, reference_images=None):
+async def generate_gemini_image(prompt, reference_images=None):
     """
     Generates an image using Gemini 3 (gemini-3-pro-image-preview).
     Supports reference images.
@@ -23,48 +111,24 @@ def generate_gemini_image(prompt, reference_images=None):
          return None, "Missing GEMINI_API_KEY in .env"
 
     try:
-        # Initialize the new client
-        client = get_gemini_client()
-        if not client:
-             return None, "Missing GEMINI_API_KEY"
-        
         print(f"[Gemini Core] Generating Image... Prompt: {prompt[:50]}...")
-        
+
         # Prepare contents
         contents = [prompt]
         if reference_images:
-             # The new SDK handles PIL Images directly in the list
              print(f"[Gemini Core] Including {len(reference_images)} reference images.")
              contents.extend(reference_images)
 
         # Use gemini-3-pro-image-preview
         model_name = "gemini-3-pro-image-preview"
 
-        response = None
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                # Configure for image generation
-                config = genai.types.GenerateContentConfig(
-                    response_modalities=["TEXT", "IMAGE"]
-                )
-                
-                response = client.models.generate_content(
-                    model=model_name,
-                    contents=contents,
-                    config=config
-                )
-                break
-            except Exception as e:
-                # Basic check for 429 or Resource Exhausted
-                if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                    if attempt < max_retries - 1:
-                        wait_time = (2 ** attempt) * 10 
-                        print(f"[Gemini Core] Rate limit hit. Retrying in {wait_time}s...")
-                        time.sleep(wait_time)
-                        continue
-                raise e
-        
+        # Configure for image generation
+        from google.genai import types
+        config = types.GenerateContentConfig(
+            response_modalities=["TEXT", "IMAGE"]
+        )
+        response = await generate_content_async(model_name, contents, config=config)
+
         # Extract image from response parts
         if response.parts:
             for part in response.parts:
@@ -72,7 +136,7 @@ def generate_gemini_image(prompt, reference_images=None):
                     image_bytes = part.inline_data.data
                     print(f"[Gemini Core] Image generated successfully. Size: {len(image_bytes)} bytes")
                     return base64.b64encode(image_bytes).decode("utf-8"), None
-        
+
         return None, "No image found in Gemini response."
 
     except Exception as e:
@@ -0,0 +1,48 @@
+import os
+import secrets
+from .cache import TieredCache
+
+# Server-side store of Vision Mode results.
+# /process-baseline saves its visual_data here and returns an opaque analysis id,
+# so /process-ai can reuse it instead of re-uploading the images and re-running the CV pipeline.
+# visual_data is stored packed (see mode_vision.pack_visual_data): ratios, landmarks and
+# JPEG-encoded images, never decoded pixels.
+#
+# ANALYSIS_TTL_SECONDS:     how long an analysis stays available (default 600)
+# ANALYSIS_STORE_SIZE:      maximum number of stored analyses (default 64, LRU eviction)
+# ANALYSIS_STORE_MAX_BYTES: memory budget for the uploads and images of all stored analyses (default 256 MB)
+
+_store = None
+
+def get_analysis_store():
+    global _store
+    if _store is None:
+        _store = TieredCache(
+            "analysis",
+            max_entries=int(os.environ.get("ANALYSIS_STORE_SIZE", "64")),
+            ttl=float(os.environ.get("ANALYSIS_TTL_SECONDS", "600")),
+            max_bytes=int(os.environ.get("ANALYSIS_STORE_MAX_BYTES", 256 * 1024 * 1024)),
+            sizeof=analysis_size
+        )
+    return _store
+
+def analysis_size(entry):
+    # Bytes held by one entry: the uploads and the encoded images (ratios and landmarks are negligible)
+    values = [entry["user_bytes"], entry["model_bytes"], *entry["visual_data"].values()]
+    return sum(len(value) for value in values if isinstance(value, bytes))
+
+def save_analysis(visual_data, user_bytes, model_bytes):
+    # visual_data must be packed (mode_vision.pack_visual_data)
+    analysis_id = secrets.token_urlsafe(16)
+    get_analysis_store().put(analysis_id, {
+        "visual_data": visual_data,
+        "user_bytes": user_bytes,
+        "model_bytes": model_bytes
+    })
+    return analysis_id
+
+def load_analysis(analysis_id):
+    # Returns {visual_data, user_bytes, model_bytes} or None if unknown / expired
+    if not analysis_id:
+        return None
+    return get_analysis_store().get(analysis_id)
@@ -0,0 +1,44 @@
+import os
+import secrets
+from .cache import TieredCache
+
+# Short-lived store of encoded result images for binary delivery.
+# Served as raw bytes by GET /artifacts/{artifact_id}/{name}.
+#
+# ARTIFACT_TTL_SECONDS:     how long artifacts stay downloadable (default 300)
+# ARTIFACT_STORE_SIZE:      maximum number of stored artifact sets (default 128, LRU eviction)
+# ARTIFACT_STORE_MAX_BYTES: memory budget for the encoded images of all stored sets (default 128 MB)
+
+_store = None
+
+def get_artifact_ttl():
+    return int(os.environ.get("ARTIFACT_TTL_SECONDS", "300"))
+
+def get_artifact_store():
+    global _store
+    if _store is None:
+        _store = TieredCache(
+            "artifacts",
+            max_entries=int(os.environ.get("ARTIFACT_STORE_SIZE", "128")),
+            ttl=get_artifact_ttl(),
+            max_bytes=int(os.environ.get("ARTIFACT_STORE_MAX_BYTES", 128 * 1024 * 1024)),
+            sizeof=artifacts_size
+        )
+    return _store
+
+def artifacts_size(artifacts):
+    # Bytes held by one artifact set: the encoded images
+    return sum(len(data) for data, media_type in artifacts.values())
+
+def save_artifacts(artifacts):
+    # artifacts: {name: (bytes, media_type)}. Returns the artifact set id.
+    artifact_id = secrets.token_urlsafe(16)
+    get_artifact_store().put(artifact_id, dict(artifacts))
+    return artifact_id
+
+def load_artifact(artifact_id, name):
+    # Returns (bytes, media_type) or None if unknown / expired
+    artifacts = get_artifact_store().get(artifact_id)
+    if not artifacts:
+        return None
+    return artifacts.get(name)
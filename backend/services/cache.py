@@ -0,0 +1,145 @@
+import os
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from .metrics import count
+
+def content_hash(data):
+    # Stable cache key for uploaded bytes
+    return hashlib.sha256(data).hexdigest()
+
+class TieredCache:
+    """
+    Thread-safe LRU cache with an optional TTL and an optional on-disk tier.
+    The memory tier is bounded by max_entries and, with sizeof (value -> bytes), by
+    max_bytes; an entry larger than max_bytes is not kept. The disk tier (pickle files under disk_dir)
+    survives restarts and is shared by every worker process pointing at the same directory.
+    Keys must be filesystem-safe strings (e.g. content hashes).
+    """
+    def __init__(self, name, max_entries=256, ttl=None, disk_dir=None, max_bytes=None, sizeof=None):
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.max_bytes = max_bytes if sizeof is not None else None
+        self.sizeof = sizeof
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value, _ = entry
+                if self.ttl is None or now - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    count("factbomb_cache_requests_total", cache=self.name, result="hit")
+                    return value
+                self._remove(key)
+
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is not None:
+                self.disk_hits += 1
+                self._store(key, value, now)
+            else:
+                self.misses += 1
+        count("factbomb_cache_requests_total", cache=self.name, result="disk_hit" if value is not None else "miss")
+        return value if value is not None else default
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._store(key, value, now)
+        self._write_disk(key, value)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._remove(key)
+        path = self._disk_path(key)
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return entry[1] if entry is not None else default
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "bytes": self.total_bytes,
+            }
+
+    def _store(self, key, value, now):
+        # Caller holds the lock
+        self._remove(key)
+        size = self.sizeof(value) if self.sizeof is not None else 0
+        if self.max_bytes and size > self.max_bytes:
+            print(f"[Cache:{self.name}] Entry of {size} bytes exceeds max_bytes {self.max_bytes}, not kept in memory")
+            return
+        self._entries[key] = (now, value, size)
+        self.total_bytes += size
+        while len(self._entries) > self.max_entries or (self.max_bytes and self.total_bytes > self.max_bytes):
+            self.total_bytes -= self._entries.popitem(last=False)[1][2]
+
+    def _remove(self, key):
+        # Caller holds the lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+        return entry
+
+    def _disk_path(self, key):
+        if not self.disk_dir:
+            return None
+        return os.path.join(self.disk_dir, key[:2], f"{key}.pkl")
+
+    def _read_disk(self, key, now):
+        path = self._disk_path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            if self.ttl is not None and now - os.path.getmtime(path) >= self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"[Cache:{self.name}] Disk read failed for {key}: {e}")
+            return None
+
+    def _write_disk(self, key, value):
+        path = self._disk_path(key)
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"[Cache:{self.name}] Disk write failed for {key}: {e}")
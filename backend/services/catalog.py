@@ -0,0 +1,224 @@
+import os
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .cache import content_hash
+from .cv_utils import decode_work_image, get_work_max_side, get_decode_max_side, get_detection_max_side
+from .mode_vision import extract_body_profile
+from .ratio_engine import (
+    LANDMARK_COLUMNS, RATIO_COLUMNS, landmarks_to_array, ratios_to_array,
+    ratios_to_dicts, proportion_distances
+)
+
+# Catalog Proportion Index
+# Built offline by scripts/build_catalog_index.py from a directory of model photos:
+#   <name>.npy  - (N, len(LANDMARK_COLUMNS) + len(RATIO_COLUMNS)) float64 rows, memory-mapped at load
+#   <name>.json - sidecar with the column names, the image root and one {id, path, hash} per row
+# Model ids are the first 16 hex digits of the image's SHA-256, so re-ingestion keeps them stable.
+#
+# CATALOG_INDEX_PATH: path to the .npy index, loaded at startup (optional)
+# CATALOG_IMAGE_ROOT: overrides the image root recorded in the sidecar (e.g. after moving the photos)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+INDEX_COLUMNS = LANDMARK_COLUMNS + RATIO_COLUMNS
+INDEX_VERSION = 1
+
+# Nearest-neighbour features: heads count, leg ratio and shoulder width (in heads)
+NEAREST_SCALES = {
+    'head_stat_ratio': 0.02,
+    'legs': 0.05,
+    'shoulder_heads': 0.3,
+}
+
+def sidecar_path(index_path):
+    return os.path.splitext(index_path)[0] + '.json'
+
+def find_catalog_images(root):
+    # Relative paths (with '/') of every image below root, in a stable order
+    found = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                found.append(os.path.relpath(os.path.join(directory, name), root).replace(os.sep, '/'))
+    return sorted(found)
+
+def profile_catalog_image(root, rel_path):
+    """
+    Ingestion worker: pose + face detection and ratios for one catalog photo.
+    Returns {path, hash, row} with row laid out as INDEX_COLUMNS, or None if the photo is
+    unreadable, too large (MAX_IMAGE_PIXELS) or no body was found, so one bad file does not
+    abort the ingestion.
+    """
+    try:
+        with open(os.path.join(root, rel_path), 'rb') as f:
+            data = f.read()
+        img = decode_work_image(data)
+    except (OSError, ValueError) as e:
+        print(f"[Catalog] Skipping {rel_path}: {e}")
+        return None
+    if img is None:
+        return None
+    image_hash = content_hash(data)
+    profile = extract_body_profile(img, cache_key=image_hash)
+    if not profile:
+        return None
+    row = np.concatenate([
+        landmarks_to_array([profile['landmarks']], [profile['head_height']])[0],
+        ratios_to_array([profile['ratios']])[0]
+    ])
+    return {"path": rel_path, "hash": image_hash, "row": row}
+
+def write_catalog_index(index_path, root, records):
+    """
+    Writes the memory-mappable .npy and its JSON sidecar.
+    Both are written to temporary files first so a running server never sees a partial index.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+    tmp_index = index_path + '.tmp.npy'
+    data = np.lib.format.open_memmap(tmp_index, mode='w+', dtype=np.float64, shape=(len(records), len(INDEX_COLUMNS)))
+    for i, record in enumerate(records):
+        data[i] = record['row']
+    data.flush()
+    del data
+    os.replace(tmp_index, index_path)
+
+    meta = {
+        "version": INDEX_VERSION,
+        "columns": list(INDEX_COLUMNS),
+        "landmark_columns": len(LANDMARK_COLUMNS),
+        "root": os.path.abspath(root),
+        "work_max_side": get_work_max_side(),
+        "decode_max_side": get_decode_max_side(),
+        "detection_max_side": get_detection_max_side(),
+        "models": [
+            {"id": record['hash'][:16], "path": record['path'], "hash": record['hash']}
+            for record in records
+        ]
+    }
+    tmp_sidecar = sidecar_path(index_path) + '.tmp'
+    with open(tmp_sidecar, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_sidecar, sidecar_path(index_path))
+
+def build_catalog_index(root, index_path, workers=None):
+    """
+    Profiles every image below root across worker processes and writes the index.
+    Identical photos (same content hash) are indexed once.
+    Returns (indexed_count, skipped_paths).
+    """
+    paths = find_catalog_images(root)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(paths) > 1:
+        # 'spawn' avoids inheriting MediaPipe/TFLite state from the parent (see cv_pool)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results = list(executor.map(profile_catalog_image, [root] * len(paths), paths, chunksize=4))
+    else:
+        results = [profile_catalog_image(root, path) for path in paths]
+
+    records = []
+    seen = set()
+    skipped = []
+    for path, record in zip(paths, results):
+        if record is None:
+            skipped.append(path)
+        elif record['hash'] not in seen:
+            seen.add(record['hash'])
+            records.append(record)
+    write_catalog_index(index_path, root, records)
+    return len(records), skipped
+
+class CatalogIndex:
+    """
+    Read-only view of a catalog index. The .npy is memory-mapped (zero-copy), so the
+    ratio matrix is paged in by the OS on first use and shared between worker processes.
+    """
+    def __init__(self, index_path):
+        with open(sidecar_path(index_path), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION or tuple(meta.get("columns", ())) != INDEX_COLUMNS:
+            raise ValueError(f"Catalog index {index_path} was built with a different layout, rebuild it")
+
+        self.path = index_path
+        self.data = np.load(index_path, mmap_mode='r')
+        self.models = meta['models']
+        self.root = os.environ.get("CATALOG_IMAGE_ROOT") or meta['root']
+        self.positions = {model['id']: i for i, model in enumerate(self.models)}
+        split = meta['landmark_columns']
+        self.landmarks = self.data[:, :split]
+        self.ratios = self.data[:, split:]
+
+    def __len__(self):
+        return len(self.models)
+
+    def __contains__(self, model_id):
+        return model_id in self.positions
+
+    def image_path(self, model_id):
+        return os.path.join(self.root, self.models[self.positions[model_id]]['path'])
+
+    def read_image(self, model_id):
+        with open(self.image_path(model_id), 'rb') as f:
+            return f.read()
+
+    def nearest(self, user_ratios, k=5, scales=NEAREST_SCALES):
+        """
+        The k catalog models whose proportions are closest to user_ratios,
+        as [{id, path, distance, similarity, heads, ratios}], closest first.
+        """
+        count = len(self)
+        k = max(0, min(k, count))
+        if k == 0:
+            return []
+        distances = proportion_distances(user_ratios, self.ratios, scales=scales)
+        positions = np.argpartition(distances, k - 1)[:k] if k < count else np.arange(count)
+        positions = positions[np.argsort(distances[positions], kind='stable')]
+
+        matches = []
+        for position, ratios in zip(positions.tolist(), ratios_to_dicts(self.ratios[positions])):
+            distance = float(distances[position])
+            head_ratio = ratios['head_stat_ratio']
+            matches.append({
+                "id": self.models[position]['id'],
+                "path": self.models[position]['path'],
+                "distance": round(distance, 4),
+                "similarity": round(1 / (1 + distance), 4),
+                "heads": round(1 / head_ratio, 1) if head_ratio > 0 else 0,
+                "ratios": ratios
+            })
+        return matches
+
+_catalog = None
+_catalog_path = None
+# (path, mtime) of the last index that failed to load, so it is not retried on every request
+_failed_index = None
+
+def _index_mtime(index_path):
+    try:
+        return os.path.getmtime(index_path)
+    except OSError:
+        return None
+
+def get_catalog():
+    """
+    The catalog index from CATALOG_INDEX_PATH (loaded once), or None when not configured
+    or not loadable. A failed load is retried only once the index file changes.
+    """
+    global _catalog, _catalog_path, _failed_index
+    index_path = os.environ.get("CATALOG_INDEX_PATH")
+    if not index_path:
+        return None
+    if _catalog is None or _catalog_path != index_path:
+        attempt = (index_path, _index_mtime(index_path))
+        if attempt == _failed_index:
+            return None
+        try:
+            _catalog = CatalogIndex(index_path)
+            _catalog_path = index_path
+            _failed_index = None
+            print(f"[Catalog] Loaded {len(_catalog)} models from {index_path}")
+        except (OSError, ValueError) as e:
+            _failed_index = attempt
+            print(f"[Catalog] Could not load {index_path}: {e}")
+            return None
+    return _catalog
@@ -0,0 +1,65 @@
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from .metrics import run_collecting, replay
+from .profiling import is_profiling, run_profiled, add_worker_stats
+
+# CV Worker Pool
+# MediaPipe inference, decoding, warping and encoding are CPU bound and would
+# otherwise block the uvicorn event loop. All of it runs here instead.
+#
+# CV_POOL_MODE:    'thread' (default) or 'process'
+# CV_POOL_WORKERS: number of workers (default: CPU count)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_pool_config():
+    mode = os.environ.get("CV_POOL_MODE", "thread").lower()
+    if mode not in ("thread", "process"):
+        mode = "thread"
+    workers = int(os.environ.get("CV_POOL_WORKERS", "0") or 0)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return mode, workers
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                mode, workers = get_pool_config()
+                if mode == "process":
+                    # 'spawn' avoids inheriting MediaPipe/TFLite state from the parent
+                    _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cv-worker")
+                print(f"[CV Pool] Started {mode} pool with {workers} workers")
+    return _executor
+
+async def run_cv(fn, *args, **kwargs):
+    """
+    Runs a CPU-bound CV task on the worker pool and awaits its result.
+    In 'process' mode, fn, its arguments and its return value must be picklable.
+    Metrics spans recorded inside fn come back with the result and count towards the current request.
+    When the request is being profiled, fn is profiled in the worker as well.
+    """
+    loop = asyncio.get_running_loop()
+    profiled = is_profiling()
+    task = partial(run_collecting, run_profiled, (fn, args, kwargs), {}) if profiled else partial(run_collecting, fn, args, kwargs)
+    result, events = await loop.run_in_executor(get_executor(), task)
+    replay(events)
+    if profiled:
+        result, stats = result
+        add_worker_stats(stats)
+    return result
+
+def shutdown_pool():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
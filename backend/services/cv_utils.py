@@ -1,24 +1,158 @@
 
+import os
+import threading
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Optional
 import cv2
 import numpy as np
-import mediapipe as mp
+from .metrics import span
 
-# Initialize MediaPipe
-mp_face_detection = mp.solutions.face_detection
-face_detection = mp_face_detection.FaceDetection(model_selection=1, min_detection_confidence=0.5)
+# MediaPipe takes about a second to import, so it is imported on first use
+# (or by warm_up_detectors at startup) instead of when this module is loaded.
+def get_mediapipe():
+    import mediapipe
+    return mediapipe
 
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(static_image_mode=True, model_complexity=1, min_detection_confidence=0.5)
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
+# MediaPipe graphs are not safe to share between concurrent callers.
+# Every worker thread (and every worker process) builds its own instances on first use.
+_detectors = threading.local()
 
-def detect_face_bounds(image):
+def get_face_detector():
+    detector = getattr(_detectors, 'face_detection', None)
+    if detector is None:
+        detector = get_mediapipe().solutions.face_detection.FaceDetection(model_selection=1, min_detection_confidence=0.5)
+        _detectors.face_detection = detector
+    return detector
+
+def get_pose_detector():
+    detector = getattr(_detectors, 'pose', None)
+    if detector is None:
+        detector = get_mediapipe().solutions.pose.Pose(static_image_mode=True, model_complexity=1, min_detection_confidence=0.5)
+        _detectors.pose = detector
+    return detector
+
+def warm_up_detectors(size=256):
+    """
+    Builds this worker's detectors and runs one dummy inference through each graph,
+    so the first real request does not pay for model loading and graph initialization.
+    """
+    rgb = np.zeros((size, size, 3), dtype=np.uint8)
+    get_pose_detector().process(rgb)
+    get_face_detector().process(rgb)
+
+# JPEG start-of-frame markers (baseline, progressive, ...), which carry the image size
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# libjpeg scales while decoding (DCT scaling), so these skip most of the full-size work and memory
+REDUCED_DECODE_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+# A reduced decode may come out this much below max_side (e.g. an 8000 px photo decoded at 1/2
+# for a 4096 px working side) instead of falling back to the full-resolution decode
+REDUCED_DECODE_MIN_FRACTION = 0.9
+
+def image_dimensions(data):
+    """
+    (width, height) read from the JPEG / PNG header without decoding, or None for
+    other formats and headers that cannot be parsed. Before EXIF orientation.
+    """
+    if data[:8] == PNG_SIGNATURE and data[12:16] == b"IHDR":
+        return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+    if data[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 9 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # Fill byte
+            pos += 1
+            continue
+        if marker in (0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7):
+            # Markers without a length
+            pos += 2
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            return int.from_bytes(data[pos + 7:pos + 9], "big"), int.from_bytes(data[pos + 5:pos + 7], "big")
+        pos += 2 + int.from_bytes(data[pos + 2:pos + 4], "big")
+    return None
+
+def get_max_image_pixels():
+    # MAX_IMAGE_PIXELS: images with more pixels are rejected before decoding (0 = no limit)
+    return int(os.environ.get("MAX_IMAGE_PIXELS", "100000000") or 0)
+
+def decode_image(data, max_side=None):
+    """
+    Returns a BGR image or None if the bytes are not a valid image.
+    With max_side, JPEGs much larger than needed are decoded at 1/2, 1/4 or 1/8 scale
+    (the largest reduction whose longest side is still at least 90% of max_side), so the
+    full-resolution bitmap is never allocated. Raises ValueError for images over MAX_IMAGE_PIXELS.
+    """
+    size = image_dimensions(data)
+    max_pixels = get_max_image_pixels()
+    if size is not None and max_pixels and size[0] * size[1] > max_pixels:
+        raise ValueError(f"Image is too large ({size[0]}x{size[1]}, max {max_pixels} pixels)")
+
+    flags = cv2.IMREAD_COLOR
+    if max_side and size is not None and data[:2] == b"\xff\xd8":
+        for factor, reduced in REDUCED_DECODE_FLAGS:
+            if max(size) / factor >= max_side * REDUCED_DECODE_MIN_FRACTION:
+                flags = reduced
+                break
+    nparr = np.frombuffer(data, np.uint8)
+    with span("decode"):
+        return cv2.imdecode(nparr, flags)
+
+def get_detection_max_side():
+    # DETECTION_MAX_SIDE: longest side of the detection proxy image (0 = full resolution)
+    return int(os.environ.get("DETECTION_MAX_SIDE", "1024") or 0)
+
+def get_work_max_side():
+    # WORK_MAX_SIDE: longest side for warping / debug rendering (0 = full resolution)
+    return int(os.environ.get("WORK_MAX_SIDE", "0") or 0)
+
+def get_decode_max_side():
+    # Longest side images are decoded to: WORK_MAX_SIDE, or MAX_DECODE_SIDE when that is 0
+    # (default 0 = full resolution). Either one also caps the resolution of the output images.
+    return get_work_max_side() or int(os.environ.get("MAX_DECODE_SIDE", "0") or 0)
+
+def decode_work_image(data):
+    # decode_image() at the working resolution: reduced decode, then the exact downscale
+    img = decode_image(data, max_side=get_decode_max_side())
+    if img is None:
+        return None
+    return limit_resolution(img, get_decode_max_side())
+
+def limit_resolution(image, max_side, interpolation=cv2.INTER_AREA):
+    # Downscales so the longest side is at most max_side (never upscales)
+    h, w = image.shape[:2]
+    if not max_side or max(h, w) <= max_side:
+        return image
+    scale = max_side / max(h, w)
+    size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+    return cv2.resize(image, size, interpolation=interpolation)
+
+def to_detection_rgb(image, max_side=None):
+    # MediaPipe returns normalized coordinates, so detecting on a smaller proxy
+    # maps back to the original pixel grid simply by using the original h/w.
+    # Bilinear matches MediaPipe's own input resize and is ~20x cheaper than INTER_AREA here.
+    if max_side is None:
+        max_side = get_detection_max_side()
+    return cv2.cvtColor(limit_resolution(image, max_side, interpolation=cv2.INTER_LINEAR), cv2.COLOR_BGR2RGB)
+
+def detect_face_bounds(image, max_side=None):
     # Returns {top, bottom, height} or None
-    results = face_detection.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    rgb = to_detection_rgb(image, max_side)
+    with span("face"):
+        results = get_face_detector().process(rgb)
+    h, w, _ = image.shape
+    return face_bounds_from_results(results, h, w)
+
+def face_bounds_from_results(results, h, w):
+    # FaceDetection results -> {top, bottom, height, raw_box} in the h x w pixel grid, or None
     if not results.detections:
         return None
     
-    h, w, _ = image.shape
     # Use the first detection (usually the main person)
     detection = results.detections[0]
     bboxC = detection.location_data.relative_bounding_box
@@ -42,12 +176,18 @@ def detect_face_bounds(image):
         'raw_box': (int(bboxC.xmin * w), ymin, int(bboxC.width * w), height)
     }
 
-def get_landmarks_with_results(image):
-    results = pose.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+def get_landmarks_with_results(image, max_side=None):
+    rgb = to_detection_rgb(image, max_side)
+    with span("pose"):
+        results = get_pose_detector().process(rgb)
+    h, w, _ = image.shape
+    return pose_landmarks_from_results(results, h, w), (results if results.pose_landmarks else None)
+
+def pose_landmarks_from_results(results, h, w):
+    # Pose results -> landmark dict in the h x w pixel grid, or None when no body was found
     if not results.pose_landmarks:
-        return None, None
+        return None
     
-    h, w, _ = image.shape
     landmarks = {}
     lm = results.pose_landmarks.landmark
     
@@ -99,7 +239,84 @@ def get_landmarks_with_results(image):
     landmarks['max_x'] = int(max(xs) * w)
     landmarks['nose_x'] = int(results.pose_landmarks.landmark[0].x * w)
 
-    return landmarks, results
+    return landmarks
+
+@dataclass
+class BodyDetection:
+    """
+    Result of the fused pose + face pass on one image (see detect_body).
+    landmarks / face use the get_landmarks_with_results / detect_face_bounds formats.
+    """
+    landmarks: Optional[dict] = None
+    pose_results: Any = None
+    face: Optional[dict] = None
+
+    @property
+    def found(self):
+        return self.landmarks is not None
+
+    def head_estimate(self):
+        """
+        Landmarks with the head taken from the face box when there is one
+        (top_y, chin_y, face_width), and the precise head height for
+        calculate_body_ratios (None falls back to the eye-based estimate there).
+        """
+        landmarks = dict(self.landmarks)
+        if self.face:
+            landmarks['top_y'] = self.face['top']
+            landmarks['chin_y'] = self.face['bottom']
+            landmarks['face_width'] = self.face['raw_box'][2]
+            return landmarks, self.face['height']
+        landmarks['face_width'] = int(abs(landmarks['eye_y'] - landmarks['nose_y']) * 4)
+        return landmarks, None
+
+def detect_body(image, max_side=None, face=True):
+    """
+    Fused detector: one proxy resize and one BGR->RGB conversion, shared by the pose and
+    face graphs. The face graph is skipped when no body was found (or face=False).
+    """
+    rgb = to_detection_rgb(image, max_side)
+    # Read-only input lets MediaPipe wrap the buffer instead of copying it
+    rgb.flags.writeable = False
+    h, w = image.shape[:2]
+
+    with span("pose"):
+        pose_results = get_pose_detector().process(rgb)
+    landmarks = pose_landmarks_from_results(pose_results, h, w)
+    if landmarks is None:
+        return BodyDetection()
+    face_bounds = None
+    if face:
+        with span("face"):
+            face_results = get_face_detector().process(rgb)
+        face_bounds = face_bounds_from_results(face_results, h, w)
+    return BodyDetection(landmarks=landmarks, pose_results=pose_results, face=face_bounds)
+
+def pose_points(results):
+    # Plain (x, y, z, visibility, presence) tuples of the normalized pose landmarks (picklable / cacheable)
+    # Unset optional fields are kept as None so drawing filters behave exactly like on the original results
+    if not results or not results.pose_landmarks:
+        return None
+    return [
+        (lm.x, lm.y, lm.z,
+         lm.visibility if lm.HasField('visibility') else None,
+         lm.presence if lm.HasField('presence') else None)
+        for lm in results.pose_landmarks.landmark
+    ]
+
+def pose_results_from_points(points):
+    # Rebuilds a results-like object usable by draw_skeleton / get_crop_bounds
+    if not points:
+        return SimpleNamespace(pose_landmarks=None)
+    from mediapipe.framework.formats import landmark_pb2
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility, presence in points:
+        lm = landmark_list.landmark.add(x=x, y=y, z=z)
+        if visibility is not None:
+            lm.visibility = visibility
+        if presence is not None:
+            lm.presence = presence
+    return SimpleNamespace(pose_landmarks=landmark_list)
 
 def calculate_body_ratios(landmarks, precise_head_height=None):
     head_segment_len = landmarks['shoulder_y'] - landmarks['top_y']
@@ -165,11 +382,12 @@ def calculate_body_ratios(landmarks, precise_head_height=None):
 
 def draw_skeleton(image, results):
     if results.pose_landmarks:
-        mp_drawing.draw_landmarks(
+        solutions = get_mediapipe().solutions
+        solutions.drawing_utils.draw_landmarks(
             image,
             results.pose_landmarks,
-            mp_pose.POSE_CONNECTIONS,
-            landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style()
+            solutions.pose.POSE_CONNECTIONS,
+            landmark_drawing_spec=solutions.drawing_styles.get_default_pose_landmarks_style()
         )
 
 def draw_measurements(image, landmarks, head_height_ratio, face_box=None):
@@ -215,8 +433,13 @@ def draw_measurements(image, landmarks, head_height_ratio, face_box=None):
     cv2.line(image, (nose_x - 50, bottom_y), (nose_x + 50, bottom_y), (255, 0, 255), 2)
     cv2.putText(image, "Heel", (nose_x + 55, bottom_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 255), 1)
 
-def warp_image_to_ratio(image, landmarks, target_ratios):
-    h, w, _ = image.shape
+def compute_warp_geometry(landmarks, target_ratios, image_shape):
+    """
+    Segment table of the 5-segment warp (top->chin->shoulder->hip->knee->heel).
+    Source segment starts/heights, target heights and the horizontal scale fully
+    describe where every source pixel row/column lands in the warped image.
+    """
+    h, w = image_shape[:2]
     
     y_top = landmarks['top_y']
     y_chin = landmarks.get('chin_y', int(y_top + (landmarks['shoulder_y'] - y_top) * 0.5))
@@ -225,39 +448,21 @@ def warp_image_to_ratio(image, landmarks, target_ratios):
     y_knee = landmarks['knee_y']
     y_heel = landmarks['heel_y']
     
-    src_h1 = y_chin - y_top
-    src_h2 = y_shoulder - y_chin
-    src_h3 = y_hip - y_shoulder
-    src_h4 = y_knee - y_hip
-    src_h5 = y_heel - y_knee
-    
-    total_src_h = src_h1 + src_h2 + src_h3 + src_h4 + src_h5
-    
-    tgt_h1 = int(total_src_h * target_ratios['r1_head'])
-    tgt_h2 = int(total_src_h * target_ratios['r2_neck'])
-    tgt_h3 = int(total_src_h * target_ratios['r3_torso'])
-    tgt_h4 = int(total_src_h * target_ratios['r4_thigh'])
-    tgt_h5 = int(total_src_h * target_ratios['r5_shin'])
+    src_starts = [y_top, y_chin, y_shoulder, y_hip, y_knee]
+    src_heights = [y_chin - y_top, y_shoulder - y_chin, y_hip - y_shoulder, y_knee - y_hip, y_heel - y_knee]
+    total_src_h = sum(src_heights)
     
-    def get_segment(y_start, h_src, h_tgt):
-        if h_src <= 0: return np.zeros((h_tgt, w, 3), dtype=np.uint8)
-        segment = image[y_start : y_start + h_src, :]
-        if segment.size == 0 or h_tgt <= 0: return np.zeros((h_tgt, w, 3), dtype=np.uint8)
-        return cv2.resize(segment, (w, h_tgt), interpolation=cv2.INTER_LINEAR)
-
-    img_top_bg = image[0:y_top, :]
-    img_1 = get_segment(y_top, src_h1, tgt_h1)
-    img_2 = get_segment(y_chin, src_h2, tgt_h2)
-    img_3 = get_segment(y_shoulder, src_h3, tgt_h3)
-    img_4 = get_segment(y_hip, src_h4, tgt_h4)
-    img_5 = get_segment(y_knee, src_h5, tgt_h5)
-    img_bottom_bg = image[y_heel:, :]
-    
-    result_vertical = np.vstack([img_top_bg, img_1, img_2, img_3, img_4, img_5, img_bottom_bg])
+    tgt_heights = [
+        int(total_src_h * target_ratios['r1_head']),
+        int(total_src_h * target_ratios['r2_neck']),
+        int(total_src_h * target_ratios['r3_torso']),
+        int(total_src_h * target_ratios['r4_thigh']),
+        int(total_src_h * target_ratios['r5_shin'])
+    ]
     
     target_ar = target_ratios.get('face_aspect_ratio', 0.7)
     model_face_w = landmarks.get('face_width', w * 0.15)
-    tgt_face_w = tgt_h1 * target_ar
+    tgt_face_w = tgt_heights[0] * target_ar
     
     if model_face_w > 0:
         scale_x = tgt_face_w / model_face_w
@@ -265,14 +470,190 @@ def warp_image_to_ratio(image, landmarks, target_ratios):
         scale_x = 1.0
         
     scale_x = max(0.6, min(scale_x, 1.8))
-    
     new_w = int(w * scale_x)
+    
+    return {
+        'src_h': h,
+        'src_w': w,
+        'y_top': y_top,
+        'y_heel': y_heel,
+        'src_starts': src_starts,
+        'src_heights': src_heights,
+        'tgt_heights': tgt_heights,
+        'scale_x': scale_x,
+        'out_w': new_w if new_w > 0 else w,
+        'out_h': max(0, min(y_top, h)) + sum(tgt_heights) + max(0, h - y_heel)
+    }
+
+def get_warp_engine():
+    """
+    WARP_ENGINE:
+      'remap' (default)   - one cv2.remap pass driven by a piecewise-linear coordinate map
+                            (about 1/3 of the peak memory, maps are cached per model / ratio bucket)
+      'remap_smooth'      - same, with the row map smoothed so segment seams blend
+      'resize'            - five segment resizes + vstack + one horizontal resize (previous default)
+    """
+    engine = os.environ.get("WARP_ENGINE", "remap").lower()
+    return engine if engine in ("resize", "remap", "remap_smooth") else "remap"
+
+# Rows of the 2D remap maps materialized at a time (keeps map memory at a few hundred KB)
+REMAP_STRIP_ROWS = 64
+# Gaussian sigma of the smoothed row map, as a fraction of the warped body height
+SMOOTH_SIGMA_FRACTION = 0.015
+
+def compute_warp_maps(geometry, smooth=False):
+    """
+    Source coordinates of every output column / row of the warp described by the segment table.
+    The warp is separable, so this is two 1D float32 arrays: map_x (out_w,) and map_y (out_h,).
+    Also returns the (start, end) output rows of segments with no source pixels (drawn black,
+    like the resize engine does).
+    Pixel centres are mapped the same way cv2.resize does: src = (dst + 0.5) * scale - 0.5.
+    """
+    h, w = geometry['src_h'], geometry['src_w']
+    out_h, out_w = geometry['out_h'], geometry['out_w']
+    map_y = np.empty(out_h, dtype=np.float32)
+    blank_rows = []
+
+    top = max(0, min(geometry['y_top'], h))
+    map_y[:top] = np.arange(top)
+    out_y = top
+    for y_start, h_src, h_tgt in zip(geometry['src_starts'], geometry['src_heights'], geometry['tgt_heights']):
+        if h_tgt <= 0:
+            continue
+        # Rows past the bottom of the image do not exist (the resize engine's slice is clipped too)
+        h_avail = min(h_src, h - y_start)
+        if h_avail > 0:
+            map_y[out_y:out_y + h_tgt] = y_start + (np.arange(h_tgt) + 0.5) * (h_avail / h_tgt) - 0.5
+        else:
+            map_y[out_y:out_y + h_tgt] = min(max(y_start, 0), h - 1)
+            blank_rows.append((out_y, out_y + h_tgt))
+        out_y += h_tgt
+    map_y[out_y:] = geometry['y_heel'] + np.arange(out_h - out_y)
+
+    if smooth and out_h > 2:
+        sigma = max(1.0, sum(geometry['tgt_heights']) * SMOOTH_SIGMA_FRACTION)
+        radius = int(3 * sigma)
+        kernel = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+        kernel /= kernel.sum()
+        # Linear extrapolation at both ends keeps the identity top/bottom bands unchanged
+        steps = np.arange(1, radius + 1, dtype=np.float64)
+        head = map_y[0] - (map_y[1] - map_y[0]) * steps[::-1]
+        tail = map_y[-1] + (map_y[-1] - map_y[-2]) * steps
+        padded = np.concatenate([head, map_y, tail])
+        map_y = np.convolve(padded, kernel, mode='valid').astype(np.float32)
+
+    map_x = ((np.arange(out_w) + 0.5) * (w / out_w) - 0.5).astype(np.float32)
+    return map_x, map_y, blank_rows
+
+def remap_image_to_ratio(image, geometry, maps=None, smooth=False):
+    """
+    Remap warp engine: a single cv2.remap pass into a preallocated output, instead of
+    five resizes, a vstack and a full-frame horizontal resize. The 2D maps are expanded
+    from the separable 1D maps one strip of rows at a time.
+    """
+    map_x, map_y, blank_rows = maps if maps is not None else compute_warp_maps(geometry, smooth=smooth)
+    out_h, out_w = len(map_y), len(map_x)
+    result = np.empty((out_h, out_w) + image.shape[2:], dtype=image.dtype)
+
+    strip_x = np.ascontiguousarray(np.broadcast_to(map_x, (REMAP_STRIP_ROWS, out_w)))
+    strip_y = np.empty((REMAP_STRIP_ROWS, out_w), dtype=np.float32)
+    for start in range(0, out_h, REMAP_STRIP_ROWS):
+        end = min(start + REMAP_STRIP_ROWS, out_h)
+        rows = end - start
+        strip_y[:rows] = map_y[start:end, None]
+        cv2.remap(
+            image, strip_x[:rows], strip_y[:rows], cv2.INTER_LINEAR,
+            dst=result[start:end], borderMode=cv2.BORDER_REPLICATE
+        )
+    for start, end in blank_rows:
+        result[start:end] = 0
+    return result
+
+def warp_image_to_ratio(image, landmarks, target_ratios, geometry=None, engine=None):
+    h, w, _ = image.shape
+    if geometry is None:
+        geometry = compute_warp_geometry(landmarks, target_ratios, image.shape)
+    engine = engine or get_warp_engine()
+    if engine != 'resize':
+        return remap_image_to_ratio(image, geometry, smooth=(engine == 'remap_smooth'))
+    
+    def get_segment(y_start, h_src, h_tgt):
+        if h_src <= 0: return np.zeros((h_tgt, w, 3), dtype=np.uint8)
+        segment = image[y_start : y_start + h_src, :]
+        if segment.size == 0 or h_tgt <= 0: return np.zeros((h_tgt, w, 3), dtype=np.uint8)
+        return cv2.resize(segment, (w, h_tgt), interpolation=cv2.INTER_LINEAR)
+
+    img_top_bg = image[0:geometry['y_top'], :]
+    segments = [
+        get_segment(y_start, h_src, h_tgt)
+        for y_start, h_src, h_tgt in zip(geometry['src_starts'], geometry['src_heights'], geometry['tgt_heights'])
+    ]
+    img_bottom_bg = image[geometry['y_heel']:, :]
+    
+    result_vertical = np.vstack([img_top_bg, *segments, img_bottom_bg])
+    
+    new_w = int(w * geometry['scale_x'])
     if new_w > 0:
         result = cv2.resize(result_vertical, (new_w, result_vertical.shape[0]), interpolation=cv2.INTER_LINEAR)
         return result
         
     return result_vertical
 
+def map_y_through_warp(y, geometry):
+    # Source row -> warped row (piecewise linear, same segment table as warp_image_to_ratio)
+    if y < geometry['y_top']:
+        return y
+    out_y = geometry['y_top']
+    for y_start, h_src, h_tgt in zip(geometry['src_starts'], geometry['src_heights'], geometry['tgt_heights']):
+        if h_src > 0 and y < y_start + h_src:
+            return out_y + (y - y_start) * h_tgt / h_src
+        out_y += h_tgt
+    return out_y + (y - geometry['y_heel'])
+
+def warp_body_landmarks(landmarks, face, points, geometry):
+    """
+    Maps a body profile through the warp analytically (no inference on the warped image).
+    Returns (landmarks, face, pose_points) in the warped image's pixel grid.
+    """
+    sx = geometry['out_w'] / geometry['src_w']
+
+    def map_y(y):
+        return int(map_y_through_warp(y, geometry))
+    
+    warped = dict(landmarks)
+    for key in ('nose_y', 'eye_y', 'shoulder_y', 'hip_y', 'knee_y', 'ankle_y', 'heel_y', 'top_y', 'chin_y'):
+        if key in warped:
+            warped[key] = map_y(warped[key])
+    for key in ('min_x', 'max_x', 'nose_x'):
+        if key in warped:
+            warped[key] = int(warped[key] * sx)
+    for key in ('shoulder_width_px', 'hip_width_px', 'face_width'):
+        if key in warped:
+            warped[key] = warped[key] * sx
+    
+    warped_face = None
+    if face:
+        fx, fy, fw, fh = face['raw_box']
+        top, bottom = map_y(face['top']), map_y(face['bottom'])
+        box_top = map_y(fy)
+        warped_face = {
+            'top': top,
+            'bottom': bottom,
+            'height': bottom - top,
+            'raw_box': (int(fx * sx), box_top, int(fw * sx), map_y(fy + fh) - box_top)
+        }
+    
+    warped_points = None
+    if points:
+        src_h, out_h = geometry['src_h'], geometry['out_h']
+        # Normalized x is unchanged by a uniform horizontal scale
+        warped_points = [
+            (x, map_y_through_warp(y * src_h, geometry) / out_h, z, visibility, presence)
+            for x, y, z, visibility, presence in points
+        ]
+    
+    return warped, warped_face, warped_points
+
 def get_crop_bounds(image, results, custom_landmarks, padding_x_ratio=0.5, padding_y_ratio=0.2):
     if not results or not results.pose_landmarks:
         return None
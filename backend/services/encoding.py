@@ -0,0 +1,137 @@
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from .cv_utils import limit_resolution
+
+# Image Encoding Stage
+# Encodes every requested output concurrently (cv2.imencode releases the GIL),
+# with per-output format, quality, maximum dimension and byte budget.
+#
+# ENCODE_WORKERS: threads used for concurrent encoding (default 4)
+
+# format -> (extension, quality flag, media type, default quality)
+FORMATS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY, "image/jpeg", 95),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY, "image/webp", 90),
+    "avif": (".avif", getattr(cv2, "IMWRITE_AVIF_QUALITY", None), "image/avif", 80),
+}
+FORMAT_ALIASES = {"jpg": "jpeg"}
+
+MIN_QUALITY = 30
+MAX_BUDGET_STEPS = 6
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_encode_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(os.environ.get("ENCODE_WORKERS", "4"))
+                _executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="encoder")
+    return _executor
+
+def is_format_supported(fmt):
+    ext, flag, _, _ = FORMATS[fmt]
+    return flag is not None and cv2.haveImageWriter(ext)
+
+def parse_encode_specs(value, artifact_names):
+    """
+    Builds {output_name: spec} from the 'encodings' JSON form field.
+    Without it, every artifact is encoded once as default-quality JPEG (legacy behaviour).
+
+    Example:
+      {"result": {"format": "webp", "quality": 85},
+       "result_preview": {"source": "result", "max_side": 480, "max_bytes": 40000}}
+    Raises ValueError on malformed specs or unsupported formats.
+    """
+    if not value:
+        return {name: {"source": name, "format": "jpeg"} for name in artifact_names}
+
+    try:
+        raw = json.loads(value)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid encodings JSON: {e}")
+    if not isinstance(raw, dict) or not raw:
+        raise ValueError("encodings must be a non-empty JSON object")
+
+    specs = {}
+    for name, options in raw.items():
+        options = options or {}
+        if not isinstance(options, dict):
+            raise ValueError(f"Encoding '{name}' must be an object")
+        source = options.get("source", name)
+        if source not in artifact_names:
+            raise ValueError(f"Encoding '{name}' refers to artifact '{source}' which was not requested")
+        fmt = str(options.get("format", "jpeg")).lower()
+        fmt = FORMAT_ALIASES.get(fmt, fmt)
+        if fmt not in FORMATS or not is_format_supported(fmt):
+            raise ValueError(f"Unsupported image format '{fmt}' for '{name}'")
+        spec = {"source": source, "format": fmt}
+        for key in ("quality", "max_side", "max_bytes"):
+            if options.get(key) is not None:
+                try:
+                    number = int(options[key])
+                except (TypeError, ValueError):
+                    raise ValueError(f"Encoding '{name}': {key} must be an integer") from None
+                if number <= 0:
+                    raise ValueError(f"Encoding '{name}': {key} must be positive")
+                spec[key] = number
+        if "quality" in spec:
+            spec["quality"] = max(1, min(spec["quality"], 100))
+        specs[name] = spec
+    return specs
+
+def encode_image(img, format="jpeg", quality=None, max_side=None, max_bytes=None):
+    """
+    Encodes a BGR image. Returns (bytes, media_type).
+    With max_bytes, quality is lowered (down to MIN_QUALITY) and then the image is
+    downscaled until the output fits; the smallest attempt is returned if it never does.
+    """
+    ext, flag, media_type, default_quality = FORMATS[format]
+    quality = quality or default_quality
+    if max_side:
+        img = limit_resolution(img, max_side)
+
+    def encode(image, q):
+        ok, buffer = cv2.imencode(ext, image, [flag, q])
+        if not ok:
+            raise ValueError(f"Encoding to {format} failed")
+        return buffer.tobytes()
+
+    data = encode(img, quality)
+    if not max_bytes or len(data) <= max_bytes:
+        return data, media_type
+
+    for _ in range(MAX_BUDGET_STEPS):
+        if quality > MIN_QUALITY:
+            # Bytes shrink roughly with quality, aim for the budget with one step
+            quality = max(MIN_QUALITY, min(quality - 5, int(quality * max_bytes / len(data))))
+        else:
+            h, w = img.shape[:2]
+            img = limit_resolution(img, int(max(h, w) * 0.75))
+        data = encode(img, quality)
+        if len(data) <= max_bytes:
+            break
+    return data, media_type
+
+def encode_outputs(images, specs):
+    """
+    Encodes {artifact_name: image} into {output_name: (bytes, media_type)} concurrently.
+    Outputs whose source image was not rendered are skipped.
+    """
+    executor = get_encode_executor()
+    futures = {}
+    for name, spec in specs.items():
+        img = images.get(spec["source"])
+        if img is None:
+            continue
+        futures[name] = executor.submit(
+            encode_image, img,
+            format=spec["format"], quality=spec.get("quality"),
+            max_side=spec.get("max_side"), max_bytes=spec.get("max_bytes")
+        )
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import secrets
+import threading
+import contextvars
+from contextlib import closing
+from .cache import TieredCache
+from .metrics import collecting, set_gauge
+from .admission import Overloaded
+
+# Asynchronous Jobs
+# POST /jobs/process-ai returns a job id right away; the work runs on a pool of background
+# workers in the accepting process and clients poll (or long-poll) GET /jobs/{id} and fetch
+# GET /jobs/{id}/result. Job records (status, result, error) are kept in a pluggable store:
+#   'memory' - in-process (default), only the accepting process can answer polls
+#   'sqlite' - a SQLite file shared by every worker process on the host
+# Jobs run in the process that accepted them; a job whose process dies is never finished
+# and disappears when its record expires.
+#
+# JOB_STORE:         'memory' (default) or 'sqlite'
+# JOB_STORE_PATH:    SQLite file for the 'sqlite' store (default: logs/jobs.sqlite3)
+# JOB_TTL_SECONDS:   how long a job record is kept after its last update (default 3600)
+# JOB_WORKERS:       jobs running at once per process (default 4)
+# JOB_QUEUE_SIZE:    jobs waiting per process; beyond that submit returns 429 (default 64)
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+# Job status: queued -> running -> done | failed
+FINISHED_STATUSES = ("done", "failed")
+
+# Long polls re-read the store at this interval (seconds), so jobs finished by another process are seen too
+POLL_INTERVAL = 0.25
+MAX_LONG_POLL = 30.0
+# A job whose lane is saturated is retried this many times (after Retry-After) before it fails
+OVERLOAD_RETRIES = 5
+# Retry-After (seconds) when the job queue itself is full
+QUEUE_FULL_RETRY_AFTER = 10
+
+def get_job_ttl():
+    return float(os.environ.get("JOB_TTL_SECONDS", "3600"))
+
+class MemoryJobStore:
+    def __init__(self, ttl):
+        # Records leave by TTL; the LRU bound is only a safety net
+        self._cache = TieredCache("jobs", max_entries=10000, ttl=ttl)
+
+    def put(self, job):
+        self._cache.put(job['id'], job)
+
+    def get(self, job_id):
+        job = self._cache.get(job_id)
+        return dict(job) if job is not None else None
+
+class SqliteJobStore:
+    """
+    Job records as JSON rows in a SQLite file (WAL mode), shared across processes.
+    One connection per call (closed afterwards), so the store can be used from any thread.
+    """
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def put(self, job):
+        now = time.time()
+        with closing(self._connect()) as db, db:
+            db.execute("INSERT OR REPLACE INTO jobs (id, data, expires_at) VALUES (?, ?, ?)",
+                       (job['id'], json.dumps(job, ensure_ascii=False), now + self.ttl))
+            db.execute("DELETE FROM jobs WHERE expires_at <= ?", (now,))
+
+    def get(self, job_id):
+        with closing(self._connect()) as db, db:
+            row = db.execute("SELECT data FROM jobs WHERE id = ? AND expires_at > ?", (job_id, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_job_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                kind = os.environ.get("JOB_STORE", "memory").lower()
+                if kind == "sqlite":
+                    path = os.environ.get("JOB_STORE_PATH") or os.path.join(ROOT_DIR, 'logs', 'jobs.sqlite3')
+                    _store = SqliteJobStore(path, get_job_ttl())
+                else:
+                    _store = MemoryJobStore(get_job_ttl())
+                print(f"[Jobs] Using {type(_store).__name__}")
+    return _store
+
+def _save(job, **changes):
+    job.update(changes, updated_at=time.time())
+    get_job_store().put(job)
+    return job
+
+class JobRunner:
+    """
+    Per-event-loop queue and worker tasks. The workers start on first submit and
+    run in a fresh context, so they never inherit the submitting request's metrics
+    collector or profiler.
+    """
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=int(os.environ.get("JOB_QUEUE_SIZE", "64")))
+        self.running = 0
+        self.workers = [
+            asyncio.get_running_loop().create_task(self._work(), context=contextvars.Context())
+            for _ in range(max(1, int(os.environ.get("JOB_WORKERS", "4"))))
+        ]
+
+    def _publish(self):
+        set_gauge("factbomb_jobs_queued", self.queue.qsize())
+        set_gauge("factbomb_jobs_running", self.running)
+
+    async def _work(self):
+        while True:
+            job, fn, args = await self.queue.get()
+            self.running += 1
+            self._publish()
+            try:
+                await self._run(job, fn, args)
+            finally:
+                self.running -= 1
+                self._publish()
+                self.queue.task_done()
+
+    async def _run(self, job, fn, args):
+        await asyncio.to_thread(_save, job, status="running")
+        try:
+            with collecting(f"job:{job['kind']}"):
+                for attempt in range(OVERLOAD_RETRIES + 1):
+                    try:
+                        result = await fn(*args)
+                        break
+                    except Overloaded as e:
+                        # Jobs may wait: back off instead of failing on a busy lane
+                        if attempt == OVERLOAD_RETRIES:
+                            raise
+                        await asyncio.sleep(e.retry_after)
+        except Exception as e:
+            # HTTPException-like errors keep their status code and detail
+            status_code = getattr(e, "status_code", 500)
+            detail = getattr(e, "detail", None) or str(e)
+            print(f"[Jobs] {job['id']} failed: {detail}")
+            await asyncio.to_thread(_save, job, status="failed", error={"status_code": status_code, "detail": detail})
+            return
+        await asyncio.to_thread(_save, job, status="done", result=result)
+
+    def submit(self, job, fn, args):
+        self.queue.put_nowait((job, fn, args))
+        self._publish()
+
+_runners = {}
+
+def _get_runner():
+    # asyncio primitives are bound to one event loop (see ai_engine._get_semaphore)
+    loop = asyncio.get_running_loop()
+    runner = _runners.get(loop)
+    if runner is None:
+        _runners.clear()
+        runner = _runners[loop] = JobRunner()
+    return runner
+
+async def submit_job(kind, fn, *args):
+    """
+    Records a queued job and schedules await fn(*args) on the job workers.
+    fn's return value (JSON-serializable) becomes the job result.
+    Raises Overloaded when the job queue is full.
+    """
+    runner = _get_runner()
+    if runner.queue.full():
+        raise Overloaded("jobs", "queue_full", QUEUE_FULL_RETRY_AFTER)
+    now = time.time()
+    job = {"id": secrets.token_urlsafe(16), "kind": kind, "status": "queued", "created_at": now, "updated_at": now}
+    await asyncio.to_thread(get_job_store().put, job)
+    try:
+        runner.submit(dict(job), fn, args)
+    except asyncio.QueueFull:
+        # Filled up while the record was being written
+        await asyncio.to_thread(_save, job, status="failed", error={"status_code": 429, "detail": "Job queue is full"})
+        raise Overloaded("jobs", "queue_full", QUEUE_FULL_RETRY_AFTER) from None
+    return job
+
+async def get_job(job_id, wait=0.0):
+    """
+    The job record, or None if unknown / expired. With wait > 0, long-polls until the
+    job has finished or wait seconds (at most MAX_LONG_POLL) have passed.
+    """
+    deadline = time.monotonic() + min(max(wait, 0.0), MAX_LONG_POLL)
+    while True:
+        job = await asyncio.to_thread(get_job_store().get, job_id)
+        if job is None or job['status'] in FINISHED_STATUSES or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(POLL_INTERVAL)
+
+def job_status(job):
+    # Public view of a job record (without the result payload)
+    status = {key: job[key] for key in ("id", "kind", "status", "created_at", "updated_at")}
+    if job.get("error"):
+        status["error"] = job["error"]
+    return status
@@ -0,0 +1,240 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Lightweight Metrics
+# Timing spans and counters, aggregated into Prometheus-style histograms / counters
+# (GET /metrics) and summarized per request in a Server-Timing header.
+#
+# Spans and counts are recorded into the collector of the current request (a contextvar).
+# Code running on the CV worker pool records into a worker collector instead; run_cv
+# ships those events back with the task result and replays them here, so spans from
+# worker threads and worker processes end up in the same request and registry.
+
+# Seconds; covers sub-ms NumPy stages up to slow Gemini image generations
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_HISTOGRAM = "factbomb_stage_duration_seconds"
+REQUEST_HISTOGRAM = "factbomb_request_duration_seconds"
+
+HELP = {
+    STAGE_HISTOGRAM: "Duration of pipeline stages (decode, pose, face, warp, encode, gemini, ...)",
+    REQUEST_HISTOGRAM: "HTTP request duration",
+    "factbomb_requests_total": "HTTP requests by endpoint and status",
+    "factbomb_cache_requests_total": "Cache lookups by cache and result (hit, disk_hit, miss)",
+    "factbomb_gemini_rate_limited_total": "Gemini calls rejected with 429 / RESOURCE_EXHAUSTED",
+    "factbomb_gemini_retries_total": "Gemini calls retried after a rate limit",
+    "factbomb_gemini_errors_total": "Gemini calls that failed after all retries",
+    "factbomb_coalesced_requests_total": "Requests that joined an identical in-flight request (single-flight)",
+    "factbomb_lane_wait_seconds": "Time requests waited for an admission lane slot",
+    "factbomb_lane_rejected_total": "Requests rejected with 429 by admission control, by lane and reason",
+    "factbomb_lane_active": "Requests currently running in the admission lane",
+    "factbomb_lane_queue_depth": "Requests currently waiting for an admission lane slot",
+    "factbomb_jobs_queued": "Background jobs waiting for a job worker",
+    "factbomb_jobs_running": "Background jobs currently running",
+}
+
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+_counters = {}    # (name, labels) -> value
+_gauges = {}      # (name, labels) -> value
+
+class Collector:
+    """
+    Events of one request (scope is the ASGI scope), of one background job (endpoint is
+    its name) or of one worker task (neither). Request and job collectors aggregate into
+    the registry as events arrive; worker collectors only buffer them for replay.
+    """
+    def __init__(self, scope=None, endpoint=None):
+        self.scope = scope
+        self.endpoint = endpoint
+        self.mode = None
+        self.events = []
+
+    @property
+    def buffered(self):
+        return self.scope is None and self.endpoint is None
+
+    def labels(self):
+        route = self.scope.get("route") if self.scope is not None else None
+        return {
+            "endpoint": self.endpoint or getattr(route, "path", None) or "unmatched",
+            "mode": self.mode or "none",
+        }
+
+    def server_timing(self):
+        # Server-Timing header value, one entry per stage (durations of repeated stages are summed)
+        totals = {}
+        for event in self.events:
+            if event[0] == "span":
+                totals[event[1]] = totals.get(event[1], 0.0) + event[2]
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
+
+_collector = contextvars.ContextVar("metrics_collector", default=None)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def observe(name, seconds, **labels):
+    key = (name, _label_key(labels))
+    with _lock:
+        values = _histograms.get(key)
+        if values is None:
+            values = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                values[i] += 1
+        values[len(BUCKETS)] += 1
+        values[-1] += seconds
+
+def increment(name, value=1, **labels):
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _gauges[(name, _label_key(labels))] = value
+
+def _record(event):
+    collector = _collector.get()
+    if collector is not None:
+        collector.events.append(event)
+        if collector.buffered:
+            return  # worker collector, aggregated when replayed
+        labels = collector.labels()
+    else:
+        labels = {"endpoint": "none", "mode": "none"}
+
+    if event[0] == "span":
+        observe(STAGE_HISTOGRAM, event[2], stage=event[1], **labels)
+    else:
+        _, name, value, event_labels = event
+        increment(name, value, **dict(event_labels))
+
+def record_span(stage, seconds):
+    _record(("span", stage, seconds))
+
+def count(name, value=1, **labels):
+    # Counter increment that follows the request (or worker task) like spans do
+    _record(("count", name, value, _label_key(labels)))
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, time.perf_counter() - start)
+
+def set_mode(mode):
+    # Labels the current request's spans with its analysis mode (basic, full_ai, pro, ...)
+    collector = _collector.get()
+    if collector is not None:
+        collector.mode = mode
+
+def current_collector():
+    return _collector.get()
+
+@contextmanager
+def collecting(endpoint):
+    # Collector for work outside an HTTP request (background jobs), labelled with endpoint
+    token = _collector.set(Collector(endpoint=endpoint))
+    try:
+        yield
+    finally:
+        _collector.reset(token)
+
+def run_collecting(fn, args, kwargs):
+    """
+    Worker-side wrapper (see cv_pool.run_cv): runs fn with its own collector and
+    returns (result, events). Must stay a module-level function to be picklable.
+    """
+    token = _collector.set(Collector())
+    try:
+        result = fn(*args, **kwargs)
+        return result, _collector.get().events
+    finally:
+        _collector.reset(token)
+
+def replay(events):
+    for event in events:
+        _record(event)
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    escaped = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in items]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+def render_prometheus():
+    # Prometheus text exposition format (version 0.0.4)
+    with _lock:
+        histograms = {key: list(values) for key, values in _histograms.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+
+    lines = []
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            for bound, value in zip(BUCKETS, values):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', repr(bound))])} {value}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {values[len(BUCKETS)]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {values[-1]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {values[len(BUCKETS)]}")
+    for metric_type, values in (("counter", counters), ("gauge", gauges)):
+        for name in sorted({name for name, _ in values}):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: one collector per HTTP request, a Server-Timing header on the
+    response (stages finished before the headers are sent) and request duration / count.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        collector = Collector(scope)
+        token = _collector.set(collector)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = collector.server_timing()
+                total = f"total;dur={(time.perf_counter() - start) * 1000:.1f}"
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", (f"{timing}, {total}" if timing else total).encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            labels = collector.labels()
+            observe(REQUEST_HISTOGRAM, time.perf_counter() - start, endpoint=labels["endpoint"], status=str(status))
+            increment("factbomb_requests_total", endpoint=labels["endpoint"], status=str(status))
+            _collector.reset(token)
@@ -4,9 +4,12 @@ import io
 import json
 import re
 import PIL.Image
-from .ai_engine import get_gemini_client, generate_gemini_image
+from .ai_engine import get_gemini_client, generate_gemini_image, generate_content_async
 
-def analyze_full_ai_mode(user_img_bytes, model_img_bytes, language="ko"):
+# Bump whenever the prompts or models below change, so cached results (see ai_cache) are not reused
+PROMPT_VERSION = 1
+
+async def analyze_full_ai_mode(user_img_bytes, model_img_bytes, language="ko"):
     """
     AI Mode: Vision Analysis (Gemini 3) + Image Generation (Gemini 3 Image).
     Focus: Proportion Transfer using pure AI generation (No warping pipeline).
@@ -65,10 +68,7 @@ def analyze_full_ai_mode(user_img_bytes, model_img_bytes, language="ko"):
             img_user, img_model
         ]
         
-        response = client.models.generate_content(
-            model=model_name,
-            contents=analysis_prompt
-        )
+        response = await generate_content_async(model_name, analysis_prompt)
         text = response.text.strip()
         
         # Parse JSON
@@ -92,7 +92,7 @@ def analyze_full_ai_mode(user_img_bytes, model_img_bytes, language="ko"):
         gen_prompt = data.get("gen_prompt", "Fashion model wearing stylish clothes")
         full_gen_prompt = f"{gen_prompt}, photorealistic, 8k, high quality"
 
-        generated_b64, error_msg = generate_gemini_image(full_gen_prompt, reference_images=[img_user, img_model])
+        generated_b64, error_msg = await generate_gemini_image(full_gen_prompt, reference_images=[img_user, img_model])
         
         final_comment = data.get("fact_bomb_comment", data.get("comment", "Analysis complete."))
         if error_msg:
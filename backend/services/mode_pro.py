@@ -1,15 +1,21 @@
 
 import os
 import io
+import asyncio
 import json
 import re
 import cv2
 import PIL.Image
-from .ai_engine import get_gemini_client, generate_gemini_image
+from .ai_engine import get_gemini_client, generate_gemini_image, generate_content_async
 
 TEXT_MODEL_NAME = "gemini-3-pro-preview"
+# Bump whenever the prompt or models below change, so cached results (see ai_cache) are not reused
+PROMPT_VERSION = 1
 
-def run_pro_mode_analysis(user_bytes, model_bytes, visual_data, language="ko"):
+def _to_pil(img_bgr):
+    return PIL.Image.fromarray(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB))
+
+async def run_pro_mode_analysis(user_bytes, model_bytes, visual_data, language="ko"):
     """
     Pro Mode: Vision Mode Result + AI Physics.
     Uses the 'Warping Engine' result as a geometric blueprint, and uses AI to add photorealism and physics (fabric tension, fit).
@@ -19,10 +25,12 @@ def run_pro_mode_analysis(user_bytes, model_bytes, visual_data, language="ko"):
         img_user = PIL.Image.open(io.BytesIO(user_bytes))
         img_model = PIL.Image.open(io.BytesIO(model_bytes))
         
-        # Convert OpenCV images from visual_data to PIL
-        img_base_result = PIL.Image.fromarray(cv2.cvtColor(visual_data['final_result'], cv2.COLOR_BGR2RGB))
-        img_user_debug = PIL.Image.fromarray(cv2.cvtColor(visual_data['user_debug'], cv2.COLOR_BGR2RGB))
-        img_model_debug = PIL.Image.fromarray(cv2.cvtColor(visual_data['model_debug'], cv2.COLOR_BGR2RGB))
+        # Convert OpenCV images from visual_data to PIL (off the event loop)
+        img_base_result, img_user_debug, img_model_debug = await asyncio.gather(
+            asyncio.to_thread(_to_pil, visual_data['final_result']),
+            asyncio.to_thread(_to_pil, visual_data['user_debug']),
+            asyncio.to_thread(_to_pil, visual_data['model_debug'])
+        )
 
         # 2. Client & Language
         client = get_gemini_client()
@@ -90,9 +98,9 @@ def run_pro_mode_analysis(user_bytes, model_bytes, visual_data, language="ko"):
         """
 
         # 5. Vision Analysis (Gemini 3 Pro)
-        response = client.models.generate_content(
-            model=TEXT_MODEL_NAME, 
-            contents=[prompt_text, img_user, img_model, img_user_debug, img_model_debug, img_base_result]
+        response = await generate_content_async(
+            TEXT_MODEL_NAME,
+            [prompt_text, img_user, img_model, img_user_debug, img_model_debug, img_base_result]
         )
         text = response.text.strip()
         
@@ -116,7 +124,7 @@ def run_pro_mode_analysis(user_bytes, model_bytes, visual_data, language="ko"):
         # Use Model + BaseResult as structure reference
         ref_images = [img_model, img_base_result]
         
-        image_b64, error_msg = generate_gemini_image(gen_prompt, reference_images=ref_images)
+        image_b64, error_msg = await generate_gemini_image(gen_prompt, reference_images=ref_images)
         
         if error_msg:
              final_comment += f"\n[Gen Error] {error_msg}"
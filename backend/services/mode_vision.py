@@ -1,11 +1,20 @@
 
+import os
+import copy
 import cv2
 import numpy as np
 import base64
 from .cv_utils import (
-    get_landmarks_with_results, detect_face_bounds, calculate_body_ratios,
-    draw_skeleton, draw_measurements, warp_image_to_ratio, get_crop_bounds, apply_crop
+    detect_body, calculate_body_ratios, decode_work_image,
+    draw_skeleton, draw_measurements, warp_image_to_ratio, get_crop_bounds, apply_crop,
+    pose_points, pose_results_from_points, compute_warp_geometry, warp_body_landmarks,
+    get_detection_max_side,
+    get_warp_engine, compute_warp_maps, remap_image_to_ratio
 )
+from .cache import TieredCache, content_hash
+from .encoding import encode_outputs
+from .ratio_engine import PROPORTION_SCALES
+from .metrics import span
 
 def analyze_body_proportions(user, model, language="ko"):
     """
@@ -82,113 +91,436 @@ def analyze_body_proportions(user, model, language="ko"):
         "model_heads": model_heads
     }
 
-def encode_img(img):
+def encode_img_bytes(img):
     _, buffer = cv2.imencode('.jpg', img)
-    return base64.b64encode(buffer).decode('utf-8')
+    return buffer.tobytes()
+
+def encode_img(img):
+    with span("encode"):
+        return base64.b64encode(encode_img_bytes(img)).decode('utf-8')
+
+# Public artifact name -> visual_data key
+ARTIFACT_KEYS = {
+    "result": "final_result",
+    "user_debug": "user_debug",
+    "model_debug": "model_debug",
+    "result_debug": "final_result_debug",
+}
+ALL_ARTIFACTS = tuple(ARTIFACT_KEYS)
+
+def parse_artifacts(value, default=ALL_ARTIFACTS):
+    # "result,user_debug" -> ('result', 'user_debug'). Raises ValueError on unknown names.
+    if not value:
+        return tuple(default)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in ARTIFACT_KEYS]
+    if unknown:
+        raise ValueError(f"Unknown artifacts: {', '.join(unknown)} (expected: {', '.join(ALL_ARTIFACTS)})")
+    return tuple(name for name in ALL_ARTIFACTS if name in names)
+
+_landmark_cache = None
 
-def process_visuals_core(img_user, img_model):
+def get_landmark_cache():
     """
-    Core Logic for 'Vision Mode'.
-    Performs face detection, landmark extraction, ratio calculation, and warping.
+    Content-addressed cache of body profiles (merged landmarks, face bounds, ratios).
+    LANDMARK_CACHE_SIZE: in-memory LRU entries (default 512)
+    LANDMARK_CACHE_DIR:  optional directory for the on-disk tier
     """
-    # 1. Get Pose Landmarks (For Body)
-    user_landmarks, user_results = get_landmarks_with_results(img_user)
-    model_landmarks, model_results = get_landmarks_with_results(img_model)
-    
-    # 1.5 Get Face Detection (For Accurate Head Size)
-    user_face = detect_face_bounds(img_user)
-    model_face = detect_face_bounds(img_model)
+    global _landmark_cache
+    if _landmark_cache is None:
+        _landmark_cache = TieredCache(
+            "landmarks",
+            max_entries=int(os.environ.get("LANDMARK_CACHE_SIZE", "512")),
+            disk_dir=os.environ.get("LANDMARK_CACHE_DIR") or None
+        )
+    return _landmark_cache
 
-    if not user_landmarks or not model_landmarks:
-         raise ValueError("Could not detect full body in one of the images")
+def extract_body_profile(img, cache_key=None):
+    """
+    Runs pose + face detection on one person and merges them into a body profile:
+    {landmarks, face, head_height, ratios, pose_points}. Returns None if no body is found.
+    With a cache_key (content hash of the upload) repeat images skip MediaPipe entirely.
+    """
+    image_hash = cache_key
+    cache = get_landmark_cache() if cache_key else None
+    if cache is not None:
+        # Coordinates depend on the working resolution and the detection proxy size
+        h, w = img.shape[:2]
+        cache_key = f"{cache_key}_{w}x{h}_d{get_detection_max_side()}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
 
-    # Merge Logic
-    if user_face:
-        user_landmarks['top_y'] = user_face['top']
-        user_landmarks['chin_y'] = user_face['bottom']
-        user_landmarks['face_width'] = user_face['raw_box'][2]
-        user_head_height = user_face['height']
-    else:
-        user_landmarks['face_width'] = int(abs(user_landmarks['eye_y'] - user_landmarks['nose_y']) * 4)
-        user_head_height = None 
-
-    if model_face:
-        model_landmarks['top_y'] = model_face['top']
-        model_landmarks['chin_y'] = model_face['bottom']
-        model_landmarks['face_width'] = model_face['raw_box'][2]
-        model_head_height = model_face['height']
-    else:
-        model_landmarks['face_width'] = int(abs(model_landmarks['eye_y'] - model_landmarks['nose_y']) * 4)
-        model_head_height = None
-        
-    # 2. Calculate Ratios
-    user_ratios = calculate_body_ratios(user_landmarks, precise_head_height=user_head_height)
-    model_ratios = calculate_body_ratios(model_landmarks, precise_head_height=model_head_height)
+    detection = detect_body(img)
+    if not detection.found:
+        return None
 
-    # 3. Create Debug Images
-    img_user_debug = img_user.copy()
-    img_model_debug = img_model.copy()
-    
-    draw_skeleton(img_user_debug, user_results)
-    draw_skeleton(img_model_debug, model_results)
-    
-    draw_measurements(img_user_debug, user_landmarks, user_ratios.get('head_stat_ratio', 0.15), face_box=user_face)
-    draw_measurements(img_model_debug, model_landmarks, model_ratios.get('head_stat_ratio', 0.15), face_box=model_face)
+    # Merge Logic (head from the face box when there is one)
+    landmarks, head_height = detection.head_estimate()
+
+    profile = {
+        "landmarks": landmarks,
+        "face": detection.face,
+        "head_height": head_height,
+        "ratios": calculate_body_ratios(landmarks, precise_head_height=head_height),
+        "pose_points": pose_points(detection.pose_results),
+        # Content hash of the upload, keys per-image caches further down the pipeline
+        "image_hash": image_hash
+    }
+    if cache is not None:
+        cache.put(cache_key, copy.deepcopy(profile))
+    return profile
+
+def get_result_landmarks_mode():
+    """
+    RESULT_LANDMARKS_MODE:
+      'analytic' (default) - map the model landmarks through the warp, no inference
+      'detect'             - re-run pose/face detection on the warped image
+      'verify'             - analytic, plus re-detection that logs the difference
+    """
+    mode = os.environ.get("RESULT_LANDMARKS_MODE", "analytic").lower()
+    return mode if mode in ("analytic", "detect", "verify") else "analytic"
 
-    # 4. Warp
-    result_img = warp_image_to_ratio(img_model, model_landmarks, user_ratios)
+def detect_result_landmarks(result_img):
+    # Full pose + face pass on the warped image
+    detection = detect_body(result_img)
+    res_landmarks = detection.landmarks
     
-    # 5. Process Result Image for Skeleton/Measurements
-    res_landmarks, res_results = get_landmarks_with_results(result_img)
-    res_face = detect_face_bounds(result_img)
+    if detection.face and res_landmarks:
+         res_landmarks['face_width'] = detection.face['raw_box'][2]
+    return res_landmarks, detection.face, detection.pose_results
+
+def verify_result_landmarks(result_img, res_landmarks):
+    detected, _, _ = detect_result_landmarks(result_img)
+    if not detected:
+        print("[Vision Verify] Re-detection found no body on the warped image")
+        return None
+    deltas = {
+        key: detected[key] - res_landmarks[key]
+        for key in ('shoulder_y', 'hip_y', 'knee_y', 'ankle_y', 'heel_y')
+    }
+    print(f"[Vision Verify] Detected - analytic landmark deltas (px): {deltas}")
+    return deltas
+
+_warp_map_cache = None
+
+# Target ratios the warp depends on (besides the model's own landmarks)
+WARP_TARGET_KEYS = ('r1_head', 'r2_neck', 'r3_torso', 'r4_thigh', 'r5_shin', 'face_aspect_ratio')
+
+def get_warp_map_cache():
+    """
+    Remap coordinate maps keyed by model image hash and quantized target ratios.
+    WARP_MAP_CACHE_SIZE: in-memory LRU entries (default 256, 0 disables the cache)
+    WARP_MAP_CACHE_DIR:  optional directory for the on-disk tier (filled by scripts/prewarm_warp_cache.py)
+    WARP_RATIO_STEP:     quantization step of the target ratios (default 0.005)
+    """
+    global _warp_map_cache
+    if _warp_map_cache is None:
+        _warp_map_cache = TieredCache(
+            "warp_maps",
+            max_entries=int(os.environ.get("WARP_MAP_CACHE_SIZE", "256")),
+            disk_dir=os.environ.get("WARP_MAP_CACHE_DIR") or None
+        )
+    return _warp_map_cache
+
+def is_warp_map_cache_enabled():
+    return int(os.environ.get("WARP_MAP_CACHE_SIZE", "256")) > 0
+
+def get_warp_ratio_step():
+    return float(os.environ.get("WARP_RATIO_STEP", "0.005"))
+
+def quantize_target_ratios(ratios, step=None):
+    """
+    Snaps the warp target ratios to a grid of `step` so nearby users share one warp map.
+    Returns (quantized ratios, bucket tuple).
+    """
+    step = step or get_warp_ratio_step()
+    buckets = tuple(int(round(ratios.get(key, 0.7) / step)) for key in WARP_TARGET_KEYS)
+    quantized = dict(ratios)
+    quantized.update({key: bucket * step for key, bucket in zip(WARP_TARGET_KEYS, buckets)})
+    return quantized, buckets
+
+def warp_map_key(image_hash, image_shape, engine, buckets, step):
+    h, w = image_shape[:2]
+    parts = [image_hash, f"{w}x{h}", f"d{get_detection_max_side()}", engine, f"s{step}"] + [str(b) for b in buckets]
+    return content_hash("_".join(parts).encode("utf-8"))
+
+def get_cached_warp_maps(img_model, model_profile, target_ratios, engine):
+    """
+    (geometry, maps) for the remap engines, from the warp map cache when possible.
+    The target ratios are quantized first, so the warp is computed from the bucket centre
+    whether or not it was cached.
+    """
+    step = get_warp_ratio_step()
+    quantized, buckets = quantize_target_ratios(target_ratios, step)
+    cache = get_warp_map_cache()
+    key = warp_map_key(model_profile['image_hash'], img_model.shape, engine, buckets, step)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    geometry = compute_warp_geometry(model_profile['landmarks'], quantized, img_model.shape)
+    maps = compute_warp_maps(geometry, smooth=(engine == 'remap_smooth'))
+    cache.put(key, (geometry, maps))
+    return geometry, maps
+
+def prewarm_warp_maps(model_bytes, target_ratios_list, engine='remap'):
+    """
+    Fills the warp map cache for one model image and a list of target ratio dicts.
+    Returns the number of maps that had to be computed.
+    """
+    img_model = decode_work_image(model_bytes)
+    if img_model is None:
+        raise ValueError("Invalid model image data")
+    model_profile = extract_body_profile(img_model, cache_key=content_hash(model_bytes))
+    if not model_profile:
+        raise ValueError("Could not detect full body in the model image")
+
+    cache = get_warp_map_cache()
+    computed = 0
+    for target_ratios in target_ratios_list:
+        misses = cache.stats()['misses']
+        get_cached_warp_maps(img_model, model_profile, target_ratios, engine)
+        computed += cache.stats()['misses'] - misses
+    return computed
+
+def extract_pair_profiles(img_user, img_model, user_key=None, model_key=None):
+    # Stage 1: Pose Landmarks + Face Detection (For Body / Accurate Head Size) and Ratios
+    user_profile = extract_body_profile(img_user, cache_key=user_key)
+    model_profile = extract_body_profile(img_model, cache_key=model_key)
+
+    if not user_profile or not model_profile:
+         raise ValueError("Could not detect full body in one of the images")
+    return user_profile, model_profile
+
+def warp_to_user_ratios(img_model, user_profile, model_profile, result_landmarks=None):
+    """
+    Stage 2: Warps the model image to the user's ratios and derives the result
+    landmarks (analytically, or by re-detection), ratios, head count and crop bounds.
+    The returned 'image' is uncropped so debug overlays can be drawn on it later.
+    """
+    model_landmarks = model_profile['landmarks']
+    user_ratios = user_profile['ratios']
+
+    # 4. Warp (remap engines reuse cached coordinate maps for known model images)
+    engine = get_warp_engine()
+    with span("warp"):
+        if engine != 'resize' and model_profile.get('image_hash') and is_warp_map_cache_enabled():
+            geometry, maps = get_cached_warp_maps(img_model, model_profile, user_ratios, engine)
+            result_img = remap_image_to_ratio(img_model, geometry, maps=maps)
+        else:
+            geometry = compute_warp_geometry(model_landmarks, user_ratios, img_model.shape)
+            result_img = warp_image_to_ratio(img_model, model_landmarks, user_ratios, geometry=geometry, engine=engine)
     
-    if res_face:
-         res_landmarks['face_width'] = res_face['raw_box'][2]
+    # 5. Result Image Landmarks (mapped through the warp; re-detection only on request)
+    mode = result_landmarks or get_result_landmarks_mode()
+    if mode == 'detect':
+        res_landmarks, res_face, res_results = detect_result_landmarks(result_img)
+        res_points = pose_points(res_results)
+    else:
+        res_landmarks, res_face, res_points = warp_body_landmarks(
+            model_landmarks, model_profile['face'], model_profile['pose_points'], geometry
+        )
+        if mode == 'verify':
+            verify_result_landmarks(result_img, res_landmarks)
     
-    result_img_debug = result_img.copy()
     res_ratios = {}
     res_heads = 0
-    
     if res_landmarks:
-        draw_skeleton(result_img_debug, res_results)
-        
         res_head_height = res_face['height'] if res_face else None
         res_ratios = calculate_body_ratios(res_landmarks, precise_head_height=res_head_height)
         res_head_ratio = res_ratios.get('head_stat_ratio', 0.15)
         res_heads = round(1 / res_head_ratio, 1) if res_head_ratio > 0 else 0
-        
-        draw_measurements(result_img_debug, res_landmarks, res_ratios.get('head_stat_ratio', 0.15), face_box=res_face)
+
+    res_bounds = get_crop_bounds(result_img, pose_results_from_points(res_points), res_landmarks)
+
+    return {
+        "image": result_img,
+        "crop_bounds": res_bounds,
+        "landmarks": res_landmarks,
+        "face": res_face,
+        "pose_points": res_points,
+        "ratios": res_ratios,
+        "heads": res_heads
+    }
+
+def draw_debug_image(img, profile, crop_bounds=None):
+    # Skeleton + head ruler overlay on a copy of img, auto-cropped around the body
+    landmarks = profile['landmarks']
+    results = pose_results_from_points(profile['pose_points'])
+    img_debug = img.copy()
+    if not landmarks:
+        return apply_crop(img_debug, crop_bounds)
+
+    draw_skeleton(img_debug, results)
+    draw_measurements(img_debug, landmarks, profile['ratios'].get('head_stat_ratio', 0.15), face_box=profile['face'])
     
     # 6. AUTO-CROP IMAGES
-    user_bounds = get_crop_bounds(img_user_debug, user_results, user_landmarks)
-    img_user_debug = apply_crop(img_user_debug, user_bounds)
-    
-    model_bounds = get_crop_bounds(img_model_debug, model_results, model_landmarks)
-    img_model_debug = apply_crop(img_model_debug, model_bounds)
-    
-    res_bounds = get_crop_bounds(result_img, res_results, res_landmarks)
-    if res_bounds:
-        result_img = apply_crop(result_img, res_bounds)
-        result_img_debug = apply_crop(result_img_debug, res_bounds)
+    if crop_bounds is None:
+        crop_bounds = get_crop_bounds(img_debug, results, landmarks)
+    return apply_crop(img_debug, crop_bounds)
+
+def render_debug_images(img_user, img_model, user_profile, model_profile, warp, artifacts=ALL_ARTIFACTS):
+    # Stage 3: Debug Images (User / Model / Result). Artifacts not requested are not drawn or copied.
+    with span("debug_render"):
+        return _render_debug_images(img_user, img_model, user_profile, model_profile, warp, artifacts)
+
+def _render_debug_images(img_user, img_model, user_profile, model_profile, warp, artifacts):
+    debug_images = {}
+    if 'user_debug' in artifacts:
+        debug_images['user_debug'] = draw_debug_image(img_user, user_profile)
+    if 'model_debug' in artifacts:
+        debug_images['model_debug'] = draw_debug_image(img_model, model_profile)
+    if 'result_debug' in artifacts:
+        debug_images['final_result_debug'] = draw_debug_image(warp['image'], warp, crop_bounds=warp['crop_bounds'])
+    return debug_images
+
+def process_visuals_core(img_user, img_model, user_key=None, model_key=None, result_landmarks=None, artifacts=ALL_ARTIFACTS):
+    """
+    Core Logic for 'Vision Mode'.
+    Performs face detection, landmark extraction, ratio calculation, and warping.
+    user_key / model_key are optional content hashes used for the landmark cache.
+    result_landmarks overrides RESULT_LANDMARKS_MODE for this call.
+    artifacts lists the images to render (see ARTIFACT_KEYS); the others are None.
+    """
+    user_profile, model_profile = extract_pair_profiles(img_user, img_model, user_key, model_key)
+    warp = warp_to_user_ratios(img_model, user_profile, model_profile, result_landmarks=result_landmarks)
+    debug_images = render_debug_images(img_user, img_model, user_profile, model_profile, warp, artifacts=artifacts)
+    return assemble_visual_data(user_profile, model_profile, warp, debug_images, artifacts=artifacts)
+
+def assemble_visual_data(user_profile, model_profile, warp, debug_images, artifacts=ALL_ARTIFACTS):
+    # The visual_data dict consumed by the endpoints and Pro Mode
+    return {
+        "final_result": apply_crop(warp['image'], warp['crop_bounds']) if 'result' in artifacts else None,
+        "final_result_debug": debug_images.get('final_result_debug'),
+        "user_debug": debug_images.get('user_debug'),
+        "model_debug": debug_images.get('model_debug'),
+        "user_ratios": user_profile['ratios'],
+        "model_ratios": model_profile['ratios'],
+        "result_ratios": warp['ratios'],
+        "result_heads": warp['heads'],
+        "user_landmarks": user_profile['landmarks'],
+        "model_landmarks": model_profile['landmarks']
+    }
+
+def pack_visual_data(visual_data):
+    """
+    visual_data with its images JPEG-encoded (hundreds of KB instead of tens of MB of
+    decoded pixels), for keeping it in the analysis store. unpack_visual_data() reverses it.
+    """
+    packed = dict(visual_data)
+    for key in ARTIFACT_KEYS.values():
+        if packed.get(key) is not None:
+            packed[key] = encode_img_bytes(packed[key])
+    return packed
+
+def is_packed_visual_data(visual_data):
+    return any(isinstance(visual_data.get(key), bytes) for key in ARTIFACT_KEYS.values())
 
+def unpack_visual_data(packed):
+    visual_data = dict(packed)
+    for key in ARTIFACT_KEYS.values():
+        if isinstance(visual_data.get(key), bytes):
+            visual_data[key] = cv2.imdecode(np.frombuffer(visual_data[key], np.uint8), cv2.IMREAD_COLOR)
+    return visual_data
+
+def decode_image_pair(user_bytes, model_bytes):
+    img_user = decode_work_image(user_bytes)
+    img_model = decode_work_image(model_bytes)
+    if img_user is None or img_model is None:
+        raise ValueError("Invalid image data")
+    return img_user, img_model
+
+def decode_pair_profiles(user_bytes, model_bytes):
+    """
+    Worker pool entry point for the first streaming stage.
+    Returns (img_user, img_model, user_profile, model_profile).
+    """
+    img_user, img_model = decode_image_pair(user_bytes, model_bytes)
+    user_profile, model_profile = extract_pair_profiles(
+        img_user, img_model, content_hash(user_bytes), content_hash(model_bytes)
+    )
+    return img_user, img_model, user_profile, model_profile
+
+def process_image_pair(user_bytes, model_bytes, artifacts=ALL_ARTIFACTS):
+    """
+    Worker pool entry point for 'Vision Mode'.
+    Decodes both uploads and runs process_visuals_core inside the worker.
+    """
+    img_user, img_model = decode_image_pair(user_bytes, model_bytes)
+    return process_visuals_core(
+        img_user, img_model,
+        user_key=content_hash(user_bytes), model_key=content_hash(model_bytes),
+        artifacts=artifacts
+    )
+
+def decode_user_profile(user_bytes):
+    """
+    Worker pool entry point for batch comparisons: decodes the user upload and
+    extracts its body profile once, so it can be reused against every model.
+    """
+    img_user = decode_work_image(user_bytes)
+    if img_user is None:
+        raise ValueError("Invalid user image data")
+    user_profile = extract_body_profile(img_user, cache_key=content_hash(user_bytes))
+    if not user_profile:
+        raise ValueError("Could not detect full body in the user image")
+    return user_profile
+
+def process_model_for_user(model_bytes, user_profile, artifacts=("result",), specs=None):
+    """
+    Worker pool entry point for batch comparisons: one model image against a
+    precomputed user profile. Images are encoded inside the worker, so only the
+    ratios and the encoded outputs travel back to the caller.
+    Returns {model_ratios, result_ratios, result_heads, encoded}.
+    """
+    img_model = decode_work_image(model_bytes)
+    if img_model is None:
+        raise ValueError("Invalid model image data")
+    model_profile = extract_body_profile(img_model, cache_key=content_hash(model_bytes))
+    if not model_profile:
+        raise ValueError("Could not detect full body in the model image")
+
+    artifacts = tuple(name for name in artifacts if name != 'user_debug')
+    warp = warp_to_user_ratios(img_model, user_profile, model_profile)
+    debug_images = render_debug_images(None, img_model, user_profile, model_profile, warp, artifacts=artifacts)
+    visual_data = assemble_visual_data(user_profile, model_profile, warp, debug_images, artifacts=artifacts)
+    if specs is None:
+        specs = {name: {"source": name, "format": "jpeg"} for name in artifacts}
     return {
-        "final_result": result_img,
-        "final_result_debug": result_img_debug,
-        "user_debug": img_user_debug,
-        "model_debug": img_model_debug,
-        "user_ratios": user_ratios,
-        "model_ratios": model_ratios,
-        "result_ratios": res_ratios,
-        "result_heads": res_heads,
-        "user_landmarks": user_landmarks,
-        "model_landmarks": model_landmarks
+        "model_ratios": model_profile['ratios'],
+        "result_ratios": warp['ratios'],
+        "result_heads": warp['heads'],
+        "encoded": encode_visual_outputs(visual_data, specs)
     }
 
+def proportion_distance(user_ratios, model_ratios):
+    # RMS of the scaled ratio differences (0 = identical proportions)
+    terms = [
+        ((user_ratios[key] - model_ratios[key]) / scale) ** 2
+        for key, scale in PROPORTION_SCALES.items()
+        if key in user_ratios and key in model_ratios
+    ]
+    if not terms:
+        return float('inf')
+    return float(np.sqrt(np.mean(terms)))
+
+def proportion_similarity(user_ratios, model_ratios):
+    # 1.0 for identical proportions, towards 0 as they diverge
+    return round(1 / (1 + proportion_distance(user_ratios, model_ratios)), 4)
+
+def encode_visual_outputs(processed_data, specs):
+    # {output_name: (bytes, media_type)} for the encoding specs (see encoding.parse_encode_specs)
+    images = {name: processed_data.get(key) for name, key in ARTIFACT_KEYS.items()}
+    with span("encode"):
+        return encode_outputs(images, specs)
+
 def get_base64_results(processed_data):
-    # Converts images in the dict to base64
+    # Converts images in the dict to base64 (None for artifacts that were not rendered)
+    def encode_optional(img):
+        return encode_img(img) if img is not None else None
     return {
-        "result_image": encode_img(processed_data['final_result']),
-        "result_debug_image": encode_img(processed_data['final_result_debug']),
-        "user_debug_image": encode_img(processed_data['user_debug']),
-        "model_debug_image": encode_img(processed_data['model_debug']),
+        "result_image": encode_optional(processed_data.get('final_result')),
+        "result_debug_image": encode_optional(processed_data.get('final_result_debug')),
+        "user_debug_image": encode_optional(processed_data.get('user_debug')),
+        "model_debug_image": encode_optional(processed_data.get('model_debug')),
     }
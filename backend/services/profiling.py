@@ -0,0 +1,153 @@
+import os
+import time
+import pstats
+import cProfile
+import secrets
+import threading
+import contextvars
+from urllib.parse import parse_qs
+
+# Opt-in Request Profiling
+# Profiles a single /process-baseline or /process-ai request with cProfile and saves
+# the result under PROFILE_DIR as <id>.pstats (snakeviz / python -m pstats) plus a
+# <id>.txt summary. The id is returned in the X-Profile-Id response header.
+#
+# A request is profiled when it carries the server's token, either as an
+# 'X-Profile-Token' header or as a '?profile=<token>' query parameter:
+#   curl -H "X-Profile-Token: $PROFILE_TOKEN" -F user_image=@u.jpg -F model_image=@m.jpg .../process-baseline
+#
+# The event loop thread (request handling, Gemini calls) and every run_cv task of the
+# request (process_visuals_core etc., in worker threads or processes) are profiled and
+# merged into one profile. Other requests the event loop serves meanwhile may show up
+# in the loop part. Only one request is profiled at a time; others run unprofiled.
+#
+# PROFILE_TOKEN:           secret that enables profiling (profiling is off when unset)
+# PROFILE_ALLOWED_CLIENTS: optional comma separated client IPs allowed to request a profile
+# PROFILE_DIR:             output directory (default: logs/profiles)
+
+PROFILED_PATHS = ("/process-baseline", "/process-ai")
+PROFILE_SUMMARY_LINES = 40
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+_active = threading.Lock()
+_profile = contextvars.ContextVar("request_profile", default=None)
+
+def get_profile_dir():
+    return os.environ.get("PROFILE_DIR") or os.path.join(ROOT_DIR, 'logs', 'profiles')
+
+def is_profiling_authorized(token, client_host):
+    expected = os.environ.get("PROFILE_TOKEN")
+    if not expected or not token:
+        return False
+    if not secrets.compare_digest(token.encode("utf-8"), expected.encode("utf-8")):
+        return False
+    allowed = [host.strip() for host in os.environ.get("PROFILE_ALLOWED_CLIENTS", "").split(',') if host.strip()]
+    return not allowed or client_host in allowed
+
+class _RawStats:
+    # Adapter so pstats.Stats can load a stats dict shipped back from a worker
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+class RequestProfile:
+    """
+    Stats of one profiled request: the event loop profiler plus the stats of its CV tasks.
+    """
+    def __init__(self):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}"
+        self.profiler = cProfile.Profile()
+        self.worker_stats = []
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        stats = pstats.Stats(self.profiler)
+        for raw in self.worker_stats:
+            stats.add(_RawStats(raw))
+        path = os.path.join(directory, f"{self.id}.pstats")
+        stats.dump_stats(path)
+        with open(os.path.join(directory, f"{self.id}.txt"), 'w', encoding='utf-8') as f:
+            stats.stream = f
+            stats.sort_stats('cumulative').print_stats(PROFILE_SUMMARY_LINES)
+        return path
+
+def is_profiling():
+    return _profile.get() is not None
+
+def run_profiled(fn, args, kwargs):
+    """
+    Worker-side wrapper (see cv_pool.run_cv): runs fn under its own profiler and
+    returns (result, raw stats). Must stay a module-level function to be picklable.
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ (thread pool): profiling is interpreter-wide, the request's profiler already covers this thread
+        return fn(*args, **kwargs), {}
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    return result, profiler.stats
+
+def add_worker_stats(stats):
+    profile = _profile.get()
+    if profile is not None and stats:
+        profile.worker_stats.append(stats)
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware: profiles authorized requests to PROFILED_PATHS and adds X-Profile-Id.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in PROFILED_PATHS:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        token = headers.get(b"x-profile-token", b"").decode("latin-1")
+        if not token:
+            token = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("profile", [""])[0]
+        client = scope.get("client")
+        if not token or not is_profiling_authorized(token, client[0] if client else None):
+            return await self.app(scope, receive, send)
+        if not _active.acquire(blocking=False):
+            print("[Profile] Another request is being profiled, running unprofiled")
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile()
+        try:
+            profile.profiler.enable()
+        except ValueError as e:
+            # Another profiler (e.g. a debugger or coverage tool) is already active
+            _active.release()
+            print(f"[Profile] Could not start profiler, running unprofiled: {e}")
+            return await self.app(scope, receive, send)
+        context_token = _profile.set(profile)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = dict(message, headers=list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.id.encode("latin-1"))
+                ])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.profiler.disable()
+            _profile.reset(context_token)
+            try:
+                path = profile.save(get_profile_dir())
+                print(f"[Profile] Saved {scope['path']} profile to {path}")
+            except OSError as e:
+                print(f"[Profile] Could not save profile {profile.id}: {e}")
+            finally:
+                _active.release()
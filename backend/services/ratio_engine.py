@@ -0,0 +1,138 @@
+import numpy as np
+
+# Vectorized Ratio Engine
+# Array-backed version of cv_utils.calculate_body_ratios for catalog-scale comparisons.
+# Many bodies are stored as one (N, K) float64 array with LANDMARK_COLUMNS; every ratio
+# is computed in a single NumPy pass into an (N, R) array with RATIO_COLUMNS.
+# For a single body the values are bit-identical to calculate_body_ratios.
+# Missing optional values (chin_y, face_width, head_height, widths) are NaN.
+
+LANDMARK_COLUMNS = (
+    'top_y', 'chin_y', 'eye_y', 'shoulder_y', 'hip_y', 'knee_y', 'ankle_y', 'heel_y',
+    'shoulder_width_px', 'hip_width_px', 'face_width',
+    # precise_head_height (face detection height), NaN when there was no face
+    'head_height',
+)
+RATIO_COLUMNS = (
+    'head', 'torso', 'legs', 'head_stat_ratio',
+    'r1_head', 'r2_neck', 'r3_torso', 'r4_thigh', 'r5_shin',
+    'shoulder_heads', 'hip_heads', 'face_aspect_ratio',
+)
+LANDMARK_INDEX = {name: i for i, name in enumerate(LANDMARK_COLUMNS)}
+RATIO_INDEX = {name: i for i, name in enumerate(RATIO_COLUMNS)}
+
+# Ratio -> typical spread between people, so every term of the similarity distance weighs about the same
+PROPORTION_SCALES = {
+    'head_stat_ratio': 0.02,
+    'legs': 0.05,
+    'r1_head': 0.02,
+    'r2_neck': 0.02,
+    'r3_torso': 0.03,
+    'r4_thigh': 0.03,
+    'r5_shin': 0.03,
+    'shoulder_heads': 0.3,
+    'hip_heads': 0.3,
+}
+
+def landmarks_to_array(landmarks_list, head_heights=None):
+    """
+    Packs landmark dicts (as produced by BodyDetection.head_estimate)
+    into an (N, len(LANDMARK_COLUMNS)) float64 array.
+    head_heights: optional per-body precise head heights (None for no face).
+    """
+    array = np.full((len(landmarks_list), len(LANDMARK_COLUMNS)), np.nan)
+    for row, landmarks in enumerate(landmarks_list):
+        for name, col in LANDMARK_INDEX.items():
+            value = landmarks.get(name)
+            if value is not None:
+                array[row, col] = value
+        head_height = head_heights[row] if head_heights is not None else None
+        array[row, LANDMARK_INDEX['head_height']] = head_height if head_height else np.nan
+    return array
+
+def calculate_body_ratios_array(landmarks):
+    """
+    (N, K) landmark array -> (N, R) ratio array. Same formulas, fallbacks and
+    operation order as calculate_body_ratios, applied to every row at once.
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+
+    def col(name):
+        return landmarks[:, LANDMARK_INDEX[name]]
+
+    top_y = col('top_y')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        head_segment_len = col('shoulder_y') - top_y
+        torso_len = col('hip_y') - col('shoulder_y')
+        leg_len = col('ankle_y') - col('hip_y')
+        total_len = head_segment_len + torso_len + leg_len
+
+        # Head height for stats: precise (face) height, else estimated from the eyes
+        eye_to_top = col('eye_y') - top_y
+        estimated = np.where(eye_to_top > 0, eye_to_top * 2.0, head_segment_len * 0.6)
+        precise = col('head_height')
+        has_precise = ~np.isnan(precise) & (precise != 0)
+        stats_head_height = np.where(has_precise, precise, estimated)
+
+        body_height_px = col('heel_y') - top_y
+        body_height_px = np.where(body_height_px <= 0, 1, body_height_px)
+
+        # Detailed ratios for 5-segment warping
+        chin_y = col('chin_y')
+        chin_y = np.where(np.isnan(chin_y), top_y + (head_segment_len * 0.6), chin_y)
+        h1_head = chin_y - top_y
+        h2_neck = col('shoulder_y') - chin_y
+        h3_torso = col('hip_y') - col('shoulder_y')
+        h4_thigh = col('knee_y') - col('hip_y')
+        h5_shin = col('heel_y') - col('knee_y')
+        total_5_seg = h1_head + h2_neck + h3_torso + h4_thigh + h5_shin
+        total_5_seg = np.where(total_5_seg <= 0, 1, total_5_seg)
+
+        shoulder_width_px = np.where(np.isnan(col('shoulder_width_px')), 100, col('shoulder_width_px'))
+        hip_width_px = np.where(np.isnan(col('hip_width_px')), 100, col('hip_width_px'))
+        face_width = col('face_width')
+        face_width = np.where(np.isnan(face_width), stats_head_height * 0.7, face_width)
+        face_width = np.where(face_width <= 0, 1, face_width)
+
+        has_total = total_len > 0
+        ratios = np.empty((landmarks.shape[0], len(RATIO_COLUMNS)))
+        ratios[:, RATIO_INDEX['head']] = np.where(has_total, head_segment_len / total_len, 0.15)
+        ratios[:, RATIO_INDEX['torso']] = np.where(has_total, torso_len / total_len, 0.35)
+        ratios[:, RATIO_INDEX['legs']] = np.where(has_total, leg_len / total_len, 0.5)
+        ratios[:, RATIO_INDEX['head_stat_ratio']] = stats_head_height / body_height_px
+        ratios[:, RATIO_INDEX['r1_head']] = h1_head / total_5_seg
+        ratios[:, RATIO_INDEX['r2_neck']] = h2_neck / total_5_seg
+        ratios[:, RATIO_INDEX['r3_torso']] = h3_torso / total_5_seg
+        ratios[:, RATIO_INDEX['r4_thigh']] = h4_thigh / total_5_seg
+        ratios[:, RATIO_INDEX['r5_shin']] = h5_shin / total_5_seg
+        ratios[:, RATIO_INDEX['shoulder_heads']] = shoulder_width_px / face_width
+        ratios[:, RATIO_INDEX['hip_heads']] = hip_width_px / face_width
+        ratios[:, RATIO_INDEX['face_aspect_ratio']] = np.where(
+            stats_head_height > 0, face_width / stats_head_height, 0.7
+        )
+    return ratios
+
+def ratios_to_array(ratios_list):
+    # Ratio dicts (calculate_body_ratios output) -> (N, R) array
+    return np.array([[ratios[name] for name in RATIO_COLUMNS] for ratios in ratios_list], dtype=np.float64)
+
+def ratios_to_dicts(ratios):
+    # (N, R) array -> list of ratio dicts with plain Python floats
+    return [dict(zip(RATIO_COLUMNS, row)) for row in np.asarray(ratios).tolist()]
+
+def proportion_distances(user_ratios, ratios, scales=PROPORTION_SCALES):
+    """
+    Distance between one body's ratios (dict or (R,) row) and every row of an (N, R)
+    ratio array: RMS of the differences scaled by scales (0 = identical).
+    """
+    if isinstance(user_ratios, dict):
+        # Only the compared ratios are needed (e.g. ratios sent back by a client)
+        row = np.full(len(RATIO_COLUMNS), np.nan)
+        for name in scales:
+            row[RATIO_INDEX[name]] = user_ratios[name]
+        user_ratios = row
+    columns = [RATIO_INDEX[name] for name in scales]
+    scales = np.array(list(scales.values()))
+    diffs = (np.asarray(ratios)[:, columns] - np.asarray(user_ratios)[columns]) / scales
+    return np.sqrt(np.mean(diffs ** 2, axis=1))
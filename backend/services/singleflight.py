@@ -0,0 +1,44 @@
+import asyncio
+from .cache import content_hash
+from .metrics import count
+
+# Single-flight Request Coalescing
+# Double clicks and client retries often send the same request while the first one is
+# still running. SingleFlight.run() runs the work once per key; concurrent callers with
+# the same key await that run and share its result (or its exception) instead of
+# repeating the CV pipeline and the Gemini calls.
+#
+# The work runs in its own task: a caller that disconnects does not cancel it for the
+# callers still waiting. Results are only shared while the work is in flight; reuse
+# after completion is the job of the caches (landmarks, AI results).
+
+def flight_key(*parts):
+    # Bytes (uploads) are hashed, other parts (parameters) are used as text
+    return content_hash(":".join(content_hash(part) if isinstance(part, bytes) else str(part) for part in parts).encode("utf-8"))
+
+def _consume_exception(task):
+    # Keeps asyncio from logging "exception was never retrieved" when every caller went away
+    if not task.cancelled():
+        task.exception()
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._inflight = {}  # key -> asyncio.Task
+        self.coalesced = 0
+
+    async def run(self, key, fn, *args, **kwargs):
+        task = self._inflight.get(key)
+        if task is not None and not task.done():
+            self.coalesced += 1
+            count("factbomb_coalesced_requests_total", flight=self.name)
+            print(f"[SingleFlight] {self.name}: joined in-flight request {key[:12]}")
+        else:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(_consume_exception)
+            task.add_done_callback(lambda done: self._inflight.pop(key, None) if self._inflight.get(key) is done else None)
+        return await asyncio.shield(task)
+
+    def __len__(self):
+        return len(self._inflight)
@@ -0,0 +1,88 @@
+import os
+import json
+from fastapi import HTTPException
+
+# Upload Size Limits
+# Uploads are bounded before they are buffered, so one oversized photo cannot spike
+# the memory of a small instance:
+#   - UploadLimitMiddleware rejects a request whose Content-Length is already too large
+#     before the body is read, and stops reading a body (e.g. chunked) once it exceeds
+#     the limit. Both answer 413.
+#   - read_upload() reads an UploadFile (spooled to disk by the form parser beyond 1 MB)
+#     into memory only up to MAX_UPLOAD_BYTES, instead of await upload.read().
+# Decoding is bounded separately (MAX_IMAGE_PIXELS, MAX_DECODE_SIDE in cv_utils).
+#
+# MAX_UPLOAD_BYTES: max size of one uploaded image (default 20 MB, 0 disables the limits)
+
+DEFAULT_MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+# Allowance for the multipart boundaries, part headers and the form fields of one request
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+def get_max_upload_bytes():
+    return int(os.environ.get("MAX_UPLOAD_BYTES", DEFAULT_MAX_UPLOAD_BYTES) or 0)
+
+def upload_too_large(limit, name=None):
+    what = f"Upload '{name}'" if name else "Request body"
+    return HTTPException(status_code=413, detail=f"{what} is too large (max {limit} bytes per image)")
+
+async def read_upload(upload):
+    """
+    The content of an UploadFile, read at most MAX_UPLOAD_BYTES (+1 to detect overflow)
+    into memory. Raises HTTPException 413 when the file is larger.
+    """
+    limit = get_max_upload_bytes()
+    if not limit:
+        return await upload.read()
+    if upload.size is not None and upload.size > limit:
+        raise upload_too_large(limit, upload.filename)
+    data = await upload.read(limit + 1)
+    if len(data) > limit:
+        raise upload_too_large(limit, upload.filename)
+    return data
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware: caps the request body at MAX_UPLOAD_BYTES * max_files(path) plus the
+    form overhead. max_files maps a request path to the number of images it accepts.
+    """
+    def __init__(self, app, max_files=lambda path: 2):
+        self.app = app
+        self.max_files = max_files
+
+    async def __call__(self, scope, receive, send):
+        limit = get_max_upload_bytes()
+        if scope["type"] != "http" or not limit:
+            return await self.app(scope, receive, send)
+        max_body = limit * self.max_files(scope["path"]) + FORM_OVERHEAD_BYTES
+
+        content_length = dict(scope.get("headers") or []).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body:
+            # Declared too large: answer before reading any of the body
+            print(f"[Uploads] Rejected {scope['path']}: Content-Length {int(content_length)} > {max_body}")
+            body = json.dumps({"detail": upload_too_large(limit).detail}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                    (b"connection", b"close"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    # Raised inside the form parsing, FastAPI turns it into the 413 response
+                    print(f"[Uploads] Rejected {scope['path']}: body exceeds {max_body} bytes")
+                    raise upload_too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,61 @@
+import os
+import time
+import asyncio
+from .cv_pool import run_cv, get_pool_config
+from .cv_utils import get_mediapipe, warm_up_detectors
+
+# Startup Warm-up
+# MediaPipe and the Gemini SDK are imported lazily, so importing the app is fast.
+# warm_up() runs in the background at startup: it imports both and runs one dummy
+# inference per CV worker, so the first real request does not pay for it.
+# GET /ready reports ready only once this has finished (GET /health is liveness only).
+#
+# WARMUP_ON_STARTUP: '1' (default) or '0' to skip warm-up (ready immediately, first requests are slower)
+
+_readiness = {"status": "starting", "timings": {}}
+
+def is_warmup_enabled():
+    return os.environ.get("WARMUP_ON_STARTUP", "1").lower() not in ("0", "false", "no")
+
+def get_readiness():
+    return dict(_readiness)
+
+def mark_ready(status="ready", timings=None):
+    _readiness["status"] = status
+    _readiness["timings"] = timings or {}
+
+def _import_sdks():
+    timings = {}
+    start = time.perf_counter()
+    get_mediapipe()
+    timings['import_mediapipe'] = time.perf_counter() - start
+    start = time.perf_counter()
+    from google import genai  # noqa: F401
+    timings['import_genai'] = time.perf_counter() - start
+    return timings
+
+async def warm_up():
+    """
+    Imports the heavy SDKs and warms up the detectors of every CV worker (best effort:
+    one task per worker, submitted together so each idle worker picks one up).
+    Never raises; failures leave the service not ready and are logged.
+    """
+    _readiness["status"] = "warming_up"
+    start = time.perf_counter()
+    try:
+        timings = await asyncio.to_thread(_import_sdks)
+        detectors_start = time.perf_counter()
+        _, workers = get_pool_config()
+        await asyncio.gather(*[run_cv(warm_up_detectors) for _ in range(workers)])
+        timings['detectors'] = time.perf_counter() - detectors_start
+        timings['total'] = time.perf_counter() - start
+    except Exception as e:
+        print(f"[Warmup] Failed: {e}")
+        _readiness["status"] = "failed"
+        _readiness["error"] = str(e)
+        return
+    timings = {name: round(seconds, 3) for name, seconds in timings.items()}
+    mark_ready(timings=timings)
+    print(f"[Warmup] Ready in {timings['total']:.2f}s "
+          f"(mediapipe import {timings['import_mediapipe']:.2f}s, genai import {timings['import_genai']:.2f}s, "
+          f"{workers} detector warm-ups {timings['detectors']:.2f}s)")
@@ -1,3 +1,4 @@
+import os
 import pytest
 from httpx import AsyncClient, ASGITransport
 from backend.main import app
@@ -8,3 +9,14 @@ async def client():
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as c:
         yield c
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'samples')
+
+@pytest.fixture(scope="session")
+def pair_files():
+    # The sample user / model photos as multipart 'files' of the pair endpoints
+    files = {}
+    for field, name in (('user_image', 'sample_user.png'), ('model_image', 'sample_model.png')):
+        with open(os.path.join(SAMPLES_DIR, name), 'rb') as f:
+            files[field] = (name, f.read(), 'image/png')
+    return files
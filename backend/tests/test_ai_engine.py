@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from backend.services import ai_engine
+
+class FakeModels:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("429 RESOURCE_EXHAUSTED")
+            return SimpleNamespace(text="ok")
+        finally:
+            self.in_flight -= 1
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    models = FakeModels()
+    monkeypatch.setattr(ai_engine, "get_gemini_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=models)))
+    monkeypatch.setenv("GEMINI_BACKOFF_BASE", "0")
+    return models
+
+@pytest.mark.asyncio
+async def test_rate_limit_is_retried(fake_models):
+    fake_models.failures = 2
+    response = await ai_engine.generate_content_async("model", ["prompt"])
+    assert response.text == "ok"
+    assert fake_models.calls == 3
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded(fake_models, monkeypatch):
+    monkeypatch.setenv("GEMINI_MAX_CONCURRENCY", "2")
+    ai_engine._semaphores.clear()
+    await asyncio.gather(*[ai_engine.generate_content_async("model", ["prompt"]) for _ in range(6)])
+    assert fake_models.max_in_flight == 2
@@ -0,0 +1,17 @@
+import os
+import pytest
+from backend.benchmarks import cv_stages
+
+# Timing-sensitive, so only run on demand: RUN_BENCHMARKS=1 pytest backend/tests/test_benchmarks.py
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run benchmarks")
+def test_cv_stages_within_baseline():
+    results = cv_stages.run_benchmarks(repeat=int(os.environ.get("BENCHMARK_REPEAT", "10")))
+    regressions = cv_stages.find_regressions(results, cv_stages.load_baseline())
+    assert not regressions, "\n".join(regressions)
+
+def test_regression_gate_flags_slow_stages():
+    baseline = {"sample": {"pose": {"p50_ms": 10.0, "peak_mb": 1.0}}}
+    fast = {"sample": {"pose": {"p50_ms": 12.0, "peak_mb": 1.1}}}
+    slow = {"sample": {"pose": {"p50_ms": 30.0, "peak_mb": 5.0}}}
+    assert cv_stages.find_regressions(fast, baseline, 0.5, 0.2) == []
+    assert len(cv_stages.find_regressions(slow, baseline, 0.5, 0.2)) == 2
@@ -0,0 +1,54 @@
+import os
+import cv2
+from backend.services import mode_vision
+from backend.services.cache import TieredCache, content_hash
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'samples')
+
+def test_lru_eviction_and_stats():
+    cache = TieredCache("test", max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # evicts "b" (least recently used)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    key = content_hash(b"model image")
+    TieredCache("test", disk_dir=str(tmp_path)).put(key, {"top_y": 10})
+    restarted = TieredCache("test", disk_dir=str(tmp_path))
+    assert restarted.get(key) == {"top_y": 10}
+    assert restarted.stats()["disk_hits"] == 1
+
+def test_ttl_expiry():
+    cache = TieredCache("test", ttl=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+def test_repeat_profile_skips_mediapipe(monkeypatch):
+    img = cv2.imread(os.path.join(SAMPLES_DIR, 'sample_model.png'))
+    key = content_hash(img.tobytes())
+    first = mode_vision.extract_body_profile(img, cache_key=key)
+    assert first is not None
+
+    def fail(*args, **kwargs):
+        raise AssertionError("MediaPipe should not run on a cache hit")
+    monkeypatch.setattr(mode_vision, "detect_body", fail)
+
+    second = mode_vision.extract_body_profile(img, cache_key=key)
+    assert second == first
+
+def test_byte_budget_evicts_oldest():
+    cache = TieredCache("test", max_entries=10, max_bytes=10, sizeof=len)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    cache.put("c", b"123")  # over budget: evicts "a"
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 8
+    cache.put("big", b"x" * 11)  # larger than the whole budget: not kept
+    assert cache.get("big") is None
+    assert cache.get("b") == b"12345"
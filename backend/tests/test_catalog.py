@@ -0,0 +1,110 @@
+import os
+import json
+import shutil
+import cv2
+import numpy as np
+import pytest
+from backend.services import catalog
+from backend.services.catalog import CatalogIndex, build_catalog_index, sidecar_path
+from backend.services.ratio_engine import RATIO_COLUMNS
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'samples')
+
+@pytest.fixture
+def catalog_index(tmp_path, monkeypatch):
+    photos = tmp_path / "photos"
+    (photos / "rail").mkdir(parents=True)
+    shutil.copy(os.path.join(SAMPLES_DIR, 'sample_model.png'), photos / "model.png")
+    shutil.copy(os.path.join(SAMPLES_DIR, 'sample_user.png'), photos / "rail" / "user.png")
+    shutil.copy(os.path.join(SAMPLES_DIR, 'sample_user.png'), photos / "rail" / "user_copy.png")
+    (photos / "notes.txt").write_text("not a photo")
+    index_path = str(tmp_path / "index" / "catalog.npy")
+
+    indexed, skipped = build_catalog_index(str(photos), index_path, workers=1)
+    assert (indexed, skipped) == (2, [])
+    monkeypatch.setenv("CATALOG_INDEX_PATH", index_path)
+    return index_path
+
+def test_index_layout_and_nearest(catalog_index, pair_files):
+    with open(sidecar_path(catalog_index), encoding='utf-8') as f:
+        meta = json.load(f)
+    assert [model['path'] for model in meta['models']] == ['model.png', 'rail/user.png']
+
+    catalog = CatalogIndex(catalog_index)
+    assert isinstance(catalog.data, np.memmap)
+    assert catalog.ratios.shape == (2, len(RATIO_COLUMNS))
+
+    user_ratios = dict(zip(RATIO_COLUMNS, catalog.ratios[1].tolist()))
+    matches = catalog.nearest(user_ratios, k=5)
+    assert [match['path'] for match in matches] == ['rail/user.png', 'model.png']
+    assert matches[0]['distance'] == 0
+    assert catalog.read_image(matches[0]['id']) == pair_files['user_image'][1]
+
+def test_unreadable_and_oversized_photos_are_skipped(tmp_path, monkeypatch):
+    photos = tmp_path / "photos"
+    photos.mkdir()
+    shutil.copy(os.path.join(SAMPLES_DIR, 'sample_model.png'), photos / "model.png")
+    large = cv2.resize(cv2.imread(os.path.join(SAMPLES_DIR, 'sample_user.png')), (2048, 2048))
+    cv2.imwrite(str(photos / "large.jpg"), large)
+    (photos / "moved.jpg").symlink_to(photos / "gone.jpg")  # open() raises FileNotFoundError
+    monkeypatch.setenv("MAX_IMAGE_PIXELS", str(1024 * 1024))
+
+    indexed, skipped = build_catalog_index(str(photos), str(tmp_path / "catalog.npy"), workers=1)
+    assert (indexed, skipped) == (1, ['large.jpg', 'moved.jpg'])
+
+@pytest.mark.asyncio
+async def test_nearest_and_batch_endpoints(client, catalog_index, pair_files):
+    catalog = CatalogIndex(catalog_index)
+    user_ratios = {name: catalog.ratios[0][i] for i, name in enumerate(RATIO_COLUMNS)}
+    response = await client.post("/catalog/nearest", data={"user_ratios_json": json.dumps(user_ratios), "k": "1"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data['catalog_size'] == 2
+    assert [match['path'] for match in data['matches']] == ['model.png']
+
+    model_id = data['matches'][0]['id']
+    files = {'user_image': pair_files['user_image']}
+    response = await client.post("/process-batch", files=files, data={"model_ids": model_id})
+    assert response.status_code == 200
+    assert response.json()['results'][0]['id'] == model_id
+
+    response = await client.post("/process-batch", files=files, data={"model_ids": "missing"})
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_batch_lists_moved_catalog_photos_as_failed(client, catalog_index, pair_files):
+    catalog = CatalogIndex(catalog_index)
+    model_ids = [model['id'] for model in catalog.models]
+    os.remove(catalog.image_path(model_ids[0]))
+
+    files = {'user_image': pair_files['user_image']}
+    response = await client.post("/process-batch", files=files, data={"model_ids": ",".join(model_ids)})
+    assert response.status_code == 200
+    data = response.json()
+    assert [entry['id'] for entry in data['results']] == [model_ids[1]]
+    assert data['failed'] == [{
+        "index": 0, "id": model_ids[0], "filename": catalog.models[0]['path'],
+        "detail": "Catalog image is missing or unreadable"
+    }]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("user_ratios_json", [
+    '5',
+    '{"head_stat_ratio": 0, "legs": 0.5, "shoulder_heads": 2}',
+    '{"head_stat_ratio": "tall", "legs": 0.5, "shoulder_heads": 2}',
+    '{"head_stat_ratio": 0.13, "legs": NaN, "shoulder_heads": 2}',
+    '{"head_stat_ratio": 0.13, "legs": 0.5}',
+])
+async def test_nearest_rejects_invalid_ratios(client, catalog_index, user_ratios_json):
+    response = await client.post("/catalog/nearest", data={"user_ratios_json": user_ratios_json})
+    assert response.status_code == 400
+
+def test_failed_catalog_load_is_not_retried(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(catalog, "_catalog", None)
+    monkeypatch.setattr(catalog, "_failed_index", None)
+    index_path = tmp_path / "broken.npy"
+    index_path.write_bytes(b"not an index")
+    monkeypatch.setenv("CATALOG_INDEX_PATH", str(index_path))
+    assert catalog.get_catalog() is None
+    assert catalog.get_catalog() is None
+    assert capsys.readouterr().out.count("Could not load") == 1
@@ -0,0 +1,42 @@
+import json
+import numpy as np
+import pytest
+from backend.services.encoding import encode_image, encode_outputs, parse_encode_specs
+
+def noisy_image(h=600, w=400):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 255, size=(h, w, 3), dtype=np.uint8)
+
+def test_default_specs_are_jpeg_per_artifact():
+    specs = parse_encode_specs(None, ("result", "user_debug"))
+    assert specs == {
+        "result": {"source": "result", "format": "jpeg"},
+        "user_debug": {"source": "user_debug", "format": "jpeg"},
+    }
+
+def test_invalid_specs_are_rejected():
+    with pytest.raises(ValueError):
+        parse_encode_specs(json.dumps({"result": {"format": "gif"}}), ("result",))
+    with pytest.raises(ValueError):
+        parse_encode_specs(json.dumps({"preview": {"source": "model_debug"}}), ("result",))
+
+def test_byte_budget_and_max_side():
+    img = noisy_image()
+    data, media_type = encode_image(img, format="webp", max_side=200, max_bytes=15000)
+    assert media_type == "image/webp"
+    assert len(data) <= 15000
+
+def test_preview_and_full_size_outputs():
+    img = noisy_image()
+    specs = parse_encode_specs(json.dumps({
+        "result": {"format": "jpeg", "quality": 90},
+        "result_preview": {"source": "result", "max_side": 100},
+    }), ("result",))
+    encoded = encode_outputs({"result": img}, specs)
+    assert set(encoded) == {"result", "result_preview"}
+    assert len(encoded["result_preview"][0]) < len(encoded["result"][0])
+
+def test_non_positive_or_non_integer_options_are_rejected():
+    for options in ({"max_side": -1}, {"max_bytes": 0}, {"quality": [90]}, {"max_side": {"px": 10}}, {"quality": "high"}):
+        with pytest.raises(ValueError):
+            parse_encode_specs(json.dumps({"result": options}), ("result",))
@@ -0,0 +1,41 @@
+import time
+import sqlite3
+import pytest
+from backend.services.jobs import MemoryJobStore, SqliteJobStore
+
+def test_sqlite_store_is_shared_and_expires(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    job = {"id": "abc", "kind": "process-ai", "status": "queued", "created_at": time.time(), "updated_at": time.time()}
+    SqliteJobStore(path, ttl=60).put(job)
+
+    # A second store on the same file (another worker process) sees the job and its updates
+    other = SqliteJobStore(path, ttl=60)
+    assert other.get("abc") == job
+    other.put(dict(job, status="done", result={"active": {"image": None}}))
+    assert SqliteJobStore(path, ttl=60).get("abc")['result'] == {"active": {"image": None}}
+
+    SqliteJobStore(path, ttl=0).put(dict(job, id="gone"))
+    assert other.get("gone") is None
+    assert other.get("missing") is None
+
+def test_sqlite_store_closes_its_connections(tmp_path):
+    store = SqliteJobStore(str(tmp_path / "jobs.sqlite3"), ttl=60)
+    opened = []
+    connect = store._connect
+    def tracking_connect():
+        opened.append(connect())
+        return opened[-1]
+    store._connect = tracking_connect
+
+    store.put({"id": "abc", "status": "queued"})
+    assert store.get("abc")['status'] == "queued"
+    assert len(opened) == 2
+    for db in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            db.execute("SELECT 1")
+
+def test_memory_store_returns_copies():
+    store = MemoryJobStore(ttl=60)
+    store.put({"id": "a", "status": "queued"})
+    store.get("a")['status'] = "done"
+    assert store.get("a")['status'] == "queued"
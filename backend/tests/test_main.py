@@ -1,7 +1,364 @@
+import os
+import sys
+import json
+import asyncio
+import pstats
+import subprocess
+import numpy as np
 import pytest
+from backend import main
+from backend.services import admission, ai_cache, artifact_store, jobs, mode_vision, warmup
+from backend.services.analysis_store import load_analysis
 
 @pytest.mark.asyncio
 async def test_health_check(client):
     response = await client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+@pytest.mark.asyncio
+async def test_process_baseline(client, pair_files):
+    response = await client.post("/process-baseline", files=pair_files, data={"language": "en"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data['baseline']['image']
+    assert data['baseline']['analysis']['fact_bomb']
+    assert 'r1_head' in data['meta']['user_ratios']
+    assert data['meta']['analysis_id']
+
+@pytest.mark.asyncio
+async def test_process_baseline_invalid_image(client):
+    files = {
+        'user_image': ('user.png', b'not an image', 'image/png'),
+        'model_image': ('model.png', b'not an image', 'image/png'),
+    }
+    response = await client.post("/process-baseline", files=files)
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_process_ai_unknown_analysis_id(client):
+    response = await client.post("/process-ai", data={"mode": "pro", "analysis_id": "missing"})
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_process_ai_requires_images_or_analysis_id(client):
+    response = await client.post("/process-ai", data={"mode": "pro"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_process_stream_emits_stages_in_order(client, pair_files):
+    response = await client.post("/process-stream", files=pair_files, data={"mode": "basic", "language": "en"})
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines() if line]
+    assert [e['stage'] for e in events] == ['ratios', 'result', 'debug', 'done']
+    assert events[0]['analysis']['fact_bomb']
+    assert events[1]['image']
+    assert events[-1]['analysis_id']
+
+@pytest.mark.asyncio
+async def test_process_baseline_artifact_urls(client, pair_files):
+    response = await client.post("/process-baseline", files=pair_files, data={"response_format": "url"})
+    assert response.status_code == 200
+    baseline = response.json()['baseline']
+    assert 'image' not in baseline
+
+    image = await client.get(baseline['image_url'])
+    assert image.status_code == 200
+    assert image.headers['content-type'] == 'image/jpeg'
+    assert 'max-age' in image.headers['cache-control']
+    assert image.content[:2] == b'\xff\xd8'
+
+    missing = await client.get("/artifacts/unknown/result")
+    assert missing.status_code == 404
+
+@pytest.mark.asyncio
+async def test_artifact_store_is_bounded_by_bytes(client, pair_files, monkeypatch):
+    # A set larger than ARTIFACT_STORE_MAX_BYTES is not kept, its links expire immediately
+    monkeypatch.setenv("ARTIFACT_STORE_MAX_BYTES", "1000")
+    monkeypatch.setattr(artifact_store, "_store", None)
+    response = await client.post("/process-baseline", files=pair_files, data={"response_format": "url"})
+    assert response.status_code == 200
+
+    image = await client.get(response.json()['baseline']['image_url'])
+    assert image.status_code == 404
+    assert artifact_store.get_artifact_store().stats()['bytes'] == 0
+
+@pytest.mark.asyncio
+async def test_process_baseline_multipart(client, pair_files):
+    response = await client.post("/process-baseline", files=pair_files, data={"response_format": "multipart"})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('multipart/mixed; boundary=')
+    assert response.content.count(b'Content-Type: image/jpeg') == 3
+
+@pytest.mark.asyncio
+async def test_process_baseline_unknown_artifact(client, pair_files):
+    response = await client.post("/process-baseline", files=pair_files, data={"artifacts": "result,hologram"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_process_batch_ranks_models(client, pair_files):
+    files = [
+        ('user_image', pair_files['user_image']),
+        ('model_images', pair_files['model_image']),
+        ('model_images', ('broken.png', b'not an image', 'image/png')),
+        ('model_images', pair_files['user_image']),
+    ]
+    response = await client.post("/process-batch", files=files, data={"language": "en"})
+    assert response.status_code == 200
+    data = response.json()
+    # The user compared against their own photo has identical proportions
+    assert [r['filename'] for r in data['results']] == ['sample_user.png', 'sample_model.png']
+    assert [r['rank'] for r in data['results']] == [1, 2]
+    assert data['results'][0]['similarity'] == 1.0
+    assert data['results'][1]['analysis']['fact_bomb']
+    assert data['results'][1]['image']
+    assert data['failed'][0]['index'] == 1
+
+@pytest.mark.asyncio
+async def test_metrics_server_timing_and_exposition(client, pair_files):
+    response = await client.post("/process-baseline", files=pair_files, data={"language": "en", "artifacts": "result"})
+    assert response.status_code == 200
+    timing = response.headers['server-timing']
+    assert 'decode;dur=' in timing and 'warp;dur=' in timing and 'total;dur=' in timing
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith("text/plain")
+    text = response.text
+    assert '# TYPE factbomb_stage_duration_seconds histogram' in text
+    assert 'factbomb_stage_duration_seconds_count{endpoint="/process-baseline",mode="basic",stage="warp"}' in text
+    assert 'factbomb_requests_total{endpoint="/process-baseline",status="200"}' in text
+
+@pytest.mark.asyncio
+async def test_process_baseline_profiling(client, monkeypatch, tmp_path, pair_files):
+    monkeypatch.setenv("PROFILE_TOKEN", "secret")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    # Wrong token: served normally, not profiled
+    response = await client.post("/process-baseline?profile=wrong", files=pair_files, data={"artifacts": "result"})
+    assert response.status_code == 200
+    assert 'x-profile-id' not in response.headers
+
+    response = await client.post("/process-baseline", files=pair_files, data={"artifacts": "result"},
+                                 headers={"X-Profile-Token": "secret"})
+    assert response.status_code == 200
+    profile_id = response.headers['x-profile-id']
+    stats = pstats.Stats(str(tmp_path / f"{profile_id}.pstats"))
+    # CV worker stats are merged into the request profile
+    assert any(func[2] == 'process_visuals_core' for func in stats.stats)
+    assert (tmp_path / f"{profile_id}.txt").exists()
+
+@pytest.mark.asyncio
+async def test_ready_after_warm_up(client, monkeypatch):
+    monkeypatch.setattr(warmup, "_readiness", {"status": "starting", "timings": {}})
+    response = await client.get("/ready")
+    assert response.status_code == 503
+    assert (await client.get("/health")).status_code == 200
+
+    await warmup.warm_up()
+    response = await client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()['timings']['detectors'] >= 0
+
+def test_import_is_lazy():
+    # MediaPipe and the Gemini SDK are only imported by warm-up / first use
+    code = "import sys, backend.main; print('mediapipe' in sys.modules, 'google.genai' in sys.modules)"
+    root = os.path.join(os.path.dirname(__file__), '..', '..')
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert output.split()[-2:] == ['False', 'False']
+
+@pytest.mark.asyncio
+async def test_process_ai_reuses_cached_result(client, monkeypatch, pair_files):
+    monkeypatch.setattr(ai_cache, "_cache", None)
+    monkeypatch.delenv("AI_CACHE_DIR", raising=False)
+    calls = []
+
+    async def fake_full_ai(user_bytes, model_bytes, language="ko"):
+        calls.append(language)
+        image = None if language == "vi" else f"image-{len(calls)}"
+        return {"comment": "ok", "image": image, "user_heads": 0, "model_heads": 0}
+    monkeypatch.setattr(main, "analyze_full_ai_mode", fake_full_ai)
+
+    async def post(language):
+        response = await client.post("/process-ai", files=pair_files, data={"mode": "full_ai", "language": language})
+        assert response.status_code == 200
+        return response.json()['active']['image']
+
+    assert await post("en") == "image-1"
+    assert await post("en") == "image-1"      # cache hit, no Gemini call
+    assert await post("ko") == "image-2"      # different language, different key
+    assert await post("vi") is None           # failed generations are not cached
+    assert await post("vi") is None
+    assert calls == ["en", "ko", "vi", "vi"]
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_requests_are_coalesced(client, monkeypatch, pair_files):
+    monkeypatch.setenv("AI_CACHE_SIZE", "0")
+    calls = []
+
+    async def slow_full_ai(user_bytes, model_bytes, language="ko"):
+        calls.append("ai")
+        await asyncio.sleep(0.2)
+        return {"comment": "ok", "image": "generated", "user_heads": 0, "model_heads": 0}
+    monkeypatch.setattr(main, "analyze_full_ai_mode", slow_full_ai)
+
+    def counting_pair(*args, **kwargs):
+        calls.append("cv")
+        return mode_vision.process_image_pair(*args, **kwargs)
+    monkeypatch.setattr(main, "process_image_pair", counting_pair)
+
+    def post(path, data):
+        return client.post(path, files=pair_files, data=data)
+
+    coalesced = main.ai_flights.coalesced + main.baseline_flights.coalesced
+    responses = await asyncio.gather(
+        *[post("/process-ai", {"mode": "full_ai", "language": "en"}) for _ in range(3)],
+        *[post("/process-baseline", {"language": "en", "artifacts": "result"}) for _ in range(2)],
+    )
+    assert all(r.status_code == 200 for r in responses)
+    assert sorted(calls) == ["ai", "cv"]
+    assert main.ai_flights.coalesced + main.baseline_flights.coalesced - coalesced == 3
+    # Coalesced baseline requests share the stored analysis
+    assert responses[3].json()['meta']['analysis_id'] == responses[4].json()['meta']['analysis_id']
+    assert len(main.ai_flights) == 0 and len(main.baseline_flights) == 0
+
+@pytest.mark.asyncio
+async def test_saturated_lane_rejects_with_429(client, monkeypatch, pair_files):
+    monkeypatch.setattr(admission, "_lanes", {})
+    monkeypatch.setenv("CV_LANE_CONCURRENCY", "1")
+    monkeypatch.setenv("CV_LANE_QUEUE", "0")
+
+    held = await admission.acquire_ticket("cv")
+    try:
+        response = await client.post("/process-baseline", files=pair_files, data={"language": "en", "artifacts": "result"})
+    finally:
+        held.release()
+    assert response.status_code == 429
+    assert int(response.headers['retry-after']) >= 1
+    assert response.json()['reason'] == "queue_full"
+
+    # A free slot admits the request again
+    response = await client.post("/process-baseline", files=pair_files, data={"language": "en", "artifacts": "result"})
+    assert response.status_code == 200
+
+    text = (await client.get("/metrics")).text
+    assert 'factbomb_lane_rejected_total{lane="cv",reason="queue_full"} 1' in text
+    assert 'factbomb_lane_queue_depth{lane="cv"} 0' in text
+    assert 'factbomb_lane_wait_seconds_count{lane="cv"}' in text
+
+@pytest.mark.asyncio
+async def test_lane_deadline(monkeypatch):
+    monkeypatch.setattr(admission, "_lanes", {})
+    monkeypatch.setenv("AI_LANE_CONCURRENCY", "1")
+    monkeypatch.setenv("AI_LANE_MAX_WAIT", "0.05")
+    async with admission.admit("ai"):
+        with pytest.raises(admission.Overloaded) as excinfo:
+            await admission.acquire_ticket("ai")
+    assert excinfo.value.reason == "deadline"
+    # The slot is free again once the holder is done
+    (await admission.acquire_ticket("ai")).release()
+
+@pytest.mark.asyncio
+async def test_ai_job_submit_poll_and_fetch(client, monkeypatch, pair_files):
+    monkeypatch.setattr(jobs, "_store", None)
+    monkeypatch.setenv("AI_CACHE_SIZE", "0")
+    release = asyncio.Event()
+
+    async def fake_full_ai(user_bytes, model_bytes, language="ko"):
+        await release.wait()
+        return {"comment": "ok", "image": "generated", "user_heads": 0, "model_heads": 0}
+    monkeypatch.setattr(main, "analyze_full_ai_mode", fake_full_ai)
+
+    response = await client.post("/jobs/process-ai", files=pair_files, data={"mode": "full_ai", "language": "en"})
+    assert response.status_code == 202
+    job_id = response.json()['job_id']
+
+    # Still running: status without result, result endpoint answers 202
+    assert (await client.get(f"/jobs/{job_id}/result")).status_code == 202
+    release.set()
+    status = (await client.get(f"/jobs/{job_id}", params={"wait": 5})).json()
+    assert status['status'] == 'done'
+    assert 'result' not in status
+
+    result = (await client.get(f"/jobs/{job_id}/result")).json()
+    assert result['active']['image'] == "generated"
+    assert (await client.get("/jobs/unknown")).status_code == 404
+
+@pytest.mark.asyncio
+async def test_failed_ai_job_keeps_status_code(client, monkeypatch, pair_files):
+    monkeypatch.setattr(jobs, "_store", None)
+    # Input errors are reported before a job is created
+    assert (await client.post("/jobs/process-ai", data={"mode": "pro", "analysis_id": "expired"})).status_code == 404
+    assert (await client.post("/jobs/process-ai", data={"mode": "lab"})).status_code == 400
+
+    async def broken_run_active_mode(*args, **kwargs):
+        raise main.HTTPException(status_code=400, detail="No body detected")
+    monkeypatch.setattr(main, "run_active_mode", broken_run_active_mode)
+    job_id = (await client.post("/jobs/process-ai", files=pair_files, data={"mode": "pro"})).json()['job_id']
+    status = (await client.get(f"/jobs/{job_id}", params={"wait": 5})).json()
+    assert status['status'] == 'failed'
+    response = await client.get(f"/jobs/{job_id}/result")
+    assert response.status_code == 400
+    assert response.json()['detail'] == "No body detected"
+
+@pytest.mark.asyncio
+async def test_oversized_uploads_are_rejected(client, monkeypatch, pair_files):
+    # One image over the per-file limit: read_upload stops at the limit
+    monkeypatch.setenv("MAX_UPLOAD_BYTES", "400000")
+    files = dict(pair_files, model_image=('model.png', b'tiny', 'image/png'))
+    response = await client.post("/process-baseline", files=files)
+    assert response.status_code == 413
+    assert "sample_user.png" in response.json()['detail']
+
+    # Body over the request limit: rejected from Content-Length before it is read
+    monkeypatch.setenv("MAX_UPLOAD_BYTES", "100000")
+    response = await client.post("/process-stream", files=pair_files)
+    assert response.status_code == 413
+
+@pytest.mark.asyncio
+async def test_stored_analysis_is_packed_and_reused_by_pro(client, monkeypatch, pair_files):
+    monkeypatch.setenv("AI_CACHE_SIZE", "0")
+    analysis_id = (await client.post("/process-baseline", files=pair_files, data={"language": "en"})).json()['meta']['analysis_id']
+    stored = load_analysis(analysis_id)['visual_data']
+    assert not any(isinstance(value, np.ndarray) for value in stored.values())
+    assert isinstance(stored['final_result'], bytes)
+
+    received = {}
+    async def fake_pro(user_bytes, model_bytes, visual_data, language="ko"):
+        received.update(visual_data)
+        return {"comment": "ok", "image": None}
+    monkeypatch.setattr(main, "run_pro_mode_analysis", fake_pro)
+    response = await client.post("/process-ai", data={"mode": "pro", "analysis_id": analysis_id})
+    assert response.status_code == 200
+    assert received['user_debug'].ndim == 3
+
+@pytest.mark.asyncio
+async def test_invalid_encodings_are_rejected_with_400(client, pair_files):
+    for encodings in (
+        {"result": {"max_side": [1]}},
+        {"result": {"max_bytes": -5}},
+        {"analysis": {"source": "result"}},
+        {"image": {"source": "result"}},
+        {"user_debug": {"source": "result"}},
+    ):
+        response = await client.post("/process-baseline", files=pair_files, data={"encodings": json.dumps(encodings)})
+        assert response.status_code == 400, encodings
+
+@pytest.mark.asyncio
+async def test_streamed_body_without_content_length_is_rejected(client, monkeypatch, pair_files):
+    monkeypatch.setenv("MAX_UPLOAD_BYTES", "100000")
+    data = pair_files['user_image'][1]
+    body = (
+        b'--xyz\r\nContent-Disposition: form-data; name="user_image"; filename="user.png"\r\n'
+        b'Content-Type: image/png\r\n\r\n' + data + data + b'\r\n--xyz--\r\n'
+    )
+
+    async def chunks():
+        for start in range(0, len(body), 65536):
+            yield body[start:start + 65536]
+
+    response = await client.post(
+        "/process-baseline", content=chunks(), headers={"content-type": "multipart/form-data; boundary=xyz"}
+    )
+    assert 'content-length' not in response.request.headers
+    assert response.status_code == 413
+    assert "too large" in response.json()['detail']
@@ -0,0 +1,52 @@
+import numpy as np
+from backend.services.cv_utils import calculate_body_ratios
+from backend.services.mode_vision import proportion_distance
+from backend.services.ratio_engine import (
+    RATIO_COLUMNS, landmarks_to_array, calculate_body_ratios_array, ratios_to_array,
+    ratios_to_dicts, proportion_distances
+)
+
+BODY = {
+    'top_y': 40, 'chin_y': 130, 'eye_y': 80, 'nose_y': 100, 'shoulder_y': 170, 'hip_y': 420,
+    'knee_y': 620, 'ankle_y': 800, 'heel_y': 830,
+    'shoulder_width_px': 181.5, 'hip_width_px': 120.25, 'face_width': 75
+}
+
+def random_bodies(n, seed=0):
+    rng = np.random.default_rng(seed)
+    bodies, head_heights = [], []
+    for _ in range(n):
+        body = {key: value + float(rng.normal(0, 15)) for key, value in BODY.items()}
+        bodies.append(body)
+        head_heights.append(float(rng.uniform(70, 110)) if rng.random() > 0.3 else None)
+    return bodies, head_heights
+
+def test_single_body_matches_dict_engine_exactly():
+    # Including the fallbacks: no face, no chin, eyes above the head top, collapsed segments
+    no_chin = {k: v for k, v in BODY.items() if k not in ('chin_y', 'face_width')}
+    eyes_above = dict(BODY, eye_y=30)
+    collapsed = dict(BODY, shoulder_y=40, hip_y=40, ankle_y=40, knee_y=10, heel_y=0)
+    cases = [(BODY, 92), (BODY, None), (no_chin, None), (eyes_above, None), (collapsed, 0)]
+
+    for landmarks, head_height in cases:
+        expected = calculate_body_ratios(landmarks, precise_head_height=head_height)
+        array = calculate_body_ratios_array(landmarks_to_array([landmarks], [head_height]))
+        assert ratios_to_dicts(array)[0] == {name: expected[name] for name in RATIO_COLUMNS}
+
+def test_batch_matches_per_dict_loop():
+    bodies, head_heights = random_bodies(500)
+    expected = ratios_to_array([
+        calculate_body_ratios(body, precise_head_height=head_height)
+        for body, head_height in zip(bodies, head_heights)
+    ])
+    actual = calculate_body_ratios_array(landmarks_to_array(bodies, head_heights))
+    assert np.array_equal(actual, expected)
+
+def test_proportion_distances_match_scalar_distance():
+    bodies, head_heights = random_bodies(50, seed=1)
+    ratios = calculate_body_ratios_array(landmarks_to_array(bodies, head_heights))
+    user = ratios_to_dicts(ratios[:1])[0]
+    distances = proportion_distances(user, ratios)
+    assert distances[0] == 0
+    expected = [proportion_distance(user, model) for model in ratios_to_dicts(ratios)]
+    assert np.allclose(distances, expected)
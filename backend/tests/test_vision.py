@@ -0,0 +1,153 @@
+import os
+import cv2
+import numpy as np
+import pytest
+from backend.services import mode_vision
+from backend.services.cache import TieredCache
+from backend.services.cv_utils import (
+    compute_warp_geometry, map_y_through_warp, get_landmarks_with_results, warp_image_to_ratio, compute_warp_maps,
+    detect_body, detect_face_bounds, decode_image, decode_work_image, image_dimensions
+)
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'samples')
+
+@pytest.fixture(scope="module")
+def sample_images():
+    img_user = cv2.imread(os.path.join(SAMPLES_DIR, 'sample_user.png'))
+    img_model = cv2.imread(os.path.join(SAMPLES_DIR, 'sample_model.png'))
+    return img_user, img_model
+
+def test_warp_geometry_maps_segment_boundaries():
+    landmarks = {'top_y': 50, 'chin_y': 150, 'shoulder_y': 200, 'hip_y': 500, 'knee_y': 700, 'heel_y': 950, 'face_width': 80}
+    ratios = {'r1_head': 0.2, 'r2_neck': 0.1, 'r3_torso': 0.3, 'r4_thigh': 0.2, 'r5_shin': 0.2, 'face_aspect_ratio': 0.7}
+    geometry = compute_warp_geometry(landmarks, ratios, (1000, 600, 3))
+
+    assert map_y_through_warp(10, geometry) == 10
+    assert map_y_through_warp(150, geometry) == 50 + 180
+    assert map_y_through_warp(950, geometry) == 50 + 900
+    assert geometry['out_h'] == 50 + 900 + 50
+
+def test_remap_engine_matches_resize_engine():
+    rng = np.random.default_rng(0)
+    image = cv2.GaussianBlur(rng.integers(0, 255, (1000, 600, 3), dtype=np.uint8), (0, 0), 4)
+    landmarks = {'top_y': 50, 'chin_y': 150, 'shoulder_y': 200, 'hip_y': 500, 'knee_y': 700, 'heel_y': 950, 'face_width': 80}
+    ratios = {'r1_head': 0.2, 'r2_neck': 0.1, 'r3_torso': 0.3, 'r4_thigh': 0.2, 'r5_shin': 0.2, 'face_aspect_ratio': 0.7}
+    geometry = compute_warp_geometry(landmarks, ratios, image.shape)
+
+    resized = warp_image_to_ratio(image, landmarks, ratios, geometry=geometry, engine='resize')
+    for engine in ('remap', 'remap_smooth'):
+        remapped = warp_image_to_ratio(image, landmarks, ratios, geometry=geometry, engine=engine)
+        assert remapped.shape == resized.shape
+        assert np.abs(remapped.astype(np.int16) - resized).mean() < 2
+
+    # Segment boundaries land on the same rows the analytic landmark mapping uses
+    _, map_y, _ = compute_warp_maps(geometry)
+    assert abs(map_y[int(map_y_through_warp(500, geometry))] - 500) < 1
+
+def test_analytic_result_landmarks_skip_inference(sample_images, monkeypatch):
+    calls = []
+    original = mode_vision.detect_body
+    def counting(img):
+        calls.append(img.shape)
+        return original(img)
+    monkeypatch.setattr(mode_vision, "detect_body", counting)
+
+    analytic = mode_vision.process_visuals_core(*sample_images, result_landmarks='analytic')
+    assert len(calls) == 2
+
+    detected = mode_vision.process_visuals_core(*sample_images, result_landmarks='detect')
+    assert len(calls) == 5
+    assert abs(analytic['result_heads'] - detected['result_heads']) < 0.5
+
+def test_proxy_detection_returns_full_resolution_coordinates(sample_images):
+    _, img_model = sample_images
+    large = cv2.resize(img_model, None, fx=2, fy=2, interpolation=cv2.INTER_LINEAR)
+
+    base, _ = get_landmarks_with_results(img_model, max_side=0)
+    proxy, _ = get_landmarks_with_results(large, max_side=1024)
+    for key in ('shoulder_y', 'hip_y', 'knee_y', 'heel_y'):
+        assert abs(proxy[key] - 2 * base[key]) <= 8
+
+def test_fused_detector_matches_separate_passes(sample_images, monkeypatch):
+    img_user, _ = sample_images
+    conversions = []
+    original = cv2.cvtColor
+    def counting(*args, **kwargs):
+        conversions.append(args[1])
+        return original(*args, **kwargs)
+    monkeypatch.setattr(cv2, "cvtColor", counting)
+
+    detection = detect_body(img_user)
+    assert conversions == [cv2.COLOR_BGR2RGB]
+    monkeypatch.undo()
+
+    landmarks, _ = get_landmarks_with_results(img_user)
+    assert detection.landmarks == landmarks
+    assert detection.face == detect_face_bounds(img_user)
+    merged, head_height = detection.head_estimate()
+    assert merged['top_y'] == detection.face['top']
+    assert head_height == detection.face['height']
+
+def test_only_requested_artifacts_are_rendered(sample_images, monkeypatch):
+    drawn = []
+    original = mode_vision.draw_debug_image
+    def counting(img, profile, crop_bounds=None):
+        drawn.append(img.shape)
+        return original(img, profile, crop_bounds)
+    monkeypatch.setattr(mode_vision, "draw_debug_image", counting)
+
+    visual_data = mode_vision.process_visuals_core(*sample_images, artifacts=('result',))
+    assert visual_data['final_result'] is not None
+    assert visual_data['user_debug'] is None
+    assert visual_data['final_result_debug'] is None
+    assert drawn == []
+    assert mode_vision.get_base64_results(visual_data)['user_debug_image'] is None
+
+def test_warp_maps_are_cached_per_model_and_ratio_bucket(sample_images, monkeypatch):
+    # The default engine reads the warp map cache
+    monkeypatch.delenv("WARP_ENGINE", raising=False)
+    monkeypatch.setattr(mode_vision, "_warp_map_cache", TieredCache("warp_maps"))
+    computed = []
+    original = mode_vision.compute_warp_maps
+    def counting(geometry, smooth=False):
+        computed.append(geometry['out_h'])
+        return original(geometry, smooth=smooth)
+    monkeypatch.setattr(mode_vision, "compute_warp_maps", counting)
+
+    img_user, img_model = sample_images
+    user_profile = mode_vision.extract_body_profile(img_user)
+    model_profile = mode_vision.extract_body_profile(img_model, cache_key="model-hash")
+    first = mode_vision.warp_to_user_ratios(img_model, user_profile, model_profile)
+
+    # A slightly different user falls into the same ratio buckets
+    nudged = dict(user_profile, ratios=dict(user_profile['ratios'], r3_torso=user_profile['ratios']['r3_torso'] + 1e-4))
+    second = mode_vision.warp_to_user_ratios(img_model, nudged, model_profile)
+    assert len(computed) == 1
+    assert np.array_equal(first['image'], second['image'])
+
+def test_large_jpeg_is_decoded_at_reduced_resolution(monkeypatch):
+    img = np.random.default_rng(0).integers(0, 255, (3000, 4000, 3), dtype=np.uint8)
+    jpeg = cv2.imencode('.jpg', img)[1].tobytes()
+    png = cv2.imencode('.png', img[:300, :400])[1].tobytes()
+    assert image_dimensions(jpeg) == (4000, 3000)
+    assert image_dimensions(png) == (400, 300)
+    assert image_dimensions(b'not an image') is None
+
+    # 1/4 scale is the largest reduction that still covers (90% of) max_side
+    assert decode_image(jpeg, max_side=1000).shape == (750, 1000, 3)
+    assert decode_image(jpeg, max_side=1100).shape == (750, 1000, 3)
+    assert decode_image(jpeg, max_side=1200).shape == (1500, 2000, 3)
+    assert decode_image(jpeg).shape == (3000, 4000, 3)
+
+    monkeypatch.setenv("WORK_MAX_SIDE", "1200")
+    assert decode_work_image(jpeg).shape == (900, 1200, 3)
+
+    monkeypatch.setenv("MAX_IMAGE_PIXELS", "1000000")
+    with pytest.raises(ValueError):
+        decode_image(jpeg)
+
+def test_decode_is_full_resolution_by_default(monkeypatch):
+    monkeypatch.delenv("WORK_MAX_SIDE", raising=False)
+    monkeypatch.delenv("MAX_DECODE_SIDE", raising=False)
+    img = np.zeros((3000, 4000, 3), dtype=np.uint8)
+    assert decode_work_image(cv2.imencode('.jpg', img)[1].tobytes()).shape == (3000, 4000, 3)
@@ -152,20 +152,37 @@ function LabPage() {
         } else {
             setIsAiLoading(true)
             try {
-                const aiFormData = new FormData()
-                aiFormData.append('user_image', userImage.file)
-                aiFormData.append('model_image', modelImage.file)
-                aiFormData.append('mode', mode)
-                aiFormData.append('language', i18n.language)
-
-                // Pass meta data
-                aiFormData.append('user_ratios_json', JSON.stringify(currentBaseline.meta.user_ratios))
-                aiFormData.append('model_ratios_json', JSON.stringify(currentBaseline.meta.model_ratios))
+                const buildAiFormData = (useAnalysisId) => {
+                    const aiFormData = new FormData()
+                    aiFormData.append('mode', mode)
+                    aiFormData.append('language', i18n.language)
+
+                    if (useAnalysisId) {
+                        // Server reuses the baseline result: no re-upload, no re-calc
+                        aiFormData.append('analysis_id', currentBaseline.meta.analysis_id)
+                    } else {
+                        aiFormData.append('user_image', userImage.file)
+                        aiFormData.append('model_image', modelImage.file)
+
+                        // Pass meta data
+                        aiFormData.append('user_ratios_json', JSON.stringify(currentBaseline.meta.user_ratios))
+                        aiFormData.append('model_ratios_json', JSON.stringify(currentBaseline.meta.model_ratios))
+                    }
+                    return aiFormData
+                }
 
-                const aiRes = await fetch(`${API_BASE_URL}/process-ai`, {
+                const hasAnalysisId = Boolean(currentBaseline.meta.analysis_id)
+                let aiRes = await fetch(`${API_BASE_URL}/process-ai`, {
                     method: 'POST',
-                    body: aiFormData
+                    body: buildAiFormData(hasAnalysisId)
                 })
+                if (hasAnalysisId && aiRes.status === 404) {
+                    // Analysis expired on the server: fall back to uploading the images
+                    aiRes = await fetch(`${API_BASE_URL}/process-ai`, {
+                        method: 'POST',
+                        body: buildAiFormData(false)
+                    })
+                }
                 if (!aiRes.ok) throw new Error('AI process failed')
 
                 const aiData = await aiRes.json()
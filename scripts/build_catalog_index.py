@@ -0,0 +1,41 @@
+"""
+Catalog ingestion.
+
+Walks a directory of model photos, runs pose + face detection and calculate_body_ratios()
+on each of them across worker processes, and writes a memory-mapped proportion index
+(.npy) with a JSON sidecar (model id -> image path). Point CATALOG_INDEX_PATH at the .npy
+to serve it from POST /catalog/nearest and /process-batch (model_ids).
+
+Usage:
+    python scripts/build_catalog_index.py <photo_dir> [--out catalog/catalog_index.npy] [--workers 4]
+"""
+import os
+import sys
+import time
+import argparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(SCRIPT_DIR, '..')
+sys.path.insert(0, ROOT_DIR)
+
+from backend.services.catalog import build_catalog_index, sidecar_path
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('root', help='Directory with the catalog model photos (searched recursively)')
+    parser.add_argument('--out', default=os.path.join(ROOT_DIR, 'catalog', 'catalog_index.npy'))
+    parser.add_argument('--workers', type=int, default=0, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    indexed, skipped = build_catalog_index(args.root, args.out, workers=args.workers or None)
+    elapsed = time.perf_counter() - start
+
+    for path in skipped:
+        print(f"Skipped (no full body detected or unreadable): {path}")
+    print(f"Indexed {indexed} models in {elapsed:.1f}s")
+    print(f"Index:   {os.path.abspath(args.out)}")
+    print(f"Sidecar: {os.path.abspath(sidecar_path(args.out))}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Warp map cache pre-warming.
+
+Computes the remap coordinate maps of the top-N catalog models for the most common
+target ratio buckets and stores them in the on-disk warp map cache (WARP_MAP_CACHE_DIR),
+so popular try-ons go straight to cv2.remap. Run it with the same WARP_RATIO_STEP,
+WORK_MAX_SIDE and DETECTION_MAX_SIDE as the server.
+
+"Top-N" follows --ids (one catalog model id per line, most popular first) or the index order.
+Ratio buckets are ranked by frequency in --ratios (a JSON list of user ratio dicts, e.g.
+collected meta.user_ratios) or, without it, in the catalog population itself.
+
+Usage:
+    WARP_MAP_CACHE_DIR=cache/warp_maps python scripts/prewarm_warp_cache.py \
+        [--index catalog/catalog_index.npy] [--top 50] [--buckets 20] [--ids popular.txt] [--ratios ratios.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(SCRIPT_DIR, '..')
+sys.path.insert(0, ROOT_DIR)
+
+from backend.services.catalog import CatalogIndex
+from backend.services.ratio_engine import ratios_to_dicts
+from backend.services.mode_vision import quantize_target_ratios, prewarm_warp_maps
+
+def common_buckets(ratio_dicts, count):
+    # The `count` most frequent quantized target ratios, as bucket-centre ratio dicts
+    counter = Counter()
+    centres = {}
+    for ratios in ratio_dicts:
+        quantized, buckets = quantize_target_ratios(ratios)
+        counter[buckets] += 1
+        centres.setdefault(buckets, quantized)
+    return [centres[buckets] for buckets, _ in counter.most_common(count)]
+
+def prewarm_model(image_path, target_ratios_list, engine):
+    with open(image_path, 'rb') as f:
+        return prewarm_warp_maps(f.read(), target_ratios_list, engine=engine)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--index', default=os.environ.get("CATALOG_INDEX_PATH"))
+    parser.add_argument('--top', type=int, default=50, help='Number of catalog models to pre-warm')
+    parser.add_argument('--buckets', type=int, default=20, help='Number of ratio buckets per model')
+    parser.add_argument('--ids', help='File with catalog model ids, most popular first')
+    parser.add_argument('--ratios', help='JSON list of user ratio dicts used to rank the buckets')
+    parser.add_argument('--engine', default=os.environ.get("WARP_ENGINE", "remap"), choices=['remap', 'remap_smooth'])
+    parser.add_argument('--workers', type=int, default=0, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if not os.environ.get("WARP_MAP_CACHE_DIR"):
+        sys.exit("WARP_MAP_CACHE_DIR is not set: pre-warmed maps would only live in this process")
+    if not args.index:
+        sys.exit("No catalog index given (--index or CATALOG_INDEX_PATH)")
+
+    catalog = CatalogIndex(args.index)
+    if args.ids:
+        with open(args.ids, encoding='utf-8') as f:
+            model_ids = [line.strip() for line in f if line.strip() in catalog]
+    else:
+        model_ids = [model['id'] for model in catalog.models]
+    model_ids = model_ids[:args.top]
+
+    if args.ratios:
+        with open(args.ratios, encoding='utf-8') as f:
+            population = json.load(f)
+    else:
+        population = ratios_to_dicts(catalog.ratios)
+    targets = common_buckets(population, args.buckets)
+    print(f"Pre-warming {len(model_ids)} models x {len(targets)} ratio buckets ({args.engine})")
+
+    start = time.perf_counter()
+    paths = [catalog.image_path(model_id) for model_id in model_ids]
+    workers = args.workers or os.cpu_count() or 1
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(prewarm_model, path, targets, args.engine) for path in paths]
+            results = [(path, future.exception() or future.result()) for path, future in zip(paths, futures)]
+    else:
+        results = []
+        for path in paths:
+            try:
+                results.append((path, prewarm_model(path, targets, args.engine)))
+            except Exception as e:
+                results.append((path, e))
+
+    computed = 0
+    for path, result in results:
+        if isinstance(result, Exception):
+            print(f"Skipped {path}: {result}")
+        else:
+            computed += result
+    print(f"Computed {computed} new warp maps in {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Detection proxy accuracy report.
+
+Compares calculate_body_ratios() computed from detections on downscaled proxy images
+(DETECTION_MAX_SIDE) against detection at full resolution, on the samples/ images
+upscaled to phone-camera sizes.
+
+Usage:
+    python scripts/proxy_accuracy_report.py [--upscale 4032] [--sizes 256,512,768,1024,1536]
+"""
+import os
+import sys
+import time
+import argparse
+import cv2
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(SCRIPT_DIR, '..')
+SAMPLES_DIR = os.path.join(ROOT_DIR, 'samples')
+LOGS_DIR = os.path.join(ROOT_DIR, 'logs')
+sys.path.insert(0, ROOT_DIR)
+
+from backend.services.cv_utils import detect_body, calculate_body_ratios
+
+RATIO_KEYS = ['head_stat_ratio', 'legs', 'r1_head', 'r3_torso', 'r4_thigh', 'r5_shin', 'shoulder_heads', 'hip_heads']
+
+def ratios_at(img, max_side):
+    start = time.perf_counter()
+    detection = detect_body(img, max_side=max_side)
+    elapsed = time.perf_counter() - start
+    if not detection.found:
+        return None, elapsed
+    landmarks, head_height = detection.head_estimate()
+    return calculate_body_ratios(landmarks, precise_head_height=head_height), elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--upscale', type=int, default=4032, help='Longest side of the simulated upload (0 = as is)')
+    parser.add_argument('--sizes', default='256,512,768,1024,1536')
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',')]
+
+    lines = [
+        f"# Detection proxy accuracy (upload longest side: {args.upscale or 'original'})",
+        "",
+        "| image | proxy | heads | heads Δ | max rel. ratio Δ | detect time (s) |",
+        "| --- | --- | --- | --- | --- | --- |",
+    ]
+    for name in ('sample_user.png', 'sample_model.png'):
+        img = cv2.imread(os.path.join(SAMPLES_DIR, name))
+        if args.upscale:
+            scale = args.upscale / max(img.shape[:2])
+            img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+
+        ratios_at(img, 0)  # warm up the graphs so the first timing is comparable
+        full, full_time = ratios_at(img, 0)
+        if not full:
+            print(f"No body detected in {name} at full resolution, skipping")
+            continue
+        full_heads = 1 / full['head_stat_ratio']
+        lines.append(f"| {name} | full | {full_heads:.2f} | - | - | {full_time:.3f} |")
+
+        for size in sizes:
+            proxy, proxy_time = ratios_at(img, size)
+            if not proxy:
+                lines.append(f"| {name} | {size} | no detection | | | {proxy_time:.3f} |")
+                continue
+            heads = 1 / proxy['head_stat_ratio']
+            max_rel = max(abs(proxy[k] - full[k]) / abs(full[k]) for k in RATIO_KEYS if full[k])
+            lines.append(f"| {name} | {size} | {heads:.2f} | {heads - full_heads:+.2f} | {max_rel * 100:.2f}% | {proxy_time:.3f} |")
+
+    report = "\n".join(lines)
+    print(report)
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    out_path = os.path.join(LOGS_DIR, 'proxy_accuracy_report.md')
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write(report + "\n")
+    print(f"\nSaved report to {out_path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Ratio engine micro-benchmark.
+
+Compares the per-dict calculate_body_ratios() loop against the vectorized
+calculate_body_ratios_array() on synthetic landmark sets, and checks that both
+give identical results.
+
+Usage:
+    python scripts/ratio_engine_benchmark.py [--sizes 1,100,10000] [--repeat 5]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(SCRIPT_DIR, '..')
+LOGS_DIR = os.path.join(ROOT_DIR, 'logs')
+sys.path.insert(0, ROOT_DIR)
+
+from backend.services.cv_utils import calculate_body_ratios
+from backend.services.ratio_engine import landmarks_to_array, calculate_body_ratios_array, ratios_to_array
+
+BODY = {
+    'top_y': 40, 'chin_y': 130, 'eye_y': 80, 'shoulder_y': 170, 'hip_y': 420,
+    'knee_y': 620, 'ankle_y': 800, 'heel_y': 830,
+    'shoulder_width_px': 181.5, 'hip_width_px': 120.25, 'face_width': 75
+}
+
+def synthetic_bodies(n, rng):
+    bodies = [{key: value + float(rng.normal(0, 15)) for key, value in BODY.items()} for _ in range(n)]
+    head_heights = [float(h) for h in rng.uniform(70, 110, n)]
+    return bodies, head_heights
+
+def best_of(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1,100,10000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    lines = [
+        "# Ratio engine benchmark (best of %d)" % args.repeat,
+        "",
+        "| N | dict loop (ms) | vectorized (ms) | speedup | bodies/s (vectorized) | identical |",
+        "| --- | --- | --- | --- | --- | --- |",
+    ]
+    for n in [int(s) for s in args.sizes.split(',')]:
+        bodies, head_heights = synthetic_bodies(n, rng)
+        # The landmark array is what a catalog index stores, so packing is not timed
+        landmarks = landmarks_to_array(bodies, head_heights)
+
+        loop_time, loop_ratios = best_of(lambda: [
+            calculate_body_ratios(body, precise_head_height=head_height)
+            for body, head_height in zip(bodies, head_heights)
+        ], args.repeat)
+        array_time, array_ratios = best_of(lambda: calculate_body_ratios_array(landmarks), args.repeat)
+
+        identical = np.array_equal(ratios_to_array(loop_ratios), array_ratios)
+        lines.append(
+            f"| {n} | {loop_time * 1000:.3f} | {array_time * 1000:.3f} | {loop_time / array_time:.2f}x "
+            f"| {n / array_time:,.0f} | {'yes' if identical else 'NO'} |"
+        )
+
+    report = "\n".join(lines)
+    print(report)
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    out_path = os.path.join(LOGS_DIR, 'ratio_engine_benchmark.md')
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write(report + "\n")
+    print(f"\nSaved report to {out_path}")
+
+if __name__ == '__main__':
+    main()